@@ -8,7 +8,8 @@ and other administrative tasks.
 
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
-from utils.azure_storage import AzureStorageManager
+from routes import images
+from utils.azure_storage import AzureStorageManager, get_storage_manager
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -18,7 +19,12 @@ azure_storage_manager: AzureStorageManager = None
 def set_azure_config(connection_string: str, container_name: str):
     """Set Azure configuration for admin operations"""
     global azure_storage_manager
-    azure_storage_manager = AzureStorageManager(connection_string, container_name)
+    azure_storage_manager = get_storage_manager(connection_string, container_name)
+
+def forget_processed_images():
+    """Clear the dedup index of the container, whose blobs are gone"""
+    if images.dedup_index:
+        images.dedup_index.clear()
 
 @router.delete("/container")
 def delete_container() -> Dict[str, Any]:
@@ -31,6 +37,8 @@ def delete_container() -> Dict[str, Any]:
         
         # Check if container exists
         if not azure_storage_manager.container_client.exists():
+            azure_storage_manager.invalidate_container_state()
+            forget_processed_images()
             return {
                 "message": f"Container '{container_name}' does not exist",
                 "container_name": container_name,
@@ -40,6 +48,8 @@ def delete_container() -> Dict[str, Any]:
         
         # Delete container
         azure_storage_manager.container_client.delete_container()
+        azure_storage_manager.invalidate_container_state()
+        forget_processed_images()
         
         return {
             "message": f"Container '{container_name}' deleted successfully",
@@ -62,6 +72,7 @@ def create_container(public_access: bool = True) -> Dict[str, Any]:
         
         # Check if container already exists
         if azure_storage_manager.container_client.exists():
+            azure_storage_manager.mark_container_ready()
             return {
                 "message": f"Container '{container_name}' already exists",
                 "container_name": container_name,
@@ -70,6 +81,9 @@ def create_container(public_access: bool = True) -> Dict[str, Any]:
                 "public_access": public_access
             }
         
+        # A new container holds none of the indexed blobs (e.g. deleted outside the API)
+        forget_processed_images()
+        
         # Create container with specified access level
         if public_access:
             from azure.storage.blob import PublicAccess
@@ -78,6 +92,7 @@ def create_container(public_access: bool = True) -> Dict[str, Any]:
         else:
             azure_storage_manager.container_client.create_container()
             access_type = "private"
+        azure_storage_manager.mark_container_ready()
         
         return {
             "message": f"Container '{container_name}' created successfully with {access_type} access",
@@ -103,6 +118,8 @@ def recreate_container(public_access: bool = True) -> Dict[str, Any]:
         # Delete container if it exists
         if azure_storage_manager.container_client.exists():
             azure_storage_manager.container_client.delete_container()
+        azure_storage_manager.invalidate_container_state()
+        forget_processed_images()
         
         # Create container with specified access level
         if public_access:
@@ -112,6 +129,7 @@ def recreate_container(public_access: bool = True) -> Dict[str, Any]:
         else:
             azure_storage_manager.container_client.create_container()
             access_type = "private"
+        azure_storage_manager.mark_container_ready()
         
         return {
             "message": f"Container '{container_name}' recreated successfully with {access_type} access",
@@ -8,7 +8,7 @@ and Azure Storage connection.
 
 from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
-from utils.azure_storage import AzureStorageManager
+from utils.azure_storage import AzureStorageManager, get_storage_manager
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -18,7 +18,7 @@ azure_storage_manager: AzureStorageManager = None
 def set_azure_config(connection_string: str, container_name: str):
     """Set Azure configuration for health checks"""
     global azure_storage_manager
-    azure_storage_manager = AzureStorageManager(connection_string, container_name)
+    azure_storage_manager = get_storage_manager(connection_string, container_name)
 
 @router.get("/")
 def health_check() -> Dict[str, Any]:
@@ -6,25 +6,86 @@ This module contains endpoints for processing and uploading images to Azure Stor
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Union
-import requests
-from pathlib import Path
-import tempfile
+from PIL import Image
+from typing import AsyncIterator, List, Literal, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
 import os
 
 from src.naming_convention import NamingConvention
-from src.image_processor import ImageProcessor
-from utils.azure_storage import AzureStorageManager
+from src.image_probe import ImageProbe
+from src.image_processor import ImageProcessor, SquareifyResult
+from src.memory_budget import MemoryBudget
+from src.output_format import OUTPUT_FORMATS, extension_for, get_output_format
+from src.quality_search import QualityMemo, QualityTarget
+from utils.azure_storage import AzureStorageManager, UploadPipeline, get_storage_manager
+from utils.dedup_index import DedupIndex, hash_source
+from utils.download_cache import DownloadCache
+from utils.http_client import AsyncImageDownloader, DownloadError
+from utils.single_flight import SingleFlight
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 # Global Azure Storage Manager
 azure_storage_manager: AzureStorageManager = None
 
+# Background uploader (bounded in-flight count and byte budget)
+upload_pipeline: UploadPipeline = None
+UPLOAD_CONCURRENCY = int(os.getenv('YOOBUMORPH_UPLOAD_CONCURRENCY', '8'))
+UPLOAD_BUFFER_MB = int(os.getenv('YOOBUMORPH_UPLOAD_BUFFER_MB', '256'))
+
+# Content-addressed index of already uploaded images (empty path disables it)
+dedup_index: DedupIndex = None
+DEDUP_DB_PATH = os.getenv('YOOBUMORPH_DEDUP_DB', 'data/dedup.sqlite3')
+DEDUP_VERIFY = os.getenv('YOOBUMORPH_DEDUP_VERIFY', 'false').lower() in ('1', 'true', 'yes')
+
+# Adaptive JPEG/WebP quality: lowest quality reaching the target SSIM and/or highest
+# quality within the byte cap, memoized per source hash (unset = fixed quality 95)
+TARGET_SSIM = float(os.getenv('YOOBUMORPH_TARGET_SSIM', '0')) or None
+MAX_IMAGE_KB = int(os.getenv('YOOBUMORPH_MAX_IMAGE_KB', '0')) or None
+QUALITY_DB_PATH = os.getenv('YOOBUMORPH_QUALITY_DB', 'data/quality.sqlite3')
+quality_target = QualityTarget(
+    min_ssim=TARGET_SSIM,
+    max_bytes=MAX_IMAGE_KB * 1024 if MAX_IMAGE_KB else None
+) if TARGET_SSIM or MAX_IMAGE_KB else None
+
 # Initialize processors
 naming_convention = NamingConvention()
-image_processor = ImageProcessor()
+image_processor = ImageProcessor(
+    quality_target,
+    QualityMemo(QUALITY_DB_PATH or None) if quality_target else None
+)
+
+# On-disk cache of downloaded sources, revalidated with conditional GETs (empty path disables it)
+download_cache: DownloadCache = None
+DOWNLOAD_CACHE_DIR = os.getenv('YOOBUMORPH_DOWNLOAD_CACHE_DIR', 'data/download_cache')
+DOWNLOAD_CACHE_MB = int(os.getenv('YOOBUMORPH_DOWNLOAD_CACHE_MB', '1024'))
+
+# Sources larger than this are rejected from their header, before the download
+# finishes (default: the limit at which Pillow refuses to decode, 0 disables it)
+MAX_SOURCE_PIXELS = int(os.getenv('YOOBUMORPH_MAX_SOURCE_PIXELS', str(2 * Image.MAX_IMAGE_PIXELS)))
+
+# Pooled HTTP client shared by all requests (keep-alive, per-host limits)
+# (the download cache is attached by set_azure_config)
+image_downloader = AsyncImageDownloader(max_pixels=MAX_SOURCE_PIXELS or None)
+
+# In-flight source images, shared by concurrent requests referencing the same URL
+image_flights = SingleFlight()
+
+# Bounded executor for CPU-bound squareify work
+PROCESSING_WORKERS = int(os.getenv('YOOBUMORPH_PROCESSING_WORKERS', os.cpu_count() or 1))
+processing_executor = ThreadPoolExecutor(max_workers=PROCESSING_WORKERS, thread_name_prefix="squareify")
+
+# RAM budget shared by the squareify threads: each image reserves its peak memory,
+# estimated from its header, before being decoded (0 = half of the available memory)
+MEMORY_BUDGET_MB = int(os.getenv('YOOBUMORPH_MEMORY_BUDGET_MB', '0'))
+memory_budget = MemoryBudget(MEMORY_BUDGET_MB * 1024 * 1024 or None)
+
+# Output formats selectable per request (see src/output_format.py)
+OutputFormatName = Literal["jpeg", "webp", "avif"]
 
 class ImageVariation(BaseModel):
     name: str
@@ -41,113 +102,351 @@ class ProductRequest(BaseModel):
 
 class BatchRequest(BaseModel):
     products: List[ProductRequest]
+    widths: Optional[List[int]] = None  # None = one image at the source size
+    formats: Optional[List[OutputFormatName]] = None  # None = JPEG, square sources keep their format
+    trim_tolerance: Optional[int] = None  # None = no trimming of solid-colour margins
 
 class ImageResult(BaseModel):
     url: str
     variation_name: str
+    width: Optional[int] = None
+    format: Optional[str] = None
 
 class BatchResponse(BaseModel):
     processed_images: List[ImageResult]
 
+class StreamedImageResult(ImageResult):
+    type: Literal["result"] = "result"
+    product_name: str
+
+class StreamedImageError(BaseModel):
+    type: Literal["error"] = "error"
+    product_name: str
+    variation_name: str
+    source_url: str
+    error: str
+
+class StreamSummary(BaseModel):
+    type: Literal["summary"] = "summary"
+    processed: int
+    errors: int
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
 def set_azure_config(connection_string: str, container_name: str):
     """Set Azure configuration for image processing"""
-    global azure_storage_manager
-    azure_storage_manager = AzureStorageManager(connection_string, container_name)
+    global azure_storage_manager, upload_pipeline, dedup_index, download_cache
+    azure_storage_manager = get_storage_manager(connection_string, container_name)
+    upload_pipeline = UploadPipeline(
+        azure_storage_manager,
+        max_in_flight=UPLOAD_CONCURRENCY,
+        max_bytes=UPLOAD_BUFFER_MB * 1024 * 1024
+    )
+    if DEDUP_DB_PATH:
+        dedup_index = DedupIndex(DEDUP_DB_PATH, container_name)
+    if DOWNLOAD_CACHE_DIR:
+        download_cache = DownloadCache(DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_MB * 1024 * 1024)
+        image_downloader.cache = download_cache
 
-def upload_to_azure_blob(local_path: Path, blob_name: str) -> str:
-    """Upload a file to Azure Blob Storage"""
+async def upload_to_azure_blob(data: bytes, blob_name: str, content_type: str = 'image/jpeg') -> str:
+    """Upload encoded image bytes to Azure Blob Storage through the upload pipeline"""
     if not azure_storage_manager:
         raise HTTPException(status_code=500, detail="Azure Storage not configured. Please set AZURE_CONNECTION_STRING environment variable.")
     
-    return azure_storage_manager.upload_file(local_path, blob_name)
+    return await upload_pipeline.submit_async(data, blob_name, content_type)
 
-def process_and_upload_image_variations(product_images: List[ProductImage], product_name: str) -> List[dict]:
-    """Download, process and upload image variations to Azure Storage"""
-    processed_variations = []
+def squareify_source(data: bytes, bg_color: Tuple[int, int, int] = (255, 255, 255),
+                     widths: Optional[List[int]] = None,
+                     probe: Optional[ImageProbe] = None,
+                     formats: Optional[List[str]] = None,
+                     trim_tolerance: Optional[int] = None) -> List[SquareifyResult]:
+    """
+    Decode and squareify downloaded image bytes (runs in the processing executor)
     
-    for product_image in product_images:
-        # Download image temporarily
-        response = requests.get(product_image.url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail=f"Download error: {product_image.url}")
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_in:
-            tmp_in.write(response.content)
-            tmp_in.flush()
-            tmp_in_path = Path(tmp_in.name)
-
-        try:
-            # Detect original image size and determine target size
-            from PIL import Image
-            with Image.open(tmp_in_path) as img:
-                original_width, original_height = img.size
-                
-                # Determine target size based on image orientation
-                if original_width > original_height:
-                    # Horizontal image: use width as reference
-                    auto_size = original_width
-                elif original_height > original_width:
-                    # Vertical image: use height as reference
-                    auto_size = original_height
-                else:
-                    # Square image: keep original size
-                    auto_size = original_width  # or original_height, they're the same
-
-            # Create temporary output file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_out:
-                tmp_out_path = Path(tmp_out.name)
-
-            # Determine target size based on image orientation and dimensions
-            if original_width > original_height:
-                # Image Horizontale: utiliser la largeur comme référence
-                target_size = (original_width, original_width)
-            elif original_height > original_width:
-                # Image Verticale: utiliser la hauteur comme référence
-                target_size = (original_height, original_height)
-            else:
-                # Image Carrée: ne pas modifier, garder la taille originale
-                target_size = (original_width, original_height)
-            
-            # Resize image according to variation settings
-            image_processor.squareify_image(
-                tmp_in_path, 
-                tmp_out_path, 
-                target_size, 
-                (255, 255, 255)  # Default white background
+    Returns one result per width and per format, widths first, all encoded
+    from the same decode and canvas. With trim_tolerance, solid-colour margins
+    are cropped first (see src/border_trim.py).
+    """
+    # Wait until the estimated peak memory fits in the budget; oversized images
+    # build their canvas in strips instead of holding it in memory
+    # (trimmed JPEGs are decoded at full resolution)
+    estimated_bytes, strips = memory_budget.plan(
+        probe, max(widths) if widths else None, reduced_decode=trim_tolerance is None
+    )
+    with memory_budget.reserve(estimated_bytes):
+        if strips:
+            return image_processor.squareify_buffer_strips(data, bg_color, widths, trim_tolerance, formats)
+        return squareify_in_memory(data, bg_color, widths, formats, trim_tolerance)
+
+def squareify_in_memory(data: bytes, bg_color: Tuple[int, int, int],
+                        widths: Optional[List[int]],
+                        formats: Optional[List[str]] = None,
+                        trim_tolerance: Optional[int] = None) -> List[SquareifyResult]:
+    """Squareify downloaded image bytes with the whole canvas in memory"""
+    # Requesting only JPEG still allows the lossless path (its output is a JPEG),
+    # trimming does not (the margins have to be decoded)
+    jpeg_only = not formats or all(get_output_format(name).pil_format == "JPEG" for name in formats)
+    if not widths and jpeg_only and trim_tolerance is None:
+        # JPEG sources are padded losslessly in the DCT domain when possible,
+        # without decoding them
+        lossless = image_processor.squareify_jpeg_lossless(data, bg_color)
+        if lossless:
+            return [lossless]
+    
+    if formats:
+        # Every format is encoded from the same canvas (at the source size without widths)
+        analysis = image_processor.analyze_image(
+            data, image_processor._largest_target(widths) if widths else None, trim_tolerance
+        )
+        return image_processor.squareify_variants(
+            analysis, widths or [analysis.target_size[0]], bg_color, output_formats=formats
+        )
+    
+    if not widths:
+        # Decode once: size, orientation strategy and pixels come from the same analysis.
+        # Horizontal images keep their width, vertical images their height,
+        # square images are left untouched
+        analysis = image_processor.analyze_image(data, trim_tolerance=trim_tolerance)
+        return [image_processor.squareify_analysis(analysis, bg_color)]
+    
+    # Several widths: one decode and one canvas, downscaled progressively
+    analysis = image_processor.analyze_image(data, image_processor._largest_target(widths), trim_tolerance)
+    return image_processor.squareify_variants(analysis, widths, bg_color)
+
+def processing_params(bg_color: Tuple[int, int, int], width: Optional[int] = None,
+                      output_format: Optional[str] = None, trim_tolerance: Optional[int] = None) -> dict:
+    """Parameters that affect the processed output, used as part of the dedup key"""
+    params = {
+        "background_color": list(bg_color)
+    }
+    if width is not None:
+        params["width"] = width
+    if output_format is not None:
+        # Absent without requested formats: existing dedup entries stay valid
+        params["format"] = output_format
+    if quality_target is not None:
+        # Absent with the fixed quality: existing dedup entries stay valid
+        params["quality"] = quality_target.key
+    if trim_tolerance is not None:
+        # Absent without trimming: existing dedup entries stay valid
+        params["trim"] = trim_tolerance
+    return params
+
+async def find_processed_image(source_hash: str, params: dict) -> Union[dict, None]:
+    """Look up a previously uploaded result for the same source bytes and parameters"""
+    if not dedup_index:
+        return None
+    
+    entry = await asyncio.to_thread(dedup_index.lookup, source_hash, params)
+    if entry is None:
+        return None
+    
+    # Optionally make sure the blob still exists before reusing it
+    if DEDUP_VERIFY:
+        if not azure_storage_manager:
+            # The blob cannot be checked: treat the entry as a miss
+            return None
+        loop = asyncio.get_running_loop()
+        exists = await loop.run_in_executor(None, azure_storage_manager.blob_exists, entry["blob_name"])
+        if not exists:
+            await asyncio.to_thread(dedup_index.forget, source_hash, params)
+            return None
+    
+    return entry
+
+def cached_result(entry: dict, bg_color: Tuple[int, int, int], width: Optional[int]) -> dict:
+    """Build a result from a dedup index entry"""
+    return {
+        "size": (entry["width"], entry["height"]),
+        "width": width,
+        "format": format_name(entry["content_type"]),
+        "background_color": bg_color,
+        "azure_url": entry["url"],
+        "original_size": (entry["original_width"], entry["original_height"]),
+        "crop_box": entry["crop_box"]
+    }
+
+def format_name(content_type: str) -> str:
+    """Short format name of an encoded image (e.g. image/webp -> webp)"""
+    return content_type.split("/")[-1]
+
+def requested_outputs(widths: Optional[List[int]] = None,
+                      formats: Optional[List[str]] = None) -> List[Tuple[Optional[int], Optional[str]]]:
+    """(width, format) of each result, in the order returned by squareify_source"""
+    return [
+        (width, output_format)
+        for width in (widths or [None])
+        for output_format in (list(dict.fromkeys(formats)) if formats else [None])
+    ]
+
+async def render_image(url: str, bg_color: Tuple[int, int, int], widths: Optional[List[int]] = None,
+                       formats: Optional[List[str]] = None,
+                       trim_tolerance: Optional[int] = None) -> Tuple[str, Optional[List[dict]], Optional[List[SquareifyResult]]]:
+    """
+    Download and process a source image, independently of the SKU using it
+    
+    Returns:
+        Tuple: Source hash, then either the dedup entries of every requested width
+        and format (already uploaded) or the processed results to upload
+    """
+    loop = asyncio.get_running_loop()
+    requested = requested_outputs(widths, formats)
+    
+    # Download image into memory over the pooled client; unchanged cached
+    # sources only cost a conditional request
+    try:
+        download = await image_downloader.fetch(url)
+    except DownloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data = download.data
+    
+    # Same source bytes and parameters already processed: reuse the existing blobs
+    source_hash = download.source_hash or await loop.run_in_executor(processing_executor, hash_source, data)
+    cached = [
+        await find_processed_image(source_hash, processing_params(bg_color, width, output_format, trim_tolerance))
+        for width, output_format in requested
+    ]
+    if all(cached):
+        return source_hash, cached, None
+    
+    # Offload CPU-bound decoding and encoding to the bounded executor
+    results = await loop.run_in_executor(
+        processing_executor, squareify_source, data, bg_color, widths, download.probe, formats, trim_tolerance
+    )
+    return source_hash, None, results
+
+async def produce_image(url: str, product_name: str, variation_name: str,
+                        bg_color: Tuple[int, int, int], widths: Optional[List[int]] = None,
+                        formats: Optional[List[str]] = None,
+                        trim_tolerance: Optional[int] = None) -> List[dict]:
+    """Download, process and upload a source image, returning one uploaded result per width and format"""
+    requested = requested_outputs(widths, formats)
+    
+    # Concurrent requests for the same URL and parameters share one download and
+    # squareify, whatever their SKU (e.g. a hero image reused by several products);
+    # each SKU then uploads the shared result under its own blob names
+    flight_key = (
+        url,
+        json.dumps(processing_params(bg_color, trim_tolerance=trim_tolerance), sort_keys=True),
+        tuple(widths or ()),
+        tuple(formats or ())
+    )
+    source_hash, cached, results = await image_flights.do(
+        flight_key, lambda: render_image(url, bg_color, widths, formats, trim_tolerance)
+    )
+    if cached:
+        return [
+            cached_result(entry, bg_color, width)
+            for entry, (width, _) in zip(cached, requested)
+        ]
+
+    # Generate blob names using naming convention: product_name + variation_name + unique_id + SLY + size
+    # (all widths of a source share the same unique id)
+    unique_id = naming_convention._generate_unique_id()
+    
+    # Normalize product name and variation name
+    normalized_product_name = naming_convention._normalize_product_name(product_name)
+    normalized_variation_name = naming_convention._normalize_product_name(variation_name)
+    
+    # The extension is the one of the encoded format (square sources may keep theirs)
+    blob_names = [
+        f"{normalized_product_name}_{normalized_variation_name}_{unique_id}_SLY_"
+        f"{width or result.dimensions[0]}{extension_for(result.format)}"
+        for (width, _), result in zip(requested, results)
+    ]
+    
+    # Upload every width to Azure (without SAS for public access) in the background pipeline
+    azure_urls = await asyncio.gather(*(
+        upload_to_azure_blob(result.data, blob_name, result.content_type)
+        for result, blob_name in zip(results, blob_names)
+    ))
+    
+    produced = []
+    for (width, output_format), result, blob_name, azure_url in zip(requested, results, blob_names, azure_urls):
+        if dedup_index:
+            await asyncio.to_thread(
+                dedup_index.record, source_hash, processing_params(bg_color, width, output_format, trim_tolerance),
+                blob_name, azure_url, result.content_type, result.dimensions, result.original_size, result.crop_box
             )
+        produced.append({
+            "size": result.dimensions,
+            "width": width,
+            "format": format_name(result.content_type),
+            "background_color": bg_color,
+            "azure_url": azure_url,
+            "original_size": result.original_size,
+            "crop_box": result.crop_box
+        })
+    
+    return produced
+
+async def process_and_upload_image(product_image: ProductImage, product_name: str,
+                                   widths: Optional[List[int]] = None,
+                                   formats: Optional[List[str]] = None,
+                                   trim_tolerance: Optional[int] = None) -> List[dict]:
+    """Download, process and upload a single image variation, in every requested width and format"""
+    bg_color = (255, 255, 255)  # Default white background
+    
+    produced = await produce_image(product_image.url, product_name, product_image.variation_name, bg_color,
+                                   widths, formats, trim_tolerance)
+    
+    return [
+        {
+            "variation_name": product_image.variation_name,
+            **variant
+        }
+        for variant in produced
+    ]
 
-            # Generate blob name using naming convention: product_name + variation_name + unique_id + SLY + size
-            unique_id = naming_convention._generate_unique_id()
-            
-            # Normalize product name and variation name
-            normalized_product_name = naming_convention._normalize_product_name(product_name)
-            normalized_variation_name = naming_convention._normalize_product_name(product_image.variation_name)
-            
-            blob_name = f"{normalized_product_name}_{normalized_variation_name}_{unique_id}_SLY_{target_size[0]}.jpg"
-            
-            # Upload to Azure (without SAS for public access)
-            azure_url = upload_to_azure_blob(tmp_out_path, blob_name)
-            
-            processed_variations.append({
-                "variation_name": product_image.variation_name,
-                "size": target_size,
-                "background_color": (255, 255, 255),
-                "azure_url": azure_url,
-                "original_size": (original_width, original_height)
-            })
-            
-            os.remove(tmp_out_path)
-                
-        finally:
-            os.remove(tmp_in_path)
-    
-    return processed_variations
+async def process_and_upload_image_variations(product_images: List[ProductImage], product_name: str,
+                                              widths: Optional[List[int]] = None,
+                                              formats: Optional[List[str]] = None,
+                                              trim_tolerance: Optional[int] = None) -> List[dict]:
+    """Download, process and upload image variations to Azure Storage concurrently"""
+    produced = await asyncio.gather(*(
+        process_and_upload_image(product_image, product_name, widths, formats, trim_tolerance)
+        for product_image in product_images
+    ))
+    return [variant for variants in produced for variant in variants]
+
+async def process_product(product_request: ProductRequest, widths: Optional[List[int]] = None,
+                          formats: Optional[List[str]] = None,
+                          trim_tolerance: Optional[int] = None) -> List[ImageResult]:
+    """Process all images of a product and build their results"""
+    try:
+        variations = await process_and_upload_image_variations(
+            product_request.images_list,
+            product_request.product_name,
+            widths,
+            formats,
+            trim_tolerance
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error processing product {product_request.product_name}: {str(e)}"
+        )
+    
+    return [
+        ImageResult(
+            url=variation['azure_url'],
+            variation_name=variation['variation_name'],
+            width=variation['width'],
+            format=variation['format']
+        )
+        for variation in variations
+    ]
 
 @router.post("/process-batch", response_model=BatchResponse)
-def process_batch(data: BatchRequest):
+async def process_batch(data: BatchRequest):
     """
     Process and upload product images to Azure Storage.
     
+    Products and their variations are downloaded and processed concurrently.
+    
     Expected request format:
     {
       "products": [
@@ -164,35 +463,110 @@ def process_batch(data: BatchRequest):
             }
           ]
         }
-      ]
+      ],
+      "widths": [1500, 750, 300, 150],
+      "formats": ["avif", "webp", "jpeg"],
+      "trim_tolerance": 16
     }
+    
+    `widths` is optional: when set, every image is produced in each width from
+    a single decode, and each width is returned as its own result.
+    `formats` is optional: when set, every width is encoded in each format
+    ("jpeg", "webp", "avif") from the same canvas, one result per format.
+    `trim_tolerance` is optional: when set, solid-colour margins (within this
+    tolerance of the top-left pixel) are cropped before squareifying.
     """
-    results = []
+    product_results = await asyncio.gather(*(
+        process_product(product_request, data.widths, data.formats, data.trim_tolerance)
+        for product_request in data.products
+    ))
     
-    for product_request in data.products:
-        try:
-            variations = process_and_upload_image_variations(
-                product_request.images_list,
-                product_request.product_name
-            )
-            
-            # Add all processed results to the response
-            for variation in variations:
-                results.append(ImageResult(
-                    url=variation['azure_url'],
-                    variation_name=variation['variation_name']
-                ))
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Error processing product {product_request.product_name}: {str(e)}"
-            )
+    # Keep results in request order
+    results = [result for product_result in product_results for result in product_result]
     
     return BatchResponse(processed_images=results)
 
+async def process_stream_item(product_image: ProductImage, product_name: str,
+                              widths: Optional[List[int]] = None,
+                              formats: Optional[List[str]] = None,
+                              trim_tolerance: Optional[int] = None) -> List[Union[StreamedImageResult, StreamedImageError]]:
+    """Process one image and turn its outcome into stream events (one per width and format)"""
+    try:
+        variations = await process_and_upload_image(product_image, product_name, widths, formats, trim_tolerance)
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        return [StreamedImageError(
+            product_name=product_name,
+            variation_name=product_image.variation_name,
+            source_url=product_image.url,
+            error=detail
+        )]
+    
+    return [
+        StreamedImageResult(
+            url=variation['azure_url'],
+            variation_name=variation['variation_name'],
+            width=variation['width'],
+            format=variation['format'],
+            product_name=product_name
+        )
+        for variation in variations
+    ]
+
+def format_stream_event(event: BaseModel, stream_format: str) -> str:
+    """Serialize an event as an NDJSON line or a Server-Sent Event"""
+    payload = event.model_dump_json()
+    if stream_format == "sse":
+        return f"event: {event.type}\ndata: {payload}\n\n"
+    return f"{payload}\n"
+
+async def stream_batch_events(data: BatchRequest, stream_format: str) -> AsyncIterator[str]:
+    """Yield one event per image as soon as it is uploaded, then a summary"""
+    tasks = [
+        asyncio.ensure_future(process_stream_item(product_image, product_request.product_name,
+                                                  data.widths, data.formats, data.trim_tolerance))
+        for product_request in data.products
+        for product_image in product_request.images_list
+    ]
+    processed = 0
+    errors = 0
+    
+    try:
+        for next_events in asyncio.as_completed(tasks):
+            for event in await next_events:
+                if isinstance(event, StreamedImageError):
+                    errors += 1
+                else:
+                    processed += 1
+                yield format_stream_event(event, stream_format)
+        
+        yield format_stream_event(StreamSummary(processed=processed, errors=errors), stream_format)
+    finally:
+        # Client disconnected: stop the remaining work
+        for task in tasks:
+            task.cancel()
+
+@router.post("/process-batch/stream")
+async def process_batch_stream(data: BatchRequest, format: Literal["ndjson", "sse"] = "ndjson"):
+    """
+    Process and upload product images, streaming results as they complete.
+    
+    Each image produces one event per width and format as soon as it is uploaded (or one
+    error event if it fails), so a failing image does not discard the others. The stream ends with a summary.
+    
+    Events (NDJSON lines, or SSE with the event name set to `type`):
+    {"type": "result", "url": "...", "variation_name": "main", "width": null, "format": "jpeg", "product_name": "..."}
+    {"type": "error", "product_name": "...", "variation_name": "detail", "source_url": "...", "error": "..."}
+    {"type": "summary", "processed": 1, "errors": 1}
+    """
+    return StreamingResponse(
+        stream_batch_events(data, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/process-urls")
-def process_urls_legacy(data: dict):
+async def process_urls_legacy(data: dict):
     """Legacy endpoint - converts old format to new format"""
     urls = data.get("urls", [])
     if isinstance(urls, str):
@@ -209,19 +583,31 @@ def process_urls_legacy(data: dict):
         product_name="legacy_product",
         images_list=images
     )
-    batch_response = process_batch(BatchRequest(products=[product_request]))
+    batch_response = await process_batch(BatchRequest(products=[product_request]))
     
     # Convert to legacy format for backward compatibility
     return {
         "azure_urls": [result.url for result in batch_response.processed_images]
     }
 
+async def shutdown():
+    """Release pooled HTTP connections and processing threads"""
+    await image_downloader.close()
+    processing_executor.shutdown(wait=False)
+    if upload_pipeline:
+        upload_pipeline.close()
+    if dedup_index:
+        dedup_index.close()
+    if download_cache:
+        download_cache.close()
+
 @router.get("/info")
 def get_image_info():
     """Get information about image processing configuration"""
     return {
         "target_size": [750, 750],
         "background_color": [255, 255, 255],
-        "azure_container": AZURE_CONTAINER_NAME,
-        "supported_formats": [".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tiff"]
+        "azure_container": azure_storage_manager.container_name if azure_storage_manager else None,
+        "supported_formats": [".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tiff"],
+        "output_formats": [name for name, output_format in OUTPUT_FORMATS.items() if output_format.available]
     }
@@ -0,0 +1,139 @@
+"""
+Job routes for YoobuMorph FastAPI application
+============================================
+
+This module contains endpoints for submitting large batches as background jobs.
+A job is accepted immediately, a bounded pool of workers drains a local queue
+image by image, and progress is persisted in SQLite so a restart resumes it.
+"""
+
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+
+from routes import images
+from routes.images import BatchRequest, ProductImage
+from utils.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/images/jobs", tags=["jobs"])
+
+JOBS_DB_PATH = os.getenv('YOOBUMORPH_JOBS_DB', 'data/jobs.sqlite3')
+JOB_WORKERS = int(os.getenv('YOOBUMORPH_JOB_WORKERS', '4'))
+
+job_store: Optional[JobStore] = None
+job_queue: Optional[asyncio.Queue] = None
+worker_tasks: List[asyncio.Task] = []
+
+async def process_job_item(job_id: str, item_index: int):
+    """Process one queued image and record its outcome"""
+    # SQLite calls run in a thread, so they never block the event loop
+    item = await asyncio.to_thread(job_store.get_item, job_id, item_index)
+    if item is None:
+        return
+
+    await asyncio.to_thread(job_store.start_item, job_id, item_index)
+    product_image = ProductImage(url=item["source_url"], variation_name=item["variation_name"])
+
+    try:
+        variations = await images.process_and_upload_image_variations(
+            [product_image], item["product_name"], item["options"].get("widths"),
+            item["options"].get("formats"), item["options"].get("trim_tolerance")
+        )
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"❌ Job {job_id} item {item_index} failed: {detail}")
+        await asyncio.to_thread(job_store.finish_item, job_id, item_index, error=detail)
+        return
+
+    results = [
+        {"width": variation["width"], "format": variation["format"], "url": variation["azure_url"]}
+        for variation in variations
+    ]
+    await asyncio.to_thread(
+        job_store.finish_item, job_id, item_index,
+        result_url=variations[0]["azure_url"],
+        results=results if len(results) > 1 else None,
+        crop_box=variations[0]["crop_box"]
+    )
+
+async def job_worker():
+    """Drain the job queue until cancelled"""
+    while True:
+        job_id, item_index = await job_queue.get()
+        try:
+            await process_job_item(job_id, item_index)
+        except Exception as e:
+            logger.error(f"❌ Job worker error on {job_id}/{item_index}: {str(e)}")
+        finally:
+            job_queue.task_done()
+
+async def start_workers():
+    """Open the job store, start the workers and re-enqueue unfinished work"""
+    global job_store, job_queue
+    job_store = await asyncio.to_thread(JobStore, JOBS_DB_PATH)
+    job_queue = asyncio.Queue()
+
+    unfinished = await asyncio.to_thread(job_store.unfinished_items)
+    for entry in unfinished:
+        job_queue.put_nowait(entry)
+    if unfinished:
+        logger.info(f"Resuming {len(unfinished)} unfinished job items")
+
+    for _ in range(JOB_WORKERS):
+        worker_tasks.append(asyncio.create_task(job_worker()))
+
+async def stop_workers():
+    """Stop the workers; unfinished items stay persisted for the next start"""
+    for task in worker_tasks:
+        task.cancel()
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    worker_tasks.clear()
+    if job_store:
+        await asyncio.to_thread(job_store.close)
+
+@router.post("", status_code=202)
+async def create_job(data: BatchRequest) -> Dict[str, Any]:
+    """
+    Submit a batch as a background job and return its id immediately.
+
+    Accepts the same body as POST /images/process-batch.
+    """
+    if job_store is None:
+        raise HTTPException(status_code=503, detail="Job workers not started")
+
+    items = [
+        {
+            "product_name": product_request.product_name,
+            "variation_name": product_image.variation_name,
+            "source_url": product_image.url
+        }
+        for product_request in data.products
+        for product_image in product_request.images_list
+    ]
+    options = {"widths": data.widths, "formats": data.formats, "trim_tolerance": data.trim_tolerance}
+    job_id = await asyncio.to_thread(job_store.create_job, items, options)
+
+    for item_index in range(len(items)):
+        job_queue.put_nowait((job_id, item_index))
+
+    return {
+        "job_id": job_id,
+        "status": "queued" if items else "completed",
+        "total": len(items)
+    }
+
+@router.get("/{job_id}")
+def get_job(job_id: str) -> Dict[str, Any]:
+    """Get the status, per-image progress and results of a job"""
+    if job_store is None:
+        raise HTTPException(status_code=503, detail="Job workers not started")
+
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    return job
@@ -5,8 +5,11 @@ Traitement en batch des images pour YoobuMorph
 
 import sys
 import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, List
+from collections import deque
+from typing import Dict, Iterable, Iterator, Tuple, List, Optional
 from PIL import Image
 
 # Ajouter le répertoire parent au path pour les imports
@@ -15,103 +18,593 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from utils.logging_config import get_logger
+from src.build_index import BuildIndex
+from src.image_probe import ImageProbe, ProbeError, UnknownFormatError, probe_file
 from src.image_processor import ImageProcessor
+from src.memory_budget import STRIP_THRESHOLD_FRACTION, MemoryBudget
+from src.output_format import DEFAULT_OUTPUT_FORMAT, get_output_formats
+from src.quality_search import QUALITY_MEMO_FILENAME, QualityMemo, QualityTarget
+from src.strip_reader import BandReader
 from src.file_manager import FileManager
 from src.naming_convention import NamingConvention
+from src.run_journal import RunJournal
+from utils.azure_storage import UploadPipeline, guess_content_type
 
 logger = get_logger()
 
+# Nombre maximal d'images de mêmes dimensions carréifiées en un seul lot
+DEFAULT_BATCH_SIZE = 16
+
+
+@dataclass
+class ImageJob:
+    """Tâche de traitement d'une image source"""
+    image_path: Path
+    output_paths: Dict[int, List[Path]]  # Chemins de sortie par largeur cible (un par format)
+    bg_color: Tuple[int, int, int]
+    estimated_bytes: int = 0  # Mémoire maximale estimée d'après l'en-tête
+    strips: bool = False  # Image volumineuse: canevas construit en bandes
+    shape: Optional[Tuple[int, int, str]] = None  # (largeur, hauteur, mode) lus dans l'en-tête
+    trim_tolerance: Optional[int] = None  # Rognage des marges avant carréification (None = désactivé)
+
+    @property
+    def outputs(self) -> List[Path]:
+        """Tous les fichiers produits par la tâche"""
+        return [output_path for paths in self.output_paths.values() for output_path in paths]
+
+
+# ImageProcessor propre à chaque processus worker
+_worker_image_processor: Optional[ImageProcessor] = None
+
+
+def _init_worker(quality_target: Optional[QualityTarget] = None, quality_memo_path: Optional[Path] = None):
+    """Initialise l'ImageProcessor du processus worker"""
+    global _worker_image_processor
+    _worker_image_processor = _create_image_processor(quality_target, quality_memo_path)
+
+
+def _create_image_processor(quality_target: Optional[QualityTarget],
+                            quality_memo_path: Optional[Path]) -> ImageProcessor:
+    """ImageProcessor avec, si un objectif de qualité est donné, la mémoire des qualités partagée"""
+    if quality_target is None:
+        return ImageProcessor()
+    # Chaque processus ouvre sa propre connexion à la base SQLite
+    return ImageProcessor(quality_target, QualityMemo(quality_memo_path))
+
+
+def _run_image_job(image_processor: ImageProcessor, job: ImageJob) -> Optional[str]:
+    """
+    Exécute une tâche de carréification
+
+    Returns:
+        Optional[str]: Message d'erreur, ou None si l'image a été traitée
+    """
+    try:
+        if job.strips:
+            image_processor.squareify_image_strips(job.image_path, job.output_paths, job.bg_color,
+                                                   job.trim_tolerance)
+        else:
+            # Toutes les largeurs sont produites à partir d'un seul décodage
+            image_processor.squareify_image_variants(job.image_path, job.output_paths, job.bg_color,
+                                                     job.trim_tolerance)
+        return None
+    except Exception as e:
+        return f"Erreur lors du traitement de {job.image_path.name}: {str(e)}"
+
+
+def _run_image_task(image_processor: ImageProcessor, task: List[ImageJob],
+                    encode_threads: int) -> List[Optional[str]]:
+    """
+    Exécute une tâche seule, ou un lot de tâches d'images de mêmes dimensions
+
+    Returns:
+        List[Optional[str]]: Message d'erreur de chaque tâche, ou None si l'image a été traitée
+    """
+    if len(task) == 1:
+        return [_run_image_job(image_processor, task[0])]
+
+    errors = image_processor.squareify_uniform_batch(
+        [job.image_path for job in task], [job.output_paths for job in task],
+        task[0].bg_color, encode_threads, task[0].trim_tolerance
+    )
+    return [
+        None if error is None else f"Erreur lors du traitement de {job.image_path.name}: {str(error)}"
+        for job, error in zip(task, errors)
+    ]
+
+
+def _process_image_task(task: List[ImageJob], encode_threads: int) -> List[Optional[str]]:
+    """Point d'entrée des workers du pool de processus"""
+    return _run_image_task(_worker_image_processor, task, encode_threads)
+
 
 class BatchProcessor:
     """Gestionnaire du traitement en batch d'images"""
     
-    def __init__(self, source_dir: str, output_base_dir: str):
+    def __init__(self, source_dir: str, output_base_dir: str, workers: Optional[int] = None,
+                 upload_pipeline: Optional[UploadPipeline] = None, scan_workers: int = 1,
+                 incremental: bool = True, force: bool = False, prune: bool = False,
+                 resume: bool = False, retry_errors: bool = False,
+                 memory_budget: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 trim_tolerance: Optional[int] = None, quality_target: Optional[QualityTarget] = None,
+                 output_formats: Optional[List[str]] = None):
         self.source_dir = Path(source_dir)
         self.output_base_dir = Path(output_base_dir)
-        self.image_processor = ImageProcessor()
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Threads parcourant les dossiers de produits en parallèle (dossiers réseau)
+        self.scan_workers = max(1, scan_workers)
+        # Si fourni, chaque image produite est aussi envoyée sur Azure en arrière-plan
+        self.upload_pipeline = upload_pipeline
+        # Objectif de la recherche de qualité JPEG/WebP (None = qualité fixe), avec les
+        # qualités choisies mémorisées par source dans le dossier de sortie
+        self.quality_target = quality_target
+        self.quality_memo_path = self.output_base_dir / QUALITY_MEMO_FILENAME
+        self.image_processor = _create_image_processor(quality_target, self.quality_memo_path)
+        # Budget de RAM des images traitées en même temps (octets, None = automatique)
+        self.memory_budget = MemoryBudget(memory_budget)
+        # Images de mêmes dimensions et mode carréifiées ensemble (1 = désactivé),
+        # avec les coeurs restants répartis en threads d'encodage dans chaque worker
+        self.batch_size = max(1, batch_size)
+        self.encode_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # Tolérance du rognage des marges de couleur unie (None = pas de rognage)
+        self.trim_tolerance = trim_tolerance
+        # Formats produits pour chaque largeur, encodés à partir du même canevas
+        self.output_formats = get_output_formats(output_formats)
         self.file_manager = FileManager()
         self.naming_convention = NamingConvention()
         
+        # Index des sources déjà traitées: seules les sources nouvelles ou modifiées
+        # sont retraitées, avec les mêmes noms de fichiers
+        self.build_index = BuildIndex(self.output_base_dir) if incremental else None
+        self.force = force  # Retraiter aussi les sources inchangées
+        self.prune = prune  # Supprimer les sorties des sources supprimées
+        
+        # Journal d'exécution: reprise après interruption et retraitement des erreurs
+        self.journal = RunJournal(self.output_base_dir)
+        self.resume = resume  # Ignorer les sources déjà traitées par l'exécution interrompue
+        self.retry_errors = retry_errors  # Ne traiter que les sources en erreur lors de l'exécution précédente
+        # Identifiants attribués par une exécution interrompue (ou aux sources en erreur,
+        # dont l'envoi a pu échouer après l'écriture des fichiers): réutilisés pour que
+        # les fichiers déjà produits soient écrasés, pas dupliqués
+        self.interrupted_ids = dict(self.journal.planned)
+        if self.journal.finished:
+            self.interrupted_ids = {
+                key: unique_id for key, unique_id in self.interrupted_ids.items() if key in self.journal.errors
+            }
+        self.naming_convention.generated_ids.update(self.interrupted_ids.values())
+        if self.build_index and not self.journal.finished:
+            # Exécution interrompue avant l'enregistrement de l'index: le compléter
+            for key, event in self.journal.completed.items():
+                if event.get('index'):
+                    self.build_index.restore(key, event['index'])
+            self.build_index.save()
+        
+        if self.build_index:
+            self.naming_convention.generated_ids.update(self.build_index.unique_ids())
+        
         # Le dossier de sortie sera généré automatiquement selon le nom du dossier source
         # Pas besoin de le créer ici, il sera créé pour chaque image
     
     def process_batch(self, target_size: Tuple[int, int] = (750, 750), 
-                     bg_color: Tuple[int, int, int] = (255, 255, 255)):
+                     bg_color: Tuple[int, int, int] = (255, 255, 255),
+                     target_widths: Optional[List[int]] = None):
         """
         Traite en batch toutes les images du dossier source
         
         Args:
             target_size: Taille cible pour les images carrées (largeur, hauteur)
             bg_color: Couleur de fond pour les bordures (R, G, B)
+            target_widths: Largeurs à produire pour chaque image (ex: [1500, 750, 300, 150]);
+                           par défaut, seulement la largeur de target_size
         """
-        self._log_batch_start(target_size)
+        target_widths = target_widths or [target_size[0]]
+        self._log_batch_start(target_size, target_widths)
+        
+        params = self._processing_params(bg_color, target_widths)
+        completed_keys = self._resumable_keys(params)
         
-        # Récupérer toutes les images du dossier source
-        image_files = self.file_manager.get_image_files(self.source_dir)
+        if self.retry_errors:
+            image_files = self._previous_error_files()
+            if not image_files:
+                logger.info("Aucune erreur à retraiter dans l'exécution précédente")
+                return
+        else:
+            # Les images sont traitées au fur et à mesure de la découverte,
+            # sans attendre la fin du parcours du dossier source
+            image_files = self.file_manager.iter_image_files(self.source_dir, workers=self.scan_workers)
         
-        if not image_files:
+        self.journal.open(params, resume=bool(completed_keys))
+        seen_keys = set()
+        finished = False
+        try:
+            found_count, skipped_count, processed_count, errors = self._process_images(
+                image_files, target_widths, bg_color, seen_keys, completed_keys
+            )
+            # Le nettoyage suppose un parcours complet du dossier source
+            if self.build_index and self.prune and not self.retry_errors:
+                removed = self.build_index.prune(seen_keys, self.source_dir)
+                logger.info(f"Sorties supprimées (sources absentes): {len(removed)}")
+            finished = True
+        finally:
+            if self.build_index:
+                self.build_index.save()
+            self.journal.close(finished=finished)
+        
+        if not found_count:
             logger.warning("Aucune image trouvée dans le dossier source")
             return
         
-        logger.info(f"Nombre d'images à traiter: {len(image_files)}")
-        
-        processed_count, errors = self._process_images(image_files, target_size, bg_color)
+        logger.info(f"Nombre d'images trouvées: {found_count}")
+        if skipped_count:
+            logger.info(f"Images inchangées ou déjà traitées (non retraitées): {skipped_count}")
         self._log_batch_summary(processed_count, errors)
     
-    def _log_batch_start(self, target_size: Tuple[int, int]):
+    def _processing_params(self, bg_color: Tuple[int, int, int], target_widths: List[int]) -> dict:
+        """Paramètres qui déterminent les images produites (index de construction et journal)"""
+        params = {'bg_color': list(bg_color), 'widths': sorted(target_widths)}
+        if self.trim_tolerance is not None:
+            # Absent sans rognage: les index existants restent valides
+            params['trim'] = self.trim_tolerance
+        if self.quality_target is not None:
+            params['quality'] = self.quality_target.key
+        if [output_format.name for output_format in self.output_formats] != [DEFAULT_OUTPUT_FORMAT]:
+            params['formats'] = [output_format.name for output_format in self.output_formats]
+        return params
+    
+    def _resumable_keys(self, params: dict) -> set:
+        """
+        Sources déjà traitées par l'exécution interrompue, à ignorer avec --resume
+        
+        Args:
+            params: Paramètres de traitement de l'exécution courante
+            
+        Returns:
+            set: Clés des sources à ignorer (vide si la reprise n'est pas possible)
+        """
+        if not self.resume:
+            return set()
+        if self.journal.finished:
+            logger.info("L'exécution précédente s'est terminée: rien à reprendre")
+            return set()
+        if self.journal.params != params:
+            logger.warning("Paramètres différents de l'exécution interrompue: traitement complet")
+            return set()
+        
+        logger.info(f"Reprise: {len(self.journal.completed)} sources déjà traitées")
+        return set(self.journal.completed)
+    
+    def _previous_error_files(self) -> List[Path]:
+        """Sources en erreur lors de l'exécution précédente, encore présentes sur le disque"""
+        image_files = []
+        resolved_source_dir = self.source_dir.resolve()
+        for key in self.journal.errors:
+            image_path = Path(key)
+            # Les clés du journal sont des chemins absolus: les rattacher au dossier
+            # source tel qu'il a été donné, pour que le nom de produit et le dossier
+            # de sortie soient les mêmes que lors du parcours du dossier
+            try:
+                image_path = self.source_dir / image_path.relative_to(resolved_source_dir)
+            except ValueError:
+                pass
+            if image_path.exists():
+                image_files.append(image_path)
+            else:
+                logger.warning(f"Source en erreur introuvable, ignorée: {image_path}")
+        logger.info(f"Sources en erreur à retraiter: {len(image_files)}")
+        return image_files
+    
+    def _log_batch_start(self, target_size: Tuple[int, int], target_widths: List[int]):
         """Log les informations de début de traitement"""
         logger.info(f"Début du traitement en batch")
         logger.info(f"Dossier source: {self.source_dir}")
         logger.info(f"Dossier de base de sortie: {self.output_base_dir}")
         logger.info(f"Taille cible: {target_size}")
+        if len(target_widths) > 1:
+            logger.info(f"Largeurs produites: {target_widths}")
+        logger.info(f"Workers: {self.workers}")
     
-    def _process_images(self, image_files: List[Path], target_size: Tuple[int, int], 
-                       bg_color: Tuple[int, int, int]) -> Tuple[int, List[str]]:
+    def _process_images(self, image_files: Iterable[Path], target_widths: List[int], 
+                       bg_color: Tuple[int, int, int],
+                       seen_keys: Optional[set] = None,
+                       completed_keys: Optional[set] = None) -> Tuple[int, int, int, List[str]]:
         """
-        Traite la liste d'images
+        Traite les images au fur et à mesure qu'elles sont fournies
         
         Args:
-            image_files: Liste des chemins d'images à traiter
-            target_size: Taille cible
+            image_files: Chemins d'images à traiter (liste ou générateur)
+            target_widths: Largeurs cibles
             bg_color: Couleur de fond
+            seen_keys: Reçoit les clés d'index des sources rencontrées
+            completed_keys: Clés des sources déjà traitées (reprise), ignorées
             
         Returns:
-            Tuple (nombre_traitées, liste_erreurs)
+            Tuple (nombre_trouvées, nombre_inchangées, nombre_traitées, liste_erreurs)
         """
-        processed_count = 0
         errors = []
+        found = [0]
+        skipped = [0]
+        params = self._processing_params(bg_color, target_widths)
+        # Source en cours de traitement → (état dans l'index, identifiant utilisé)
+        planned = {}
+        if seen_keys is None:
+            seen_keys = set()
+        completed_keys = completed_keys or set()
+        
+        def plan_jobs() -> Iterator[ImageJob]:
+            # Les noms sont générés dans le processus principal: le cache d'identifiants
+            # de NamingConvention reste unique, même avec plusieurs workers
+            for image_path in image_files:
+                found[0] += 1
+                key = BuildIndex.source_key(image_path)
+                if key in completed_keys:
+                    seen_keys.add(key)
+                    skipped[0] += 1
+                    continue
+                try:
+                    state = None
+                    if self.build_index:
+                        state = self.build_index.check(image_path, params)
+                        seen_keys.add(state.key)
+                        if not state.changed and not self.force:
+                            self.build_index.refresh(state)
+                            skipped[0] += 1
+                            continue
+                    
+                    unique_id = state and state.unique_id
+                    if not unique_id:
+                        unique_id = self.interrupted_ids.get(key) or self.naming_convention._generate_unique_id()
+                        self.journal.record_planned(key, unique_id)
+                    job = self._plan_image_job(image_path, target_widths, bg_color, unique_id)
+                    if state:
+                        planned[image_path] = (state, unique_id)
+                    yield job
+                except Exception as e:
+                    error_msg = f"Erreur lors du traitement de {image_path.name}: {str(e)}"
+                    logger.error(error_msg)
+                    errors.append(error_msg)
+                    self.journal.record_error(key, error_msg)
+        
+        def record_processed(image_path: Path, outputs: List[Path], index_entry: Optional[tuple]):
+            recorded = None
+            if index_entry:
+                state, unique_id = index_entry
+                recorded = self.build_index.record(state, params, unique_id, outputs)
+            self.journal.record_done(
+                BuildIndex.source_key(image_path),
+                [str(output_path) for output_path in outputs],
+                recorded
+            )
+            processed[0] += 1
+        
+        def record_error(image_path: Path, error_msg: str):
+            logger.error(error_msg)
+            errors.append(error_msg)
+            self.journal.record_error(BuildIndex.source_key(image_path), error_msg)
+        
+        def finish_uploads(wait: bool):
+            # Une source n'est journalisée comme traitée (et inscrite dans l'index de
+            # construction) qu'une fois toutes ses sorties envoyées: un envoi en échec
+            # la laisse en erreur, retraitée par --retry-errors et par l'exécution suivante
+            still_uploading = []
+            for image_path, outputs, index_entry, futures in uploading:
+                if not wait and not all(future.done() for future in futures):
+                    still_uploading.append((image_path, outputs, index_entry, futures))
+                    continue
+                upload_errors = []
+                for output_path, future in zip(outputs, futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        upload_errors.append(f"Erreur lors de l'envoi de {output_path.name}: {str(e)}")
+                if upload_errors:
+                    record_error(image_path, "; ".join(upload_errors))
+                else:
+                    record_processed(image_path, outputs, index_entry)
+            uploading[:] = still_uploading
+        
+        # Les résultats sont collectés dans l'ordre des tâches; les envois Azure
+        # partent au fil de l'eau pendant que les workers continuent d'encoder
+        processed = [0]
+        uploading = []
+        for job, error_msg in self._run_jobs(plan_jobs()):
+            image_path, outputs = job.image_path, job.outputs
+            index_entry = planned.pop(image_path, None)
+            if error_msg is not None:
+                record_error(image_path, error_msg)
+                continue
+            
+            for output_path in outputs:
+                logger.info(f"✓ Traité: {output_path.name} dans {output_path.parent.name}")
+            if self.upload_pipeline:
+                futures = [self._submit_upload(output_path) for output_path in outputs]
+                uploading.append((image_path, outputs, index_entry, futures))
+                finish_uploads(wait=False)
+            else:
+                record_processed(image_path, outputs, index_entry)
+        
+        # Attendre la fin des envois
+        finish_uploads(wait=True)
+        
+        return found[0], skipped[0], processed[0], errors
+    
+    def _plan_image_job(self, image_path: Path, target_widths: List[int],
+                        bg_color: Tuple[int, int, int], unique_id: Optional[str] = None) -> ImageJob:
+        """
+        Prépare la tâche d'une image: noms de fichiers et dossier de sortie
+        
+        Args:
+            image_path: Chemin de l'image source
+            target_widths: Largeurs cibles
+            bg_color: Couleur de fond
+            unique_id: Chaîne alphanumérique des noms de fichiers (générée si absente)
+            
+        Returns:
+            ImageJob: Tâche prête à être exécutée par un worker
+        """
+        logger.info(f"Traitement de: {image_path.name}")
+        
+        # Génération des noms de fichiers et du dossier de sortie selon la convention e-commerce
+        # (tous les formats partagent la même chaîne alphanumérique, seule l'extension change)
+        unique_id = unique_id or self.naming_convention._generate_unique_id()
+        output_paths = {width: [] for width in target_widths}
+        for output_format in self.output_formats:
+            filenames, output_dir_name = self.naming_convention.generate_variant_filenames(
+                image_path, self.source_dir, target_widths, unique_id, output_format.name
+            )
+            
+            # Créer le dossier de sortie spécifique dans le dossier de base
+            output_dir = self.output_base_dir / output_dir_name
+            output_dir.mkdir(parents=True, exist_ok=True)
+            
+            for width, filename in filenames.items():
+                output_paths[width].append(output_dir / filename)
         
-        for image_path in image_files:
+        # Mémoire estimée d'après l'en-tête, sans décoder l'image
+        probe = self._probe_source(image_path)
+        estimated_bytes, strips = self.memory_budget.plan(
+            probe, max(target_widths), reduced_decode=self.trim_tolerance is None
+        )
+        shape = (probe.width, probe.height, probe.mode) if probe else None
+        return ImageJob(image_path, output_paths, bg_color, estimated_bytes, strips, shape, self.trim_tolerance)
+    
+    def _probe_source(self, image_path: Path) -> Optional[ImageProbe]:
+        """
+        Lit les dimensions et le mode d'une image dans son en-tête
+        
+        Returns:
+            Optional[ImageProbe]: Informations d'en-tête, ou None si l'image est illisible
+            (l'erreur sera signalée par le traitement)
+        """
+        try:
+            return probe_file(image_path)
+        except (UnknownFormatError, ProbeError):
+            # Format non reconnu par la sonde, ou en-tête hors du début du fichier
+            # (TIFF dont le répertoire est écrit à la fin): en-tête lu par Pillow, sans décodage
             try:
-                logger.info(f"Traitement de: {image_path.name}")
-                
-                # Génération du nom de fichier et du dossier de sortie selon la convention e-commerce
-                new_filename, output_dir_name = self.naming_convention.generate_filename_and_output_dir(
-                    image_path, self.source_dir, target_size[0]
-                )
-                
-                # Créer le dossier de sortie spécifique dans le dossier de base
-                output_dir = self.output_base_dir / output_dir_name
-                output_dir.mkdir(parents=True, exist_ok=True)
-                
-                output_path = output_dir / new_filename
-                
-                # Traitement de l'image
-                self.image_processor.squareify_image(
-                    image_path, output_path, target_size, bg_color
-                )
-                
-                processed_count += 1
-                logger.info(f"✓ Traité: {new_filename} dans {output_dir_name}")
-                
-            except Exception as e:
-                error_msg = f"Erreur lors du traitement de {image_path.name}: {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
-        
-        return processed_count, errors
+                with BandReader(image_path) as reader:
+                    return ImageProbe(format=reader.format, width=reader.size[0], height=reader.size[1],
+                                      mode=reader.image.mode, streamable=reader.streamed)
+            except Exception:
+                return None
+        except OSError:
+            return None
     
+    def _group_uniform_jobs(self, jobs: Iterable[ImageJob]) -> Iterator[List[ImageJob]]:
+        """
+        Regroupe les tâches d'images de mêmes dimensions et mode en lots
+
+        Un lot est rendu dès qu'il atteint batch_size images ou que sa mémoire
+        estimée atteint le seuil du chemin en bandes; les lots incomplets sont
+        rendus à la fin du parcours, ou plus tôt si trop de tâches sont en attente.
+        Les images sans en-tête lisible ou traitées en bandes forment un lot seules.
+
+        Args:
+            jobs: Tâches à regrouper (liste ou générateur)
+
+        Yields:
+            List[ImageJob]: Lots de tâches (une seule tâche si elle ne peut pas être regroupée)
+        """
+        if self.batch_size == 1:
+            for job in jobs:
+                yield [job]
+            return
+
+        max_batch_bytes = self.memory_budget.limit * STRIP_THRESHOLD_FRACTION
+        max_waiting = self.batch_size * 4
+        groups: Dict[Tuple[int, int, str], List[ImageJob]] = {}
+        waiting = 0
 
+        for job in jobs:
+            if job.strips or job.shape is None:
+                yield [job]
+                continue
+
+            group = groups.setdefault(job.shape, [])
+            if group and sum(member.estimated_bytes for member in group) + job.estimated_bytes > max_batch_bytes:
+                waiting -= len(group)
+                yield groups.pop(job.shape)
+                group = groups.setdefault(job.shape, [])
+            group.append(job)
+            waiting += 1
+
+            if len(group) >= self.batch_size:
+                waiting -= len(group)
+                yield groups.pop(job.shape)
+            elif waiting > max_waiting:
+                # Trop de tâches en attente: rendre le plus grand lot incomplet
+                largest = max(groups, key=lambda shape: len(groups[shape]))
+                waiting -= len(groups[largest])
+                yield groups.pop(largest)
+
+        yield from groups.values()
+
+    def _run_jobs(self, jobs: Iterable[ImageJob]) -> Iterator[Tuple[ImageJob, Optional[str]]]:
+        """
+        Exécute les tâches, en parallèle si plusieurs workers sont configurés
+        
+        Les tâches sont regroupées en lots d'images de mêmes dimensions (voir
+        _group_uniform_jobs), puis soumises dès qu'elles sont disponibles; le
+        nombre de lots en attente est borné pour ne pas lire tout le dossier
+        source d'avance, et la somme de leurs estimations mémoire ne dépasse pas
+        le budget (un lot plus grand que le budget est exécuté seul).
+        
+        Args:
+            jobs: Tâches à exécuter (liste ou générateur)
+            
+        Yields:
+            Tuple[ImageJob, Optional[str]]: Chaque tâche et son message d'erreur,
+            lot par lot, dès que le lot est terminé
+        """
+        tasks = self._group_uniform_jobs(jobs)
+
+        if self.workers == 1:
+            for task in tasks:
+                yield from zip(task, _run_image_task(self.image_processor, task, self.encode_threads))
+            return
+        
+        max_pending = self.workers * 4
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.quality_target, self.quality_memo_path)) as executor:
+            for task in tasks:
+                task_bytes = sum(job.estimated_bytes for job in task)
+                # Rendre les résultats déjà prêts, ou attendre le plus ancien si la file est pleine
+                while pending and (pending[0][2].done() or len(pending) >= max_pending):
+                    yield from self._task_results(*pending.popleft())
+                # Attendre les lots en cours jusqu'à ce que la mémoire estimée du lot soit réservée
+                # (le budget peut être partagé: sans lot en cours, attendre sa libération)
+                while not self.memory_budget.try_acquire(task_bytes):
+                    if not pending:
+                        self.memory_budget.acquire(task_bytes)
+                        break
+                    yield from self._task_results(*pending.popleft())
+                pending.append((task, task_bytes,
+                                executor.submit(_process_image_task, task, self.encode_threads)))
+            
+            while pending:
+                yield from self._task_results(*pending.popleft())
+
+    def _task_results(self, task: List[ImageJob], task_bytes: int,
+                      future: "Future[List[Optional[str]]]") -> Iterator[Tuple[ImageJob, Optional[str]]]:
+        """Attend un lot soumis, libère sa mémoire réservée et rend le résultat de chaque tâche"""
+        try:
+            results = future.result()
+        finally:
+            self.memory_budget.release(task_bytes)
+        yield from zip(task, results)
+    
+    def _submit_upload(self, output_path: Path) -> "Future[str]":
+        """
+        Soumet une image produite au pipeline d'envoi Azure
+        
+        Args:
+            output_path: Chemin de l'image produite (son nom sert de nom de blob)
+            
+        Returns:
+            Future[str]: URL du blob une fois envoyé
+        """
+        content_type = guess_content_type(output_path.name)
+        return self.upload_pipeline.submit(output_path.read_bytes(), output_path.name, content_type)
     
     def _log_batch_summary(self, processed_count: int, errors: List[str]):
         """Log le résumé du traitement"""
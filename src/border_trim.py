@@ -0,0 +1,97 @@
+"""
+Module de rognage des marges pour YoobuMorph
+============================================
+
+Ce module détecte la zone utile d'une image dont les marges sont déjà d'une
+couleur unie (souvent blanches chez les fournisseurs), pour la rogner avant
+la carréification: le canevas n'ajoute alors des bordures qu'au contenu.
+
+La couleur des marges est celle du pixel en haut à gauche; un pixel fait
+partie des marges si aucun de ses canaux ne s'en écarte de plus de la
+tolérance. La détection est vectorisée avec NumPy et peut se faire bande par
+bande, pour le chemin en bandes.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Écart maximal (par canal, 0-255) entre un pixel de marge et la couleur des marges
+DEFAULT_TRIM_TOLERANCE = 16
+
+# Zone (gauche, haut, droite, bas), en coordonnées de l'image
+Box = Tuple[int, int, int, int]
+
+
+class ContentBoxScanner:
+    """Zone utile d'une image RGB, calculée au fil de ses bandes horizontales"""
+
+    def __init__(self, tolerance: int = DEFAULT_TRIM_TOLERANCE):
+        """
+        Args:
+            tolerance: Écart maximal par canal avec la couleur des marges
+        """
+        self.tolerance = tolerance
+        self._low: Optional[np.ndarray] = None
+        self._high: Optional[np.ndarray] = None
+        self._top: Optional[int] = None
+        self._bottom = 0
+        self._left: Optional[int] = None
+        self._right = 0
+        self._y = 0
+        self._width = 0
+
+    def add(self, band: Image.Image):
+        """Analyse la bande suivante (RGB, de haut en bas)"""
+        pixels = np.asarray(band)
+        if self._low is None:
+            # Couleur des marges: pixel en haut à gauche de l'image
+            reference = pixels[0, 0].astype(np.int16)
+            self._low = np.clip(reference - self.tolerance, 0, 255).astype(np.uint8)
+            self._high = np.clip(reference + self.tolerance, 0, 255).astype(np.uint8)
+            self._width = band.width
+
+        content = ((pixels < self._low) | (pixels > self._high)).any(axis=2)
+        rows = np.flatnonzero(content.any(axis=1))
+        if rows.size:
+            columns = np.flatnonzero(content.any(axis=0))
+            if self._top is None:
+                self._top = self._y + int(rows[0])
+                self._left = int(columns[0])
+            self._left = min(self._left, int(columns[0]))
+            self._right = max(self._right, int(columns[-1]) + 1)
+            self._bottom = self._y + int(rows[-1]) + 1
+        self._y += band.height
+
+    @property
+    def box(self) -> Optional[Box]:
+        """
+        Zone utile des bandes analysées
+
+        Returns:
+            Optional[Box]: Zone à conserver, ou None si l'image n'a pas de marges
+            (ou n'est faite que de marges)
+        """
+        if self._top is None:
+            return None
+        box = (self._left, self._top, self._right, self._bottom)
+        if box == (0, 0, self._width, self._y):
+            return None
+        return box
+
+
+def content_box(img: Image.Image, tolerance: int = DEFAULT_TRIM_TOLERANCE) -> Optional[Box]:
+    """
+    Zone utile d'une image RGB décodée
+
+    Args:
+        img: Image RGB
+        tolerance: Écart maximal par canal avec la couleur des marges
+
+    Returns:
+        Optional[Box]: Zone à conserver, ou None si l'image n'a pas de marges
+    """
+    scanner = ContentBoxScanner(tolerance)
+    scanner.add(img)
+    return scanner.box
@@ -0,0 +1,230 @@
+"""
+Module d'index de construction incrémentale pour YoobuMorph
+===========================================================
+
+Ce module tient, dans le dossier de sortie, un manifeste des images déjà
+traitées: pour chaque source, sa taille, sa date de modification, son empreinte
+SHA-256, les paramètres de traitement et les fichiers produits. Une nouvelle
+exécution ne retraite que les sources nouvelles ou modifiées, en réutilisant
+les noms de fichiers existants.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Nom du manifeste dans le dossier de sortie
+INDEX_FILENAME = '.yoobumorph_index.json'
+INDEX_VERSION = 1
+
+# Taille des lectures pour le calcul des empreintes
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """Empreinte SHA-256 d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class SourceState:
+    """État d'une source au moment de sa planification"""
+    key: str
+    size: int
+    mtime_ns: int
+    sha256: Optional[str]
+    unique_id: Optional[str]  # Identifiant à réutiliser pour les noms de fichiers
+    changed: bool  # False: source et paramètres identiques, sorties présentes
+
+
+class BuildIndex:
+    """Manifeste JSON des sources traitées et de leurs fichiers produits"""
+
+    def __init__(self, output_base_dir: Path):
+        """
+        Charge le manifeste du dossier de sortie (vide s'il n'existe pas encore)
+
+        Args:
+            output_base_dir: Dossier de base de sortie, qui contient le manifeste
+        """
+        self.path = Path(output_base_dir) / INDEX_FILENAME
+        self.entries: Dict[str, dict] = {}
+        self._dirty = False
+
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                if data.get('version') == INDEX_VERSION:
+                    self.entries = data.get('sources', {})
+                else:
+                    logger.warning(f"Version d'index inconnue, index ignoré: {self.path}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Index illisible, tout sera retraité: {self.path} ({e})")
+
+        logger.info(f"Index de construction: {len(self.entries)} sources connues")
+
+    @staticmethod
+    def source_key(image_path: Path) -> str:
+        """Clé d'une source dans le manifeste (chemin absolu)"""
+        return str(Path(image_path).resolve())
+
+    def unique_ids(self) -> Set[str]:
+        """Identifiants déjà utilisés par les fichiers produits"""
+        return {entry['unique_id'] for entry in self.entries.values() if entry.get('unique_id')}
+
+    def check(self, image_path: Path, params: dict) -> SourceState:
+        """
+        Détermine si une source doit être traitée
+
+        La taille et la date de modification suffisent pour une source inchangée;
+        l'empreinte n'est calculée que si elles diffèrent (ex: fichier recopié).
+
+        Args:
+            image_path: Chemin de la source
+            params: Paramètres de traitement (couleur de fond, largeurs...)
+
+        Returns:
+            SourceState: État de la source, avec l'identifiant à réutiliser
+        """
+        key = self.source_key(image_path)
+        stat = os.stat(image_path)
+        entry = self.entries.get(key)
+
+        if entry is None:
+            return SourceState(key, stat.st_size, stat.st_mtime_ns, None, None, changed=True)
+
+        outputs_present = all(self._output_path(output).exists() for output in entry.get('outputs', []))
+        same_params = entry.get('params') == params
+
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return SourceState(
+                key, stat.st_size, stat.st_mtime_ns, entry['sha256'], entry['unique_id'],
+                changed=not (same_params and outputs_present)
+            )
+
+        sha256 = hash_file(image_path)
+        return SourceState(
+            key, stat.st_size, stat.st_mtime_ns, sha256, entry['unique_id'],
+            changed=not (sha256 == entry['sha256'] and same_params and outputs_present)
+        )
+
+    def record(self, state: SourceState, params: dict, unique_id: str, outputs: Iterable[Path]) -> dict:
+        """
+        Enregistre une source traitée et ses fichiers produits
+
+        Args:
+            state: État de la source retourné par check
+            params: Paramètres de traitement
+            unique_id: Identifiant utilisé dans les noms de fichiers
+            outputs: Fichiers produits
+
+        Returns:
+            dict: Entrée enregistrée dans le manifeste
+        """
+        outputs = [self._stored_output(output) for output in outputs]
+
+        # Largeurs qui ne sont plus produites: retirer les anciens fichiers
+        previous = self.entries.get(state.key)
+        if previous:
+            for stale_output in set(previous.get('outputs', [])) - set(outputs):
+                try:
+                    self._output_path(stale_output).unlink()
+                except FileNotFoundError:
+                    pass
+
+        self.entries[state.key] = {
+            'size': state.size,
+            'mtime_ns': state.mtime_ns,
+            'sha256': state.sha256 or hash_file(Path(state.key)),
+            'params': params,
+            'unique_id': unique_id,
+            'outputs': outputs
+        }
+        self._dirty = True
+        return self.entries[state.key]
+
+    def restore(self, key: str, entry: dict):
+        """Rétablit une entrée journalisée par une exécution interrompue avant l'enregistrement du manifeste"""
+        if self.entries.get(key) != entry:
+            self.entries[key] = entry
+            self._dirty = True
+
+    def refresh(self, state: SourceState):
+        """Met à jour la taille et la date d'une source inchangée (ex: touch, copie)"""
+        entry = self.entries[state.key]
+        if entry['size'] != state.size or entry['mtime_ns'] != state.mtime_ns:
+            entry['size'] = state.size
+            entry['mtime_ns'] = state.mtime_ns
+            self._dirty = True
+
+    def prune(self, seen_keys: Set[str], source_dir: Path) -> List[str]:
+        """
+        Supprime les fichiers produits dont la source a été supprimée
+
+        Seules les sources du dossier traité, absentes du parcours et du disque,
+        sont concernées.
+
+        Args:
+            seen_keys: Clés des sources rencontrées pendant le parcours
+            source_dir: Dossier source traité
+
+        Returns:
+            List[str]: Fichiers produits supprimés (relatifs au dossier du manifeste)
+        """
+        source_root = str(Path(source_dir).resolve()) + os.sep
+        removed = []
+        for key in list(self.entries):
+            if key in seen_keys or not key.startswith(source_root) or os.path.exists(key):
+                continue
+            for output in self.entries[key].get('outputs', []):
+                try:
+                    self._output_path(output).unlink()
+                    removed.append(output)
+                except FileNotFoundError:
+                    pass
+            del self.entries[key]
+            self._dirty = True
+            logger.info(f"Source supprimée, sorties retirées: {key}")
+        return removed
+
+    def _stored_output(self, output: Path) -> str:
+        """Chemin d'un fichier produit tel qu'enregistré (relatif au dossier du manifeste)"""
+        output = Path(output).resolve()
+        try:
+            return output.relative_to(self.path.parent.resolve()).as_posix()
+        except ValueError:
+            return str(output)
+
+    def _output_path(self, stored: str) -> Path:
+        """Chemin réel d'un fichier produit enregistré"""
+        return self.path.parent / stored
+
+    def save(self):
+        """Écrit le manifeste de façon atomique (fichier temporaire puis renommage)"""
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.tmp-index-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                json.dump({'version': INDEX_VERSION, 'sources': self.entries}, tmp_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._dirty = False
+        logger.info(f"Index de construction enregistré: {self.path}")
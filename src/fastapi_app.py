@@ -1,8 +1,7 @@
 from fastapi import FastAPI
-from pathlib import Path
-import json
 
-from routes import health, images, admin
+from routes import health, images, admin, jobs
+from utils.azure_storage import load_azure_config
 
 app = FastAPI(
     title="YoobuMorph API",
@@ -10,29 +9,6 @@ app = FastAPI(
     version="1.0.0"
 )
 
-def load_azure_config():
-    """Load Azure configuration from config file or environment variables"""
-    import os
-    
-    # Try environment variables first (for production)
-    connection_string = os.getenv('AZURE_CONNECTION_STRING')
-    container_name = os.getenv('AZURE_CONTAINER_NAME', 'processed-images')
-    
-    if connection_string:
-        return {
-            'connection_string': connection_string,
-            'container_name': container_name
-        }
-    
-    # Fallback to config file (for local development)
-    config_path = Path("config/yoobumorph_config.json")
-    if config_path.exists():
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        return config.get('azure_storage', {})
-    
-    return {}
-
 def setup_routes():
     """Setup and configure all routes"""
     # Load Azure configuration
@@ -55,11 +31,23 @@ def setup_routes():
     # Include routers (always include them)
     app.include_router(health.router)
     app.include_router(images.router)
+    app.include_router(jobs.router)
     app.include_router(admin.router)
 
 # Setup routes on startup
 setup_routes()
 
+@app.on_event("startup")
+async def startup():
+    """Start background job workers"""
+    await jobs.start_workers()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release shared resources held by the routes"""
+    await jobs.stop_workers()
+    await images.shutdown()
+
 @app.get("/")
 def root():
     """Root endpoint with API information"""
@@ -6,10 +6,13 @@ Ce module gère la découverte, la validation et l'organisation des fichiers d'i
 dans les dossiers source.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Set, Optional
+from typing import Iterator, List, Set, Optional
 import logging
 import os
+import queue
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -36,28 +39,131 @@ class FileManager:
         Returns:
             List[Path]: Liste des chemins vers les images
         """
-        image_files = []
+        image_files = list(self.iter_image_files(directory, recursive))
         
+        # Trier par nom de fichier
+        image_files.sort(key=lambda x: x.name.lower())
+        
+        logger.info(f"Trouvé {len(image_files)} images dans {directory}")
+        return image_files
+    
+    def iter_image_files(self, directory: Path, recursive: bool = True,
+                         workers: int = 1) -> Iterator[Path]:
+        """
+        Parcourt un dossier et produit les images au fur et à mesure de la découverte
+        
+        Un seul passage os.scandir par dossier: le type des entrées vient du
+        répertoire lui-même, sans appel stat supplémentaire. Le traitement peut
+        commencer avant la fin du parcours (dossiers réseau volumineux).
+        
+        Args:
+            directory: Dossier à scanner
+            recursive: Scanner récursivement les sous-dossiers
+            workers: Nombre de threads parcourant les dossiers de premier niveau
+                     (produits) en parallèle; 1 = parcours séquentiel
+        
+        Yields:
+            Path: Chemin de chaque image, dans l'ordre de découverte
+        """
         if not directory.exists():
             logger.warning(f"Le dossier n'existe pas: {directory}")
-            return image_files
+            return
         
-        # Définir le pattern de recherche
-        if recursive:
-            pattern = "**/*"
-        else:
-            pattern = "*"
+        if workers <= 1 or not recursive:
+            yield from self._walk(str(directory), recursive)
+            return
         
-        # Scanner les fichiers
-        for file_path in directory.glob(pattern):
-            if file_path.is_file() and self._is_image_file(file_path):
-                image_files.append(file_path)
+        # Images à la racine, puis un parcours par dossier de produit
+        product_dirs = []
+        for entry in self._scandir(str(directory)):
+            if self._is_dir_entry(entry):
+                product_dirs.append(entry.path)
+            elif self._is_image_entry(entry):
+                yield Path(entry.path)
         
-        # Trier par nom de fichier
-        image_files.sort(key=lambda x: x.name.lower())
+        yield from self._walk_parallel(product_dirs, workers)
+    
+    def _scandir(self, directory: str) -> Iterator[os.DirEntry]:
+        """Liste un dossier, en ignorant (avec un avertissement) ceux qui sont illisibles"""
+        try:
+            with os.scandir(directory) as entries:
+                yield from entries
+        except OSError as e:
+            logger.warning(f"Dossier illisible {directory}: {e}")
+    
+    def _is_dir_entry(self, entry: os.DirEntry) -> bool:
+        """Dossier à parcourir (les liens symboliques vers des dossiers sont ignorés)"""
+        try:
+            return entry.is_dir(follow_symlinks=False)
+        except OSError:
+            return False
+    
+    def _is_image_entry(self, entry: os.DirEntry) -> bool:
+        """Fichier image supporté, d'après l'extension puis le type de l'entrée"""
+        if os.path.splitext(entry.name)[1].lower() not in self.supported_extensions:
+            return False
+        try:
+            return entry.is_file()
+        except OSError:
+            return False
+    
+    def _walk(self, directory: str, recursive: bool) -> Iterator[Path]:
+        """Parcours en profondeur d'un dossier avec os.scandir"""
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            subdirectories = []
+            for entry in self._scandir(current):
+                if self._is_dir_entry(entry):
+                    if recursive:
+                        subdirectories.append(entry.path)
+                elif self._is_image_entry(entry):
+                    yield Path(entry.path)
+            # Conserver l'ordre du listing pour les sous-dossiers
+            pending.extend(reversed(subdirectories))
+    
+    def _walk_parallel(self, directories: List[str], workers: int) -> Iterator[Path]:
+        """
+        Parcourt plusieurs dossiers dans des threads et produit leurs images au fil de l'eau
         
-        logger.info(f"Trouvé {len(image_files)} images dans {directory}")
-        return image_files
+        Si le consommateur s'arrête avant la fin, les parcours en cours sont interrompus.
+        """
+        found: queue.Queue = queue.Queue(maxsize=1024)
+        stop = threading.Event()
+        finished = object()
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    found.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def walk(directory: str):
+            try:
+                for image_path in self._walk(directory, recursive=True):
+                    if not put(image_path):
+                        return
+            finally:
+                put(finished)
+        
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan")
+        try:
+            for directory in directories:
+                executor.submit(walk, directory)
+            
+            remaining = len(directories)
+            while remaining:
+                item = found.get()
+                if item is finished:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
     
     def _is_image_file(self, file_path: Path) -> bool:
         """
@@ -76,6 +182,8 @@ class FileManager:
         """
         Analyse la structure d'un dossier pour comprendre l'organisation des produits
         
+        Chaque dossier n'est listé qu'une seule fois.
+        
         Args:
             directory: Dossier à analyser
         
@@ -93,13 +201,13 @@ class FileManager:
             return structure
         
         # Analyser les sous-dossiers
-        for item in directory.iterdir():
-            if item.is_dir():
-                product_info = self._analyze_product_directory(item)
+        for entry in self._scandir(str(directory)):
+            if self._is_dir_entry(entry):
+                product_info = self._analyze_product_directory(Path(entry.path))
                 if product_info:
-                    structure['products'][item.name] = product_info
+                    structure['products'][entry.name] = product_info
                     structure['total_images'] += product_info['image_count']
-                structure['subdirectories'].append(item.name)
+                structure['subdirectories'].append(entry.name)
         
         return structure
     
@@ -120,21 +228,24 @@ class FileManager:
             'subdirectories': []
         }
         
-        # Compter les images dans ce dossier
-        images = self.get_image_files(product_dir, recursive=False)
-        product_info['image_count'] = len(images)
+        # Compter les images de ce dossier et repérer ses sous-dossiers en un seul listing
+        subdirectories = []
+        for entry in self._scandir(str(product_dir)):
+            if self._is_dir_entry(entry):
+                subdirectories.append(entry)
+            elif self._is_image_entry(entry):
+                product_info['image_count'] += 1
         
         # Analyser les sous-dossiers
-        for item in product_dir.iterdir():
-            if item.is_dir():
-                sub_images = self.get_image_files(item, recursive=False)
-                if sub_images:
-                    product_info['subdirectories'].append({
-                        'name': item.name,
-                        'path': item,
-                        'image_count': len(sub_images)
-                    })
-                    product_info['image_count'] += len(sub_images)
+        for subdirectory in subdirectories:
+            sub_image_count = sum(1 for _ in self._walk(subdirectory.path, recursive=False))
+            if sub_image_count:
+                product_info['subdirectories'].append({
+                    'name': subdirectory.name,
+                    'path': Path(subdirectory.path),
+                    'image_count': sub_image_count
+                })
+                product_info['image_count'] += sub_image_count
         
         return product_info if product_info['image_count'] > 0 else None
     
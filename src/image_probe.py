@@ -0,0 +1,422 @@
+"""
+Module de lecture des en-têtes d'images pour YoobuMorph
+=======================================================
+
+Ce module lit les informations d'une image (dimensions, mode, orientation EXIF,
+profil ICC, nombre d'images) directement dans les en-têtes du conteneur
+(JPEG SOF, PNG IHDR, WebP VP8/VP8L/VP8X, TIFF IFD), sans décoder les pixels.
+Il fonctionne sur un début de fichier: un téléchargement partiel suffit pour
+rejeter ou planifier une image avant la fin du transfert.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple, Union
+import struct
+
+# Taille des lectures successives de probe_file
+PROBE_CHUNK_SIZE = 16 * 1024
+
+# Au-delà, un en-tête toujours incomplet est considéré comme invalide
+MAX_HEADER_BYTES = 1024 * 1024
+
+# Hauteur maximale d'une bande (ou tuile) TIFF lisible par bandes: au-delà, décoder
+# un bloc coûte presque autant que décoder l'image entière
+MAX_TIFF_BLOCK_ROWS = 1024
+
+
+class ProbeError(ValueError):
+    """Données qui ne sont pas une image reconnue, ou en-tête corrompu"""
+
+
+class UnknownFormatError(ProbeError):
+    """Données qui ne sont ni un JPEG, ni un PNG, ni un WebP, ni un TIFF"""
+
+
+@dataclass
+class ImageProbe:
+    """Informations lues dans l'en-tête d'une image"""
+    format: str  # Nom du format PIL ('JPEG', 'PNG', 'WEBP', 'TIFF')
+    width: int
+    height: int
+    mode: Optional[str]  # Mode PIL équivalent ('RGB', 'L', 'CMYK'...)
+    orientation: Optional[int] = 1  # Orientation EXIF (1-8), None si pas encore connue
+    has_icc: bool = False
+    frame_count: Optional[int] = 1  # None si pas encore connu (flux partiel)
+    streamable: bool = False  # Lisible par bandes sans décodage complet (voir BandReader)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Dimensions (largeur, hauteur)"""
+        return self.width, self.height
+
+    @property
+    def pixels(self) -> int:
+        """Nombre de pixels d'une image"""
+        return self.width * self.height
+
+
+class _NeedMoreData(Exception):
+    """Les octets disponibles s'arrêtent avant la fin de l'en-tête"""
+
+
+def probe_image(data: Union[bytes, bytearray, memoryview], complete: bool = False) -> Optional[ImageProbe]:
+    """
+    Lit les informations d'une image dans ses premiers octets
+
+    Args:
+        data: Début du fichier (ou fichier entier)
+        complete: True si data contient le fichier entier: les informations
+                  situées plus loin (ex: IFD TIFF suivants) sont alors définitives
+
+    Returns:
+        Optional[ImageProbe]: Informations de l'image, ou None s'il faut plus d'octets
+
+    Raises:
+        UnknownFormatError: Si les données ne sont pas un JPEG, PNG, WebP ou TIFF
+        ProbeError: Si l'en-tête est corrompu, tronqué alors que complete est True,
+                    ou toujours incomplet après MAX_HEADER_BYTES octets
+    """
+    data = bytes(data)
+    if len(data) < 12 and not complete:
+        if not any(signature[:len(data)] == data[:len(signature)] for signature in _SIGNATURES):
+            raise UnknownFormatError("Format d'image non reconnu")
+        return None
+
+    try:
+        if data.startswith(b'\xff\xd8'):
+            return _probe_jpeg(data)
+        if data.startswith(b'\x89PNG\r\n\x1a\n'):
+            return _probe_png(data)
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            return _probe_webp(data, complete)
+        if data[:4] in (b'II*\x00', b'MM\x00*'):
+            return _probe_tiff(data, complete)
+    except _NeedMoreData:
+        if complete:
+            raise ProbeError("Image tronquée")
+        if len(data) >= MAX_HEADER_BYTES:
+            raise ProbeError(f"En-tête d'image absent des {MAX_HEADER_BYTES} premiers octets")
+        return None
+    except struct.error:
+        raise ProbeError("En-tête d'image corrompu")
+
+    raise UnknownFormatError("Format d'image non reconnu")
+
+
+def probe_file(path: Path) -> ImageProbe:
+    """
+    Lit les informations d'une image en ne lisant que le début du fichier
+
+    Args:
+        path: Chemin de l'image
+
+    Returns:
+        ImageProbe: Informations de l'image
+
+    Raises:
+        ProbeError: Si le fichier n'est pas une image reconnue ou si son en-tête est invalide
+    """
+    data = b''
+    with open(path, 'rb') as image_file:
+        while True:
+            chunk = image_file.read(PROBE_CHUNK_SIZE)
+            data += chunk
+            at_end = not chunk
+            probe = probe_image(data, complete=at_end)
+            if probe is not None:
+                return probe
+
+
+_SIGNATURES = (b'\xff\xd8', b'\x89PNG\r\n\x1a\n', b'RIFF', b'II*\x00', b'MM\x00*')
+
+
+def _read(data: bytes, fmt: str, offset: int) -> tuple:
+    """struct.unpack_from qui signale un manque d'octets plutôt qu'une erreur"""
+    if offset + struct.calcsize(fmt) > len(data):
+        raise _NeedMoreData()
+    return struct.unpack_from(fmt, data, offset)
+
+
+# --- JPEG ---------------------------------------------------------------------
+
+# Marqueurs SOF (début d'image), hors DHT (C4), JPG (C8) et DAC (CC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+
+def _probe_jpeg(data: bytes) -> ImageProbe:
+    """Parcourt les segments jusqu'au SOF; l'EXIF et l'ICC (APP1/APP2) le précèdent"""
+    orientation = 1
+    has_icc = False
+    offset = 2
+
+    while True:
+        # Sauter les octets de remplissage 0xFF
+        marker_start = offset
+        while True:
+            if offset >= len(data):
+                raise _NeedMoreData()
+            if data[offset] != 0xFF:
+                break
+            offset += 1
+        if offset == marker_start:
+            raise ProbeError("Segment JPEG invalide")
+
+        marker = data[offset]
+        offset += 1
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue  # Marqueurs sans longueur
+        if marker in (0xD9, 0xDA):
+            raise ProbeError("JPEG sans en-tête SOF")
+
+        (length,) = _read(data, '>H', offset)
+        segment_end = offset + length
+
+        if marker in _JPEG_SOF_MARKERS:
+            _, height, width, components = _read(data, '>BHHB', offset + 2)
+            if width == 0 or height == 0:
+                raise ProbeError("Dimensions JPEG invalides")
+            return ImageProbe(
+                format='JPEG',
+                width=width,
+                height=height,
+                mode=_JPEG_MODES.get(components),
+                orientation=orientation,
+                has_icc=has_icc
+            )
+
+        if marker == 0xE1 or marker == 0xE2:
+            if segment_end > len(data):
+                raise _NeedMoreData()
+            payload = data[offset + 2:segment_end]
+            if marker == 0xE1 and payload.startswith(b'Exif\x00\x00'):
+                orientation = _exif_orientation(payload[6:]) or 1
+            elif marker == 0xE2 and payload.startswith(b'ICC_PROFILE\x00'):
+                has_icc = True
+
+        offset = segment_end
+
+
+def _exif_orientation(tiff: bytes) -> Optional[int]:
+    """Lit l'orientation dans un bloc EXIF (structure TIFF)"""
+    try:
+        endian = _tiff_endian(tiff)
+        (ifd_offset,) = _read(tiff, endian + 'I', 4)
+        value = _tiff_ifd_tags(tiff, endian, ifd_offset).get(0x0112)
+    except (_NeedMoreData, ProbeError, struct.error):
+        return None
+    return value if value in range(1, 9) else None
+
+
+# --- PNG ----------------------------------------------------------------------
+
+_PNG_MODES = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+
+
+def _probe_png(data: bytes) -> ImageProbe:
+    """Lit IHDR puis les blocs précédant IDAT (iCCP, eXIf, acTL)"""
+    length, chunk_type = _read(data, '>I4s', 8)
+    if chunk_type != b'IHDR' or length < 13:
+        raise ProbeError("PNG sans bloc IHDR")
+    width, height, bit_depth, color_type, _, _, interlace = _read(data, '>IIBBBBB', 16)
+    if width == 0 or height == 0:
+        raise ProbeError("Dimensions PNG invalides")
+
+    mode = _PNG_MODES.get(color_type)
+    if color_type == 0 and bit_depth == 1:
+        mode = '1'
+    elif color_type == 0 and bit_depth == 16:
+        mode = 'I;16'
+
+    probe = ImageProbe(format='PNG', width=width, height=height, mode=mode,
+                       streamable=bit_depth == 8 and not interlace and color_type in _PNG_MODES)
+
+    offset = 8 + 12 + length
+    while True:
+        length, chunk_type = _read(data, '>I4s', offset)
+        if not chunk_type.isalpha():
+            raise ProbeError("Bloc PNG invalide")
+        if chunk_type == b'IDAT' or chunk_type == b'IEND':
+            return probe
+        if chunk_type == b'iCCP':
+            probe.has_icc = True
+        elif chunk_type == b'acTL':
+            (probe.frame_count,) = _read(data, '>I', offset + 8)
+        elif chunk_type == b'eXIf':
+            if offset + 8 + length > len(data):
+                raise _NeedMoreData()
+            probe.orientation = _exif_orientation(data[offset + 8:offset + 8 + length]) or 1
+        offset += 12 + length
+
+
+# --- WebP ---------------------------------------------------------------------
+
+def _probe_webp(data: bytes, complete: bool) -> ImageProbe:
+    """Lit le premier bloc (VP8, VP8L ou VP8X) et, pour VP8X, les blocs disponibles"""
+    chunk_type, length = _read(data, '<4sI', 12)
+    body = 20
+
+    if chunk_type == b'VP8 ':
+        start_code = data[body + 3:body + 6]
+        if len(start_code) < 3:
+            raise _NeedMoreData()
+        if start_code != b'\x9d\x01\x2a':
+            raise ProbeError("Bloc VP8 invalide")
+        width, height = _read(data, '<HH', body + 6)
+        return ImageProbe(format='WEBP', width=width & 0x3FFF, height=height & 0x3FFF, mode='RGB')
+
+    if chunk_type == b'VP8L':
+        signature, bits = _read(data, '<BI', body)
+        if signature != 0x2F:
+            raise ProbeError("Bloc VP8L invalide")
+        return ImageProbe(
+            format='WEBP',
+            width=(bits & 0x3FFF) + 1,
+            height=((bits >> 14) & 0x3FFF) + 1,
+            mode='RGBA' if bits >> 28 & 1 else 'RGB'
+        )
+
+    if chunk_type != b'VP8X':
+        raise ProbeError("Bloc WebP inconnu")
+
+    (flags,) = _read(data, '<B', body)
+    canvas = _read(data, '<6B', body + 4)
+    probe = ImageProbe(
+        format='WEBP',
+        width=(canvas[0] | canvas[1] << 8 | canvas[2] << 16) + 1,
+        height=(canvas[3] | canvas[4] << 8 | canvas[5] << 16) + 1,
+        mode='RGBA' if flags & 0x10 else 'RGB',
+        has_icc=bool(flags & 0x20)
+    )
+
+    animated = bool(flags & 0x02)
+    has_exif = bool(flags & 0x08)
+    if not animated and not has_exif:
+        return probe
+
+    # Le nombre d'images (ANMF) et l'EXIF sont plus loin dans le fichier:
+    # inconnus tant qu'ils ne sont pas dans les octets disponibles
+    probe.frame_count = None if animated else 1
+    probe.orientation = None if has_exif else 1
+    frames = 0
+    offset = body + length + (length & 1)
+    while offset + 8 <= len(data):
+        chunk_type, length = struct.unpack_from('<4sI', data, offset)
+        if chunk_type == b'ANMF':
+            frames += 1
+        elif chunk_type == b'EXIF' and offset + 8 + length <= len(data):
+            exif = data[offset + 8:offset + 8 + length]
+            if exif.startswith(b'Exif\x00\x00'):
+                exif = exif[6:]
+            probe.orientation = _exif_orientation(exif) or 1
+        offset += 8 + length + (length & 1)
+
+    if complete:
+        probe.frame_count = frames if animated else 1
+        if probe.orientation is None:
+            probe.orientation = 1
+    return probe
+
+
+# --- TIFF ---------------------------------------------------------------------
+
+_TIFF_TYPE_FORMATS = {3: 'H', 4: 'I'}  # SHORT, LONG
+
+
+def _tiff_endian(tiff: bytes) -> str:
+    """Boutisme d'une structure TIFF ('<' ou '>')"""
+    if tiff[:2] == b'II':
+        return '<'
+    if tiff[:2] == b'MM':
+        return '>'
+    raise ProbeError("En-tête TIFF invalide")
+
+
+def _tiff_ifd_tags(tiff: bytes, endian: str, ifd_offset: int) -> dict:
+    """Valeurs entières (SHORT/LONG, une seule valeur) et présence des tags d'un IFD"""
+    (count,) = _read(tiff, endian + 'H', ifd_offset)
+    tags = {}
+    for index in range(count):
+        tag, value_type, value_count = _read(tiff, endian + 'HHI', ifd_offset + 2 + index * 12)
+        value_format = _TIFF_TYPE_FORMATS.get(value_type)
+        if value_format and value_count == 1:
+            (tags[tag],) = _read(tiff, endian + value_format, ifd_offset + 2 + index * 12 + 8)
+        else:
+            tags[tag] = None
+    return tags
+
+
+def _tiff_mode(tags: dict) -> Optional[str]:
+    """Mode PIL équivalent d'après PhotometricInterpretation et SamplesPerPixel"""
+    photometric = tags.get(262)
+    samples = tags.get(277) or 1
+    bits = tags.get(258)
+    if photometric in (0, 1):
+        if bits == 16 and samples == 1:
+            return 'I;16'
+        return '1' if bits == 1 else 'LA' if samples == 2 else 'L'
+    if photometric == 2:
+        return 'RGBA' if samples == 4 else 'RGB'
+    if photometric == 3:
+        return 'P'
+    if photometric == 5:
+        return 'CMYK'
+    if photometric == 6:
+        return 'RGB'
+    return None
+
+
+def tiff_blocks_streamable(block_height: int, height: int) -> bool:
+    """
+    Indique si les blocs d'un TIFF sont assez bas pour une lecture par bandes
+
+    Un TIFF d'une seule bande (RowsPerStrip >= hauteur) est décodé d'un coup:
+    les blocs doivent être petits, et nettement plus bas que l'image.
+    """
+    return block_height <= min(MAX_TIFF_BLOCK_ROWS, height // 2)
+
+
+def _probe_tiff(data: bytes, complete: bool) -> ImageProbe:
+    """Lit le premier IFD, puis compte les IFD suivants disponibles"""
+    endian = _tiff_endian(data)
+    (ifd_offset,) = _read(data, endian + 'I', 4)
+    tags = _tiff_ifd_tags(data, endian, ifd_offset)
+
+    width, height = tags.get(256), tags.get(257)
+    if not width or not height:
+        raise ProbeError("Dimensions TIFF absentes")
+
+    # Hauteur d'un bloc compressé: tuile, ou bande (une seule bande sans RowsPerStrip)
+    block_height = None
+    if 324 in tags:
+        block_height = tags.get(323)
+    elif 273 in tags:
+        block_height = min(tags.get(278) or height, height)
+
+    probe = ImageProbe(
+        format='TIFF',
+        width=width,
+        height=height,
+        mode=_tiff_mode(tags),
+        orientation=tags.get(274) if tags.get(274) in range(1, 9) else 1,
+        has_icc=34675 in tags,
+        # Pixels entrelacés (PlanarConfiguration 1), par bandes ou par tuiles assez basses
+        streamable=tags.get(284, 1) == 1 and bool(block_height) and tiff_blocks_streamable(block_height, height)
+    )
+
+    # Chaîne des IFD suivants (pages); souvent en fin de fichier
+    frames = 1
+    seen = {ifd_offset}
+    try:
+        while True:
+            (count,) = _read(data, endian + 'H', ifd_offset)
+            (ifd_offset,) = _read(data, endian + 'I', ifd_offset + 2 + count * 12)
+            if ifd_offset == 0 or ifd_offset in seen:
+                break
+            seen.add(ifd_offset)
+            frames += 1
+        probe.frame_count = frames
+    except _NeedMoreData:
+        probe.frame_count = frames if complete else None
+    return probe
@@ -6,21 +6,115 @@ Ce module contient la logique de traitement d'images, notamment la carréificati
 avec bordures intelligentes selon la rectangularité de l'image.
 """
 
-from PIL import Image, ImageOps
+from PIL import Image, ImageOps, JpegImagePlugin
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Optional, Union
+import hashlib
+import io
 import logging
+import mmap
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+from src.border_trim import Box, ContentBoxScanner, content_box
+from src.build_index import hash_file
+from src.image_probe import UnknownFormatError, probe_file
+from src.memory_budget import STRIP_ROWS
+from src.output_format import default_quality, get_output_formats
+from src.quality_search import ADAPTIVE_FORMATS, QualityMemo, QualityTarget, search_quality
+from src.strip_reader import BandReader, encode_png_bands, image_bands
 
 logger = logging.getLogger(__name__)
 
+# Sources acceptées par l'API mémoire: octets bruts, vue mémoire, fichier ouvert ou chemin
+ImageSource = Union[bytes, bytearray, memoryview, BinaryIO, Path, str]
+
+# Formats dans lesquels Pillow encode le mode RGBX du canevas en bandes
+_RGBX_SAVE_FORMATS = ('AVIF', 'JPEG', 'TIFF', 'WEBP')
+
+
+@dataclass
+class SquareifyResult:
+    """Résultat d'une carréification en mémoire"""
+    data: bytes
+    dimensions: Tuple[int, int]
+    original_size: Tuple[int, int]
+    strategy: str
+    format: str
+    method: str = 'pixel'  # 'dct': remplissage JPEG sans perte, 'pixel': décodage/réencodage, 'strips': canevas en bandes
+    crop_box: Optional[Box] = None  # Zone conservée après rognage des marges (coordonnées d'origine)
+
+    @property
+    def content_type(self) -> str:
+        """Type MIME correspondant au format réellement encodé"""
+        return Image.MIME.get(self.format, 'application/octet-stream')
+
+
+@dataclass
+class StripContent:
+    """Contenu d'une image du chemin en bandes, prêt à être placé sur le canevas"""
+    bands: Iterator[Image.Image]  # Bandes RGB, de haut en bas
+    size: Tuple[int, int]
+    strategy: str
+    crop_box: Optional[Box] = None
+
+
+@dataclass
+class ImageAnalysis:
+    """
+    Analyse d'une image décodée une seule fois
+
+    Partagée entre la route HTTP et l'ImageProcessor: dimensions, stratégie
+    et pixels RGB proviennent du même décodage.
+    """
+    image: Image.Image
+    width: int
+    height: int
+    strategy: str
+    source_format: Optional[str]
+    crop_box: Optional[Box] = None  # Zone conservée après rognage des marges, réutilisée par toutes les variantes
+    source_hash: Optional[str] = None  # Empreinte de la source, si la recherche de qualité est activée
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Dimensions originales (largeur, hauteur)"""
+        return self.width, self.height
+
+    @property
+    def target_size(self) -> Tuple[int, int]:
+        """Dimensions du carré final (côté = dimension maximale des pixels décodés)"""
+        side = max(self.image.size)
+        return side, side
+
+
 class ImageProcessor:
     """Classe pour le traitement d'images avec carréification intelligente"""
     
-    def __init__(self):
+    def __init__(self, quality_target: Optional[QualityTarget] = None,
+                 quality_memo: Optional[QualityMemo] = None):
+        """
+        Args:
+            quality_target: Objectif de la recherche de qualité JPEG/WebP/AVIF (None = qualité fixe)
+            quality_memo: Qualités déjà choisies, par source (None = mémorisation dans le processus)
+        """
         self.supported_formats = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}
+        # jpegtran avec l'option -drop (IJG 9 ou libjpeg-turbo >= 2.1), détecté au premier usage
+        self._jpegtran_path: Optional[str] = None
+        self._jpegtran_checked = False
+        self.quality_target = quality_target
+        self.quality_memo = quality_memo if quality_memo is not None else QualityMemo()
     
     def squareify_image(self, input_path: Path, output_path: Path, 
-                       bg_color: Tuple[int, int, int] = (255, 255, 255)) -> Tuple[int, int]:
+                       bg_color: Tuple[int, int, int] = (255, 255, 255),
+                       target_size: Optional[Tuple[int, int]] = None,
+                       trim_tolerance: Optional[int] = None) -> Tuple[int, int]:
         """
         Carréifie une image en gardant la dimension maximale et en ajoutant des bordures
         
@@ -28,6 +122,8 @@ class ImageProcessor:
             input_path: Chemin vers l'image source
             output_path: Chemin vers l'image de sortie
             bg_color: Couleur de fond pour les bordures (R, G, B)
+            target_size: Taille maximale du carré final (None = dimension maximale d'origine)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
         
         Returns:
             Tuple[int, int]: Dimensions finales de l'image (largeur, hauteur)
@@ -37,45 +133,1064 @@ class ImageProcessor:
             OSError: Si l'image ne peut pas être sauvegardée
         """
         try:
-            # Ouvrir l'image
-            with Image.open(input_path) as img:
-                # Convertir en RGB si nécessaire
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                original_width, original_height = img.size
-                
-                logger.info(f"Image originale: {original_width}x{original_height}")
-                
-                # Déterminer la stratégie de carréification
-                strategy = self._determine_squareification_strategy(
-                    original_width, original_height
-                )
-                
-                # Appliquer la carréification
-                squared_image, final_dimensions = self._apply_squareification_strategy(
-                    img, strategy, bg_color
-                )
-                
-                # Sauvegarder l'image
-                if strategy == 'square':
-                    # Pour les images carrées, garder le format original
-                    logger.info("Sauvegarde de l'image originale sans modification")
-                    squared_image.save(output_path)
-                else:
-                    # Pour les images carréifiées, sauvegarder en JPG optimisé
-                    logger.info("Sauvegarde de l'image carréifiée en JPG")
-                    squared_image.save(output_path, quality=95, optimize=True)
-                
-                logger.info(f"Image carréifiée sauvegardée: {output_path}")
-                logger.info(f"Dimensions finales: {final_dimensions[0]}x{final_dimensions[1]}")
-                
-                return final_dimensions
-                
+            # JPEG: remplissage sans perte dans le domaine DCT quand c'est possible (sans rognage)
+            if trim_tolerance is None:
+                lossless = self.squareify_jpeg_lossless(input_path, bg_color, target_size)
+                if lossless:
+                    self._write_output(lossless.data, output_path)
+                    logger.info(f"Image carréifiée sauvegardée: {output_path}")
+                    return lossless.dimensions
+
+            analysis = self.analyze_image(input_path, target_size, trim_tolerance)
+
+            # Appliquer la carréification
+            squared_image, final_dimensions = self._apply_squareification_strategy(
+                analysis.image, analysis.strategy, bg_color
+            )
+
+            # Sauvegarder l'image
+            self._save_image(squared_image, output_path, analysis.strategy, source_hash=analysis.source_hash,
+                             source_format=analysis.source_format)
+            logger.info(f"Dimensions finales: {final_dimensions[0]}x{final_dimensions[1]}")
+
+            return final_dimensions
+
         except Exception as e:
             logger.error(f"Erreur lors du traitement de {input_path}: {str(e)}")
             raise
-    
+
+    def squareify_image_variants(self, input_path: Path, output_paths: Dict[int, List[Path]],
+                                 bg_color: Tuple[int, int, int] = (255, 255, 255),
+                                 trim_tolerance: Optional[int] = None) -> Dict[int, Tuple[int, int]]:
+        """
+        Carréifie une image en plusieurs largeurs à partir d'un seul décodage
+
+        Chaque variante est écrite dans chacun de ses chemins de sortie, au
+        format donné par leur extension (ex: .jpg et .webp).
+
+        Args:
+            input_path: Chemin vers l'image source
+            output_paths: Chemins de sortie pour chaque largeur cible (un par format)
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+
+        Returns:
+            Dict[int, Tuple[int, int]]: Dimensions finales pour chaque largeur cible
+
+        Raises:
+            ValueError: Si l'image ne peut pas être ouverte
+            OSError: Si une image ne peut pas être sauvegardée
+            (non journalisées ici: BatchProcessor journalise le message de la tâche)
+        """
+        widths = list(output_paths)
+        if len(widths) == 1 and trim_tolerance is None and self._jpeg_outputs(output_paths):
+            width = widths[0]
+            lossless = self.squareify_jpeg_lossless(input_path, bg_color, (width, width))
+            if lossless:
+                self._write_output(lossless.data, output_paths[width][0])
+                logger.info(f"Image carréifiée sauvegardée: {output_paths[width][0]}")
+                return {width: lossless.dimensions}
+
+        # Le rognage est détecté une seule fois, toutes les variantes le réutilisent
+        analysis = self.analyze_image(input_path, self._largest_target(widths), trim_tolerance)
+
+        dimensions = {}
+        for width, variant in self._variant_images(analysis, widths, bg_color):
+            # La qualité est recherchée pour chaque variante, puis mémorisée par dimensions
+            for output_path in output_paths[width]:
+                self._save_image(variant, output_path, analysis.strategy, source_hash=analysis.source_hash,
+                                 source_format=analysis.source_format)
+            dimensions[width] = variant.size
+
+        return dimensions
+
+    def squareify_image_strips(self, input_path: Path, output_paths: Dict[int, List[Path]],
+                               bg_color: Tuple[int, int, int] = (255, 255, 255),
+                               trim_tolerance: Optional[int] = None) -> Dict[int, Tuple[int, int]]:
+        """
+        Carréifie une image volumineuse sans garder le canevas complet en mémoire
+
+        Même résultat que squareify_image_variants, mais la source est lue par
+        bandes (voir BandReader) et le canevas est écrit bande par bande dans un
+        fichier temporaire (voir _mapped_canvas).
+
+        Args:
+            input_path: Chemin vers l'image source
+            output_paths: Chemins de sortie pour chaque largeur cible (un par format)
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+
+        Returns:
+            Dict[int, Tuple[int, int]]: Dimensions finales pour chaque largeur cible
+        """
+        source_hash = self._source_hash(input_path)
+        with BandReader(input_path) as reader:
+            widths = list(output_paths)
+            content = self._strip_content(reader, self._largest_target(widths), trim_tolerance)
+            strategy = content.strategy
+
+            dimensions = {}
+            for width, variant in self._strip_variants(content, widths, bg_color):
+                for output_path in output_paths[width]:
+                    self._save_image(variant, output_path, strategy, optimize=False, source_hash=source_hash,
+                                     source_format=reader.format)
+                dimensions[width] = variant.size
+
+        return dimensions
+
+    def squareify_uniform_batch(self, input_paths: List[Path], output_paths: List[Dict[int, List[Path]]],
+                                bg_color: Tuple[int, int, int] = (255, 255, 255),
+                                encode_threads: int = 1,
+                                trim_tolerance: Optional[int] = None) -> List[Optional[Exception]]:
+        """
+        Carréifie un lot d'images de mêmes dimensions et mode
+
+        Les images décodées sont empilées dans un seul tableau NumPy et leurs
+        bordures sont ajoutées en une opération vectorisée, au lieu d'un
+        Image.new et d'un paste par image. Décodages et encodages sont répartis
+        sur encode_threads threads (Pillow libère le GIL pendant ces opérations).
+
+        Une image dont les dimensions décodées diffèrent des autres (en-tête
+        trompeur, ou marges rognées différentes) est carréifiée dans un lot à
+        part; une image en erreur n'empêche pas le traitement des autres.
+
+        Args:
+            input_paths: Chemins des images sources
+            output_paths: Chemins de sortie pour chaque largeur cible (un par format), pour chaque image
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            encode_threads: Nombre de threads de décodage et d'encodage
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+
+        Returns:
+            List[Optional[Exception]]: Erreur de chaque image (journalisée par l'appelant),
+            ou None si elle a été traitée
+        """
+        errors: List[Optional[Exception]] = [None] * len(input_paths)
+        # Stratégie par dimensions d'origine: déterminée (et journalisée) une seule fois
+        strategies: Dict[Tuple[int, int], str] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, encode_threads)) as executor:
+            decodes = [
+                executor.submit(self._batch_analysis, input_path, paths, bg_color, strategies, trim_tolerance)
+                for input_path, paths in zip(input_paths, output_paths)
+            ]
+
+            # Lots d'images aux pixels décodés de mêmes dimensions et même stratégie
+            stacks: Dict[Tuple[Tuple[int, int], str], List[Tuple[int, ImageAnalysis]]] = {}
+            source_hashes: List[Optional[str]] = [None] * len(input_paths)
+            source_formats: List[Optional[str]] = [None] * len(input_paths)
+            for index, decode in enumerate(decodes):
+                try:
+                    analysis = decode.result()
+                except Exception as e:
+                    errors[index] = e
+                    continue
+                if analysis is not None:
+                    source_hashes[index] = analysis.source_hash
+                    source_formats[index] = analysis.source_format
+                    stacks.setdefault((analysis.image.size, analysis.strategy), []).append((index, analysis))
+            # Les résultats des décodages ne sont plus référencés que par les lots
+            decodes.clear()
+
+            for (size, strategy), members in stacks.items():
+                canvases = self._pad_batch(
+                    np.stack([np.asarray(analysis.image) for _, analysis in members]), strategy, bg_color
+                )
+                # Les pixels décodés ne servent plus: seul le tableau des canevas est gardé
+                indices = [index for index, _ in members]
+                members.clear()
+
+                encodes = [
+                    executor.submit(self._write_batch_variants, canvases[position], output_paths[index], strategy,
+                                    source_hashes[index], source_formats[index])
+                    for position, index in enumerate(indices)
+                ]
+                for index, encode in zip(indices, encodes):
+                    try:
+                        encode.result()
+                    except Exception as e:
+                        errors[index] = e
+
+                logger.info(f"Lot carréifié: {len(indices)} images {size[0]}x{size[1]} → "
+                            f"{canvases.shape[2]}x{canvases.shape[1]}")
+
+        return errors
+
+    def _batch_analysis(self, input_path: Path, output_paths: Dict[int, List[Path]], bg_color: Tuple[int, int, int],
+                        strategies: Dict[Tuple[int, int], str],
+                        trim_tolerance: Optional[int] = None) -> Optional[ImageAnalysis]:
+        """
+        Décode une image d'un lot (voir squareify_uniform_batch)
+
+        Returns:
+            Optional[ImageAnalysis]: Pixels décodés, ou None si l'image a déjà été
+            écrite par le remplissage JPEG sans perte
+        """
+        widths = list(output_paths)
+        if trim_tolerance is not None:
+            # La stratégie dépend des marges rognées de chaque image
+            analysis = self._analyze(Image.open(input_path), self._largest_target(widths),
+                                     trim_tolerance=trim_tolerance)
+        else:
+            if len(widths) == 1 and self._jpeg_outputs(output_paths):
+                lossless = self.squareify_jpeg_lossless(input_path, bg_color, (widths[0], widths[0]))
+                if lossless:
+                    self._write_output(lossless.data, output_paths[widths[0]][0])
+                    return None
+
+            img = Image.open(input_path)
+            analysis = self._analyze(img, self._largest_target(widths), strategies.get(img.size))
+            strategies.setdefault(analysis.size, analysis.strategy)
+
+        analysis.source_hash = self._source_hash(input_path)
+        return analysis
+
+    def _pad_batch(self, stack: np.ndarray, strategy: str, bg_color: Tuple[int, int, int]) -> np.ndarray:
+        """
+        Ajoute les bordures de toutes les images d'un lot en une seule opération
+
+        Args:
+            stack: Pixels RGB des images, de forme (images, hauteur, largeur, 3)
+            strategy: Stratégie commune ('horizontal', 'vertical', 'square')
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+
+        Returns:
+            np.ndarray: Canevas carrés, de forme (images, côté, côté, 3)
+        """
+        if strategy == 'square':
+            return stack
+
+        count, height, width, _ = stack.shape
+        side = max(width, height)
+        # Mêmes décalages que _apply_squareification_strategy
+        top = (side - height) // 2 if strategy == 'horizontal' else 0
+        left = (side - width) // 2 if strategy == 'vertical' else 0
+
+        canvases = np.empty((count, side, side, 3), dtype=np.uint8)
+        canvases[...] = bg_color
+        canvases[:, top:top + height, left:left + width] = stack
+        return canvases
+
+    def _write_batch_variants(self, canvas: np.ndarray, output_paths: Dict[int, List[Path]], strategy: str,
+                              source_hash: Optional[str] = None, source_format: Optional[str] = None):
+        """Réduit et écrit les variantes d'un canevas d'un lot"""
+        for width, variant in self._progressive_variants(Image.fromarray(canvas), list(output_paths)):
+            for output_path in output_paths[width]:
+                self._write_image(variant, output_path, strategy, source_hash=source_hash,
+                                  source_format=source_format)
+
+    def _jpeg_outputs(self, output_paths: Dict[int, List[Path]]) -> bool:
+        """Toutes les sorties sont des fichiers JPEG uniques (remplissage sans perte possible)"""
+        return all(
+            len(paths) == 1 and Image.registered_extensions().get(Path(paths[0]).suffix.lower()) == 'JPEG'
+            for paths in output_paths.values()
+        )
+
+    def squareify_buffer_strips(self, source: ImageSource, bg_color: Tuple[int, int, int] = (255, 255, 255),
+                                widths: Optional[List[int]] = None,
+                                trim_tolerance: Optional[int] = None,
+                                output_formats: Optional[List[str]] = None) -> List[SquareifyResult]:
+        """
+        Carréifie une image volumineuse en mémoire, sans garder le canevas complet
+
+        Args:
+            source: Image source (bytes, memoryview, fichier ouvert ou chemin)
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            widths: Largeurs cibles (None = une seule image à la dimension d'origine)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+            output_formats: Formats de sortie (voir output_format; None = format automatique)
+
+        Returns:
+            List[SquareifyResult]: Un résultat par largeur et par format, dans l'ordre demandé
+        """
+        results = {}
+        formats = self._pil_formats(output_formats)
+        source_hash = self._source_hash(source)
+        with BandReader(source) as reader:
+            content = self._strip_content(reader, self._largest_target(widths) if widths else None, trim_tolerance)
+
+            for width, variant in self._strip_variants(content, widths, bg_color):
+                for requested_format in formats:
+                    data, output_format = self._encode_strip_image(variant, content.strategy, reader.format,
+                                                                   source_hash, requested_format)
+                    logger.info(f"Variante {width}: {variant.size[0]}x{variant.size[1]}, {output_format}, {len(data)} octets")
+                    results[width, requested_format] = SquareifyResult(
+                        data=data,
+                        dimensions=variant.size,
+                        original_size=reader.size,
+                        strategy=content.strategy,
+                        format=output_format,
+                        method='strips',
+                        crop_box=content.crop_box
+                    )
+
+        return [results[width, requested_format] for width in (widths or [None]) for requested_format in formats]
+
+    def analyze_image(self, source: ImageSource,
+                      target_size: Optional[Tuple[int, int]] = None,
+                      trim_tolerance: Optional[int] = None) -> ImageAnalysis:
+        """
+        Décode une image une seule fois et détermine sa stratégie de carréification
+
+        Si une taille cible plus petite que l'image est demandée, les JPEG sont
+        décodés directement à échelle réduite (1/2, 1/4 ou 1/8, dans le domaine DCT)
+        avant le redimensionnement final: l'image pleine résolution n'est jamais
+        décodée.
+
+        Avec trim_tolerance, les marges de couleur unie sont rognées avant de
+        déterminer la stratégie (voir border_trim); l'image est alors décodée en
+        pleine résolution.
+
+        Args:
+            source: Image source (bytes, memoryview, fichier ouvert ou chemin)
+            target_size: Taille maximale du carré final (None = dimension maximale d'origine)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+
+        Returns:
+            ImageAnalysis: Pixels RGB, dimensions originales, stratégie, format source et zone rognée
+
+        Raises:
+            ValueError: Si l'image ne peut pas être ouverte
+        """
+        analysis = self._analyze(Image.open(self._open_source(source)), target_size, trim_tolerance=trim_tolerance)
+        analysis.source_hash = self._source_hash(source)
+        return analysis
+
+    def _analyze(self, img: Image.Image, target_size: Optional[Tuple[int, int]],
+                 strategy: Optional[str] = None, trim_tolerance: Optional[int] = None) -> ImageAnalysis:
+        """
+        Décode une image ouverte mais pas encore décodée (voir analyze_image)
+
+        Args:
+            img: Image ouverte par Image.open
+            target_size: Taille maximale du carré final (None = dimension maximale d'origine)
+            strategy: Stratégie déjà déterminée pour ces dimensions (None = la déterminer)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+        """
+        source_format = img.format
+
+        # Dimensions d'origine lues dans l'en-tête, avant tout décodage
+        original_width, original_height = img.size
+
+        crop_box = None
+        if trim_tolerance is not None:
+            # Les marges sont détectées sur l'image entière: pas de décodage réduit
+            img = self._load_rgb(img)
+            crop_box = content_box(img, trim_tolerance)
+            if crop_box:
+                img = img.crop(crop_box)
+                logger.info(f"Marges rognées: {original_width}x{original_height} → {img.size[0]}x{img.size[1]}")
+
+        content_width, content_height = img.size
+
+        # Déterminer la stratégie de carréification (d'après le contenu rogné)
+        if strategy is None:
+            strategy = self._determine_squareification_strategy(content_width, content_height)
+
+        resized_dimensions = self._resized_dimensions(content_width, content_height, target_size)
+        if resized_dimensions and trim_tolerance is None:
+            # Décodage JPEG réduit: sans effet pour les autres formats
+            img.draft('RGB', resized_dimensions)
+            if img.size != (original_width, original_height):
+                logger.info(f"Décodage réduit: {original_width}x{original_height} → {img.size[0]}x{img.size[1]}")
+
+        img = self._load_rgb(img)
+
+        if resized_dimensions and img.size != resized_dimensions:
+            # reducing_gap: réduction rapide par blocs, puis Lanczos sur le dernier facteur 2
+            logger.info(f"Redimensionnement: {img.size[0]}x{img.size[1]} → {resized_dimensions[0]}x{resized_dimensions[1]}")
+            img = img.resize(resized_dimensions, Image.LANCZOS, reducing_gap=2.0)
+
+        return ImageAnalysis(
+            image=img,
+            width=original_width,
+            height=original_height,
+            strategy=strategy,
+            source_format=source_format,
+            crop_box=crop_box
+        )
+
+    def _load_rgb(self, img: Image.Image) -> Image.Image:
+        """Décode une image en RGB (la conversion décode l'image et libère l'originale)"""
+        if img.mode != 'RGB':
+            rgb_img = img.convert('RGB')
+            img.close()
+            return rgb_img
+        img.load()
+        return img
+
+    def _resized_dimensions(self, width: int, height: int,
+                            target_size: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """
+        Calcule les dimensions du contenu pour tenir dans la taille cible
+
+        Returns:
+            Optional[Tuple[int, int]]: Dimensions réduites, ou None si aucune réduction
+            n'est nécessaire (les images ne sont jamais agrandies)
+        """
+        if not target_size:
+            return None
+
+        target_side = max(target_size)
+        longest_side = max(width, height)
+        if longest_side <= target_side:
+            return None
+
+        scale = target_side / longest_side
+        return (
+            max(1, min(target_side, round(width * scale))),
+            max(1, min(target_side, round(height * scale)))
+        )
+
+    def squareify_buffer(self, source: ImageSource,
+                         bg_color: Tuple[int, int, int] = (255, 255, 255),
+                         target_size: Optional[Tuple[int, int]] = None,
+                         trim_tolerance: Optional[int] = None) -> SquareifyResult:
+        """
+        Carréifie une image entièrement en mémoire, sans fichier temporaire
+
+        Args:
+            source: Image source (bytes, memoryview, fichier ouvert ou chemin)
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            target_size: Taille maximale du carré final (None = dimension maximale d'origine)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+
+        Returns:
+            SquareifyResult: Octets encodés, dimensions, stratégie et format de sortie
+
+        Raises:
+            ValueError: Si l'image ne peut pas être ouverte
+            OSError: Si l'image ne peut pas être encodée
+        """
+        try:
+            if trim_tolerance is None and isinstance(source, (bytes, bytearray, memoryview, Path, str)):
+                lossless = self.squareify_jpeg_lossless(source, bg_color, target_size)
+                if lossless:
+                    return lossless
+            return self.squareify_analysis(self.analyze_image(source, target_size, trim_tolerance), bg_color)
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de l'image en mémoire: {str(e)}")
+            raise
+
+    def squareify_analysis(self, analysis: ImageAnalysis,
+                           bg_color: Tuple[int, int, int] = (255, 255, 255)) -> SquareifyResult:
+        """
+        Carréifie une image déjà analysée, sans la décoder à nouveau
+
+        Args:
+            analysis: Résultat de analyze_image
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+
+        Returns:
+            SquareifyResult: Octets encodés, dimensions, stratégie et format de sortie
+        """
+        squared_image, final_dimensions = self._apply_squareification_strategy(
+            analysis.image, analysis.strategy, bg_color
+        )
+
+        data, output_format = self._encode_image(squared_image, analysis.strategy, analysis.source_format,
+                                                 source_hash=analysis.source_hash)
+
+        logger.info(f"Image carréifiée encodée en mémoire: {output_format}, {len(data)} octets")
+        logger.info(f"Dimensions finales: {final_dimensions[0]}x{final_dimensions[1]}")
+
+        return SquareifyResult(
+            data=data,
+            dimensions=final_dimensions,
+            original_size=analysis.size,
+            strategy=analysis.strategy,
+            format=output_format,
+            crop_box=analysis.crop_box
+        )
+
+    def squareify_jpeg_lossless(self, source: Union[bytes, bytearray, memoryview, Path, str],
+                                bg_color: Tuple[int, int, int] = (255, 255, 255),
+                                target_size: Optional[Tuple[int, int]] = None) -> Optional[SquareifyResult]:
+        """
+        Carréifie un JPEG sans le décoder: les bordures sont ajoutées dans le domaine DCT
+
+        Un canevas de couleur unie est encodé avec les tables de quantification et
+        le sous-échantillonnage de la source, puis jpegtran y insère (-drop) les
+        blocs DCT de la source sans les modifier: aucune perte de génération.
+        L'image est centrée exactement comme par les pixels: si ses bords ne
+        tombent pas sur des blocs MCU, ce chemin ne s'applique pas.
+
+        Args:
+            source: Octets ou chemin du JPEG source
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            target_size: Taille maximale du carré final (None = dimension maximale d'origine)
+
+        Returns:
+            Optional[SquareifyResult]: Résultat (method='dct'), ou None si ce chemin ne
+            s'applique pas (pas un JPEG, redimensionnement nécessaire, blocs non alignés,
+            jpegtran indisponible...) et qu'il faut passer par les pixels
+        """
+        jpegtran = self._find_jpegtran()
+        if not jpegtran:
+            return None
+
+        img = Image.open(self._open_source(source))
+        try:
+            plan = self._lossless_padding_plan(img, bg_color, target_size)
+            if plan is None:
+                return None
+            side, x_offset, y_offset = plan
+            canvas = self._encode_canvas(img, side, bg_color)
+            original_size = img.size
+        finally:
+            img.close()
+
+        if isinstance(source, (Path, str)):
+            data = self._run_jpegtran_drop(jpegtran, canvas, str(source), x_offset, y_offset)
+        else:
+            # -drop lit l'image insérée depuis un fichier
+            fd, drop_path = tempfile.mkstemp(suffix='.jpg')
+            try:
+                with os.fdopen(fd, 'wb') as drop_file:
+                    drop_file.write(source)
+                data = self._run_jpegtran_drop(jpegtran, canvas, drop_path, x_offset, y_offset)
+            finally:
+                os.remove(drop_path)
+
+        if data is None:
+            return None
+
+        logger.info(f"Carréification JPEG sans perte (DCT): {original_size[0]}x{original_size[1]} → {side}x{side}")
+        return SquareifyResult(
+            data=data,
+            dimensions=(side, side),
+            original_size=original_size,
+            strategy=self._determine_squareification_strategy(*original_size),
+            format='JPEG',
+            method='dct'
+        )
+
+    def _find_jpegtran(self) -> Optional[str]:
+        """Chemin de jpegtran s'il est installé et supporte -drop, sinon None"""
+        if not self._jpegtran_checked:
+            self._jpegtran_checked = True
+            path = shutil.which('jpegtran')
+            if path:
+                try:
+                    usage = subprocess.run([path, '-help'], capture_output=True, timeout=10)
+                    if b'-drop' in usage.stdout + usage.stderr:
+                        self._jpegtran_path = path
+                except (OSError, subprocess.SubprocessError):
+                    pass
+            if not self._jpegtran_path:
+                logger.info("jpegtran avec -drop indisponible: carréification JPEG par les pixels")
+        return self._jpegtran_path
+
+    def _lossless_padding_plan(self, img: Image.Image, bg_color: Tuple[int, int, int],
+                               target_size: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int, int]]:
+        """
+        Vérifie qu'un JPEG peut être carréifié dans le domaine DCT
+
+        Le décalage est celui du centrage par les pixels; les deux bords de
+        l'image (décalage et décalage + dimension) doivent tomber sur des blocs MCU.
+
+        Returns:
+            Optional[Tuple[int, int, int]]: (côté du carré, décalage x, décalage y),
+            ou None
+        """
+        if img.format != 'JPEG' or img.mode not in ('RGB', 'L'):
+            return None
+        if img.mode == 'L' and len(set(bg_color)) > 1:
+            return None
+        if img.mode == 'RGB' and JpegImagePlugin.get_sampling(img) == -1:
+            return None
+
+        width, height = img.size
+        if width == height or self._resized_dimensions(width, height, target_size):
+            return None
+
+        # Taille d'un bloc MCU selon les facteurs d'échantillonnage
+        mcu_width = 8 * max(layer[1] for layer in img.layer)
+        mcu_height = 8 * max(layer[2] for layer in img.layer)
+
+        side = max(width, height)
+        if width > height:
+            # L'image occupe toute la largeur: ses bords haut et bas doivent tomber sur un bloc
+            y_offset = (side - height) // 2
+            if y_offset % mcu_height or height % mcu_height:
+                return None
+            return side, 0, y_offset
+
+        x_offset = (side - width) // 2
+        if x_offset % mcu_width or width % mcu_width:
+            return None
+        return side, x_offset, 0
+
+    def _encode_canvas(self, img: Image.Image, side: int, bg_color: Tuple[int, int, int]) -> bytes:
+        """Encode un carré uni avec les mêmes tables et sous-échantillonnage que la source"""
+        color = bg_color[0] if img.mode == 'L' else bg_color
+        canvas = Image.new(img.mode, (side, side), color)
+        buffer = io.BytesIO()
+        save_options = {'qtables': img.quantization}
+        if img.mode == 'RGB':
+            save_options['subsampling'] = JpegImagePlugin.get_sampling(img)
+        canvas.save(buffer, format='JPEG', **save_options)
+        return buffer.getvalue()
+
+    def _run_jpegtran_drop(self, jpegtran: str, canvas: bytes, drop_path: str,
+                           x_offset: int, y_offset: int) -> Optional[bytes]:
+        """Insère un JPEG dans le canevas avec jpegtran -drop; None en cas d'échec"""
+        try:
+            completed = subprocess.run(
+                [jpegtran, '-copy', 'none', '-optimize', '-drop', f'+{x_offset}+{y_offset}', drop_path],
+                input=canvas, capture_output=True, timeout=60
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"jpegtran a échoué, carréification par les pixels: {e}")
+            return None
+
+        if completed.returncode != 0 or not completed.stdout:
+            logger.warning(f"jpegtran a échoué, carréification par les pixels: {completed.stderr.decode(errors='replace').strip()}")
+            return None
+        return completed.stdout
+
+    def squareify_variants(self, analysis: ImageAnalysis, widths: List[int],
+                           bg_color: Tuple[int, int, int] = (255, 255, 255),
+                           output_formats: Optional[List[str]] = None) -> List[SquareifyResult]:
+        """
+        Produit plusieurs largeurs d'une image déjà analysée, en mémoire
+
+        Pour éviter tout décodage réduit inutile, l'analyse doit avoir été faite
+        avec la plus grande largeur comme taille cible (voir _largest_target).
+        Chaque variante est encodée dans chacun des formats demandés.
+
+        Args:
+            analysis: Résultat de analyze_image
+            widths: Largeurs cibles (ex: [1500, 750, 300, 150])
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+            output_formats: Formats de sortie (voir output_format; None = format automatique)
+
+        Returns:
+            List[SquareifyResult]: Un résultat par largeur et par format, dans l'ordre demandé
+        """
+        results = {}
+        formats = self._pil_formats(output_formats)
+        for width, variant in self._variant_images(analysis, widths, bg_color):
+            for requested_format in formats:
+                data, output_format = self._encode_image(variant, analysis.strategy, analysis.source_format,
+                                                         source_hash=analysis.source_hash,
+                                                         output_format=requested_format)
+                logger.info(f"Variante {width}: {variant.size[0]}x{variant.size[1]}, {output_format}, {len(data)} octets")
+                results[width, requested_format] = SquareifyResult(
+                    data=data,
+                    dimensions=variant.size,
+                    original_size=analysis.size,
+                    strategy=analysis.strategy,
+                    format=output_format,
+                    crop_box=analysis.crop_box
+                )
+
+        return [results[width, requested_format] for width in widths for requested_format in formats]
+
+    def _pil_formats(self, output_formats: Optional[List[str]]) -> List[Optional[str]]:
+        """
+        Formats PIL des formats de sortie demandés
+
+        Returns:
+            List[Optional[str]]: Formats PIL, ou [None] (format automatique) si aucun n'est demandé
+
+        Raises:
+            ValueError: Si un format est inconnu ou non pris en charge
+        """
+        if not output_formats:
+            return [None]
+        return [output_format.pil_format for output_format in get_output_formats(output_formats)]
+
+    def _largest_target(self, widths: List[int]) -> Tuple[int, int]:
+        """Taille cible couvrant toutes les variantes demandées"""
+        side = max(widths)
+        return side, side
+
+    def _variant_images(self, analysis: ImageAnalysis, widths: List[int],
+                        bg_color: Tuple[int, int, int]) -> List[Tuple[int, Image.Image]]:
+        """
+        Construit le canevas carré une seule fois puis le réduit progressivement
+
+        Chaque variante est dérivée de la précédente (la plus proche en taille),
+        ce qui est plus rapide que de repartir du canevas à chaque fois.
+
+        Returns:
+            List[Tuple[int, Image.Image]]: (largeur demandée, image), de la plus grande à la plus petite
+        """
+        canvas, _ = self._apply_squareification_strategy(analysis.image, analysis.strategy, bg_color)
+        return self._progressive_variants(canvas, widths)
+
+    def _progressive_variants(self, canvas: Image.Image, widths: List[int]) -> List[Tuple[int, Image.Image]]:
+        """Réduit un canevas carré en chaque largeur, chaque variante dérivée de la précédente"""
+        variants = []
+        previous = canvas
+        for width in sorted(set(widths), reverse=True):
+            # Les images ne sont jamais agrandies
+            if width < previous.size[0]:
+                previous = previous.resize((width, width), Image.LANCZOS, reducing_gap=2.0)
+            variants.append((width, previous))
+
+        return variants
+
+    def _strip_content(self, reader: BandReader, target_size: Optional[Tuple[int, int]],
+                       trim_tolerance: Optional[int] = None) -> StripContent:
+        """
+        Prépare le contenu d'une image du chemin en bandes
+
+        Les sources lisibles par bandes ne sont jamais décodées entièrement: les
+        marges éventuelles sont détectées lors d'une première lecture, puis le
+        contenu est relu, rogné et réduit bande par bande (voir _streamed_downscale).
+        Les autres formats sont décodés entièrement (à échelle réduite pour les JPEG).
+
+        Args:
+            reader: Image source lue par bandes
+            target_size: Taille maximale du carré final (None = dimension maximale d'origine)
+            trim_tolerance: Tolérance du rognage des marges (None = pas de rognage)
+
+        Returns:
+            StripContent: Bandes du contenu, dimensions, stratégie et zone rognée
+        """
+        if not reader.streamed:
+            logger.info(f"Format {reader.format} non lisible par bandes: décodage complet")
+            analysis = self._analyze(reader.image, target_size, trim_tolerance=trim_tolerance)
+            return StripContent(image_bands(analysis.image, STRIP_ROWS), analysis.image.size,
+                                analysis.strategy, analysis.crop_box)
+
+        crop_box = None
+        if trim_tolerance is not None:
+            scanner = ContentBoxScanner(trim_tolerance)
+            for band in reader.bands(STRIP_ROWS):
+                scanner.add(band)
+            crop_box = scanner.box
+
+        size = (crop_box[2] - crop_box[0], crop_box[3] - crop_box[1]) if crop_box else reader.size
+        if crop_box:
+            logger.info(f"Marges rognées: {reader.size[0]}x{reader.size[1]} → {size[0]}x{size[1]}")
+        strategy = self._determine_squareification_strategy(*size)
+
+        resized_dimensions = self._resized_dimensions(*size, target_size)
+        if resized_dimensions:
+            content = self._streamed_downscale(reader, resized_dimensions, crop_box)
+            return StripContent(image_bands(content, STRIP_ROWS), content.size, strategy, crop_box)
+
+        return StripContent(reader.bands(STRIP_ROWS, crop_box), size, strategy, crop_box)
+
+    def _strip_variants(self, content: StripContent, widths: Optional[List[int]],
+                        bg_color: Tuple[int, int, int]) -> Iterator[Tuple[Optional[int], Image.Image]]:
+        """
+        Équivalent de _variant_images pour le chemin en bandes
+
+        Les variantes sont produites une à une, de la plus grande à la plus
+        petite; sans largeurs demandées, le canevas lui-même est produit (largeur None).
+        """
+        previous = self._mapped_canvas(content.bands, content.size, content.strategy, bg_color)
+
+        if not widths:
+            yield None, previous
+            return
+
+        for width in sorted(set(widths), reverse=True):
+            # Les images ne sont jamais agrandies
+            if width < previous.size[0]:
+                previous = previous.resize((width, width), Image.LANCZOS, reducing_gap=2.0)
+            yield width, previous
+
+    def _streamed_downscale(self, reader: BandReader, size: Tuple[int, int],
+                            box: Optional[Box] = None) -> Image.Image:
+        """
+        Réduit une image lue par bandes, sans la décoder entièrement
+
+        Même calcul que resize(..., reducing_gap=2.0): une réduction par blocs
+        (reduce), ici appliquée bande par bande avec des bandes multiples du
+        facteur vertical, puis Lanczos sur l'image réduite.
+
+        Args:
+            reader: Image source lue par bandes
+            size: Dimensions finales du contenu
+            box: Zone de l'image à réduire (None = image entière)
+
+        Returns:
+            Image.Image: Contenu RGB aux dimensions demandées
+        """
+        width, height = (box[2] - box[0], box[3] - box[1]) if box else reader.size
+        factor_x = max(1, int(width / size[0] / 2))
+        factor_y = max(1, int(height / size[1] / 2))
+
+        reduced = Image.new('RGB', (-(-width // factor_x), -(-height // factor_y)))
+        y = 0
+        for band in reader.bands(factor_y * max(1, STRIP_ROWS // factor_y), box):
+            band = band.reduce((factor_x, factor_y))
+            reduced.paste(band, (0, y))
+            y += band.height
+
+        logger.info(f"Réduction en bandes: {width}x{height} → {size[0]}x{size[1]}")
+        return reduced.resize(size, Image.LANCZOS, box=(0, 0, width / factor_x, height / factor_y))
+
+    def _mapped_canvas(self, bands: Iterator[Image.Image], size: Tuple[int, int], strategy: str,
+                       bg_color: Tuple[int, int, int]) -> Image.Image:
+        """
+        Construit le canevas carré dans un fichier temporaire projeté en mémoire
+
+        Les lignes sont écrites au fil des bandes du contenu: le canevas complet
+        n'occupe jamais de mémoire anonyme, ses pages restent libérables par le
+        système. Le fichier est supprimé dès que l'image retournée est libérée.
+
+        Pillow n'encode le JPEG, le WebP et l'AVIF qu'à partir de l'image entière:
+        ces pages sont lues pendant l'encodage, et occupent de la RAM si le
+        dossier temporaire est un tmpfs ou si les pages modifiées sont comptées
+        dans la limite du cgroup. La taille du canevas est donc comptée dans le
+        budget mémoire (voir estimate_peak_bytes).
+
+        Args:
+            bands: Bandes RGB du contenu, de haut en bas
+            size: Dimensions du contenu (largeur, hauteur)
+            strategy: Stratégie de carréification
+            bg_color: Couleur de fond pour les bordures (R, G, B)
+
+        Returns:
+            Image.Image: Canevas (mode RGBX, en lecture seule)
+        """
+        side = max(size)
+        canvas_bytes = side * side * 4
+        with tempfile.TemporaryFile(prefix='yoobumorph-canvas-') as canvas_file:
+            canvas_file.truncate(canvas_bytes)
+            buffer = mmap.mmap(canvas_file.fileno(), canvas_bytes)
+
+        offset = 0
+        for rows in self._square_rows(bands, size, strategy, bg_color):
+            buffer[offset:offset + len(rows)] = rows
+            offset += len(rows)
+
+        logger.info(f"Canevas en bandes: {size[0]}x{size[1]} → {side}x{side}")
+        return Image.frombuffer('RGBX', (side, side), buffer, 'raw', 'RGBX', 0, 1)
+
+    def _square_rows(self, bands: Iterator[Image.Image], size: Tuple[int, int], strategy: str,
+                     bg_color: Tuple[int, int, int]) -> Iterator[bytes]:
+        """
+        Produit les lignes du canevas carré (RGBX), par bandes d'au plus STRIP_ROWS lignes
+
+        Les bordures haute et basse sont des lignes de couleur unie, les lignes
+        de contenu reçoivent les bordures gauche et droite.
+        """
+        width, height = size
+        side = max(width, height)
+        background = bytes((*bg_color, 255))
+        top = (side - height) // 2 if strategy == 'horizontal' else 0
+        left = (side - width) // 2 if strategy == 'vertical' else 0
+        bottom = side - height - top
+
+        background_band = background * side * min(STRIP_ROWS, max(top, bottom))
+        for _ in range(top // STRIP_ROWS):
+            yield background_band
+        if top % STRIP_ROWS:
+            yield background * side * (top % STRIP_ROWS)
+
+        row_bytes = width * 4
+        left_border = background * left
+        right_border = background * (side - width - left)
+        for band in bands:
+            rows = band.tobytes('raw', 'RGBX')
+            if left_border or right_border:
+                rows = b''.join(
+                    left_border + rows[start:start + row_bytes] + right_border
+                    for start in range(0, len(rows), row_bytes)
+                )
+            yield rows
+
+        for _ in range(bottom // STRIP_ROWS):
+            yield background_band
+        if bottom % STRIP_ROWS:
+            yield background * side * (bottom % STRIP_ROWS)
+
+    def _encode_strip_image(self, img: Image.Image, strategy: str, source_format: Optional[str],
+                            source_hash: Optional[str] = None,
+                            output_format: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Encode une variante du chemin en bandes (voir _encode_image)
+
+        Pillow n'encode pas le mode RGBX du canevas dans tous les formats: les
+        PNG sont encodés bande par bande, les autres formats concernés (BMP,
+        GIF...) après conversion en RGB.
+        """
+        output_format = self._output_format(strategy, source_format, output_format)
+        if output_format == 'PNG':
+            return encode_png_bands(image_bands(img, STRIP_ROWS), img.size), 'PNG'
+        if img.mode == 'RGBX' and output_format not in _RGBX_SAVE_FORMATS:
+            img = img.convert('RGB')
+        return self._encode_image(img, strategy, source_format, optimize=False, source_hash=source_hash,
+                                  output_format=output_format)
+
+    def _save_image(self, img: Image.Image, output_path: Path, strategy: str, optimize: bool = True,
+                    source_hash: Optional[str] = None, source_format: Optional[str] = None):
+        """
+        Sauvegarde une image carréifiée, au format donné par l'extension du fichier
+
+        Args:
+            img: Image PIL à sauvegarder
+            output_path: Chemin de sortie
+            strategy: Stratégie appliquée ('horizontal', 'vertical', 'square')
+            optimize: Optimiser l'encodage JPEG (garde tous les coefficients en mémoire)
+            source_hash: Empreinte de la source, pour la mémorisation de la qualité
+            source_format: Format PIL de l'image source
+        """
+        output_format = Image.registered_extensions().get(Path(output_path).suffix.lower())
+        if strategy == 'square' and output_format == source_format:
+            # Pour les images carrées, garder le format original
+            logger.info("Sauvegarde de l'image originale sans modification")
+        else:
+            logger.info(f"Sauvegarde de l'image carréifiée en {output_format}")
+
+        self._write_image(img, output_path, strategy, optimize, source_hash, source_format)
+        logger.info(f"Image carréifiée sauvegardée: {output_path}")
+
+    def _write_image(self, img: Image.Image, output_path: Path, strategy: str, optimize: bool = True,
+                     source_hash: Optional[str] = None, source_format: Optional[str] = None):
+        """Encode et écrit une image carréifiée, sans journalisation (voir _save_image)"""
+        # Le fichier temporaire n'a pas l'extension finale: le format est déduit ici
+        output_format = Image.registered_extensions().get(Path(output_path).suffix.lower())
+        if img.mode == 'RGBX' and output_format == 'PNG':
+            # Canevas du chemin en bandes: même encodage que _encode_strip_image
+            with self._atomic_output(output_path) as tmp_path:
+                tmp_path.write_bytes(encode_png_bands(image_bands(img, STRIP_ROWS), img.size))
+            return
+        if img.mode == 'RGBX' and output_format not in _RGBX_SAVE_FORMATS:
+            img = img.convert('RGB')
+        save_params = self._save_params(img, output_format, strategy, optimize, source_hash, source_format)
+
+        with self._atomic_output(output_path) as tmp_path:
+            img.save(tmp_path, format=output_format, **save_params)
+
+    def _save_params(self, img: Image.Image, output_format: Optional[str], strategy: str,
+                     optimize: bool, source_hash: Optional[str], source_format: Optional[str] = None) -> dict:
+        """
+        Paramètres d'encodage d'une image carréifiée
+
+        Les images carrées gardées dans leur format d'origine conservent les
+        réglages par défaut de ce format; les autres images (y compris les
+        images carrées converties) sont encodées avec la qualité par défaut du
+        format de sortie (voir output_format). Avec un objectif de qualité, les
+        sorties JPEG/WebP/AVIF utilisent la qualité recherchée.
+        """
+        quality = self._encoding_quality(img, output_format, source_hash)
+        if quality is not None:
+            return {'quality': quality, 'optimize': optimize}
+        if strategy == 'square' and output_format == source_format:
+            return {}
+        return {'quality': default_quality(output_format), 'optimize': optimize}
+
+    def _encoding_quality(self, img: Image.Image, output_format: Optional[str],
+                          source_hash: Optional[str]) -> Optional[int]:
+        """
+        Qualité JPEG/WebP/AVIF d'une variante, recherchée une seule fois (voir quality_search)
+
+        Chaque variante (dimensions) déclenche sa propre recherche; les
+        retraitements de la même source réutilisent la qualité mémorisée.
+
+        Returns:
+            Optional[int]: Qualité à utiliser, ou None sans objectif de qualité
+        """
+        target = self.quality_target
+        if target is None or output_format not in ADAPTIVE_FORMATS:
+            return None
+
+        if source_hash:
+            quality = self.quality_memo.get(source_hash, target, output_format, img.size)
+            if quality is not None:
+                return quality
+
+        quality = search_quality(img, output_format, target)
+        if source_hash:
+            self.quality_memo.record(source_hash, target, output_format, img.size, quality)
+        return quality
+
+    def _source_hash(self, source: ImageSource) -> Optional[str]:
+        """
+        Empreinte SHA-256 d'une source, pour la mémorisation de la qualité
+
+        Returns:
+            Optional[str]: Empreinte, ou None sans objectif de qualité ou pour un fichier ouvert
+        """
+        if self.quality_target is None:
+            return None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(source).hexdigest()
+        if isinstance(source, (Path, str)):
+            return hash_file(Path(source))
+        return None
+
+    def _write_output(self, data: bytes, output_path: Path):
+        """Écrit une image déjà encodée dans son fichier de sortie"""
+        with self._atomic_output(output_path) as tmp_path:
+            tmp_path.write_bytes(data)
+
+    @contextmanager
+    def _atomic_output(self, output_path: Path) -> Iterator[Path]:
+        """
+        Fournit un fichier temporaire, renommé en output_path une fois écrit
+
+        Un traitement interrompu ne laisse jamais de fichier de sortie partiel:
+        le fichier final apparaît d'un coup (renommage atomique dans le même dossier).
+        """
+        output_path = Path(output_path)
+        fd, tmp_name = tempfile.mkstemp(dir=output_path.parent, prefix=f'.{output_path.name}.', suffix='.tmp')
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        try:
+            yield tmp_path
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _open_source(self, source: ImageSource) -> Union[BinaryIO, Path, str]:
+        """
+        Prépare une source pour Image.open
+
+        Les objets de type bytes sont enveloppés dans un BytesIO, les chemins et
+        fichiers ouverts sont transmis tels quels.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return io.BytesIO(source)
+        return source
+
+    def _encode_image(self, img: Image.Image, strategy: str, source_format: Optional[str],
+                      optimize: bool = True, source_hash: Optional[str] = None,
+                      output_format: Optional[str] = None) -> Tuple[bytes, str]:
+        """
+        Encode une image carréifiée en mémoire
+
+        Args:
+            img: Image PIL à encoder
+            strategy: Stratégie appliquée ('horizontal', 'vertical', 'square')
+            source_format: Format PIL de l'image source
+            optimize: Optimiser l'encodage JPEG (garde tous les coefficients en mémoire)
+            source_hash: Empreinte de la source, pour la mémorisation de la qualité
+            output_format: Format PIL demandé (None = format automatique, voir _output_format)
+
+        Returns:
+            Tuple[bytes, str]: Octets encodés et format PIL utilisé
+        """
+        buffer = io.BytesIO()
+        output_format = self._output_format(strategy, source_format, output_format)
+        save_params = self._save_params(img, output_format, strategy, optimize, source_hash, source_format)
+        img.save(buffer, format=output_format, **save_params)
+
+        return buffer.getvalue(), output_format
+
+    def _output_format(self, strategy: str, source_format: Optional[str],
+                       output_format: Optional[str] = None) -> str:
+        """Format PIL d'une image carréifiée en mémoire: le format demandé, ou le format automatique"""
+        if output_format:
+            return output_format
+        if strategy == 'square' and source_format in Image.SAVE:
+            # Pour les images carrées, garder le format original
+            return source_format
+        # Pour les images carréifiées, encoder en JPG optimisé
+        return 'JPEG'
+
     def _determine_squareification_strategy(self, original_width: int, original_height: int) -> str:
         """
         Détermine la stratégie de carréification selon la rectangularité
@@ -169,40 +1284,71 @@ class ImageProcessor:
         """
         Récupère les informations d'une image
         
+        Les informations sont lues dans l'en-tête, sans décoder l'image (Pillow
+        n'est utilisé que pour les formats que le module image_probe ne lit pas).
+        
         Args:
             image_path: Chemin vers l'image
         
         Returns:
-            dict: Informations de l'image (dimensions, format, etc.)
+            dict: Informations de l'image (dimensions, format, mode, orientation,
+                  présence d'un profil ICC, nombre d'images, taille en octets)
         """
         try:
-            with Image.open(image_path) as img:
-                return {
-                    'width': img.width,
-                    'height': img.height,
-                    'format': img.format,
-                    'mode': img.mode,
-                    'size_bytes': image_path.stat().st_size
+            try:
+                probe = probe_file(image_path)
+                info = {
+                    'width': probe.width,
+                    'height': probe.height,
+                    'format': probe.format,
+                    'mode': probe.mode,
+                    'orientation': probe.orientation,
+                    'has_icc': probe.has_icc,
+                    'frame_count': probe.frame_count
                 }
+            except UnknownFormatError:
+                with Image.open(image_path) as img:
+                    info = {
+                        'width': img.width,
+                        'height': img.height,
+                        'format': img.format,
+                        'mode': img.mode,
+                        'orientation': img.getexif().get(0x0112, 1),
+                        'has_icc': 'icc_profile' in img.info,
+                        'frame_count': getattr(img, 'n_frames', 1)
+                    }
+            info['size_bytes'] = image_path.stat().st_size
+            return info
         except Exception as e:
             logger.error(f"Erreur lors de la lecture des infos de {image_path}: {str(e)}")
             raise
     
-    def validate_image(self, image_path: Path) -> bool:
+    def validate_image(self, image_path: Path, deep: bool = False) -> bool:
         """
         Valide qu'une image peut être traitée
         
         Args:
             image_path: Chemin vers l'image
+            deep: True pour décoder entièrement l'image (détecte les données
+                  corrompues après l'en-tête); False pour ne vérifier que l'en-tête
         
         Returns:
             bool: True si l'image est valide
         """
         try:
+            if not deep:
+                try:
+                    probe_file(image_path)
+                    return True
+                except UnknownFormatError:
+                    # Format non lu par image_probe: Pillow ne lit que l'en-tête à l'ouverture
+                    with Image.open(image_path):
+                        return True
+
             with Image.open(image_path) as img:
                 # Vérifier que l'image peut être convertie en RGB
                 img.convert('RGB')
                 return True
         except Exception as e:
             logger.warning(f"Image invalide {image_path}: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
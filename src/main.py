@@ -26,6 +26,8 @@ sys.path.insert(0, parent_dir)
 from utils.logging_config import setup_logging, get_logger  
 from utils.argument_parser import ArgumentParser
 from src.batch_processor import BatchProcessor
+from src.quality_search import QualityTarget
+from utils.azure_storage import UploadPipeline, get_storage_manager, load_azure_config
 
 # Configuration du logging 
 logger = setup_logging()
@@ -47,15 +49,46 @@ def main():
     if not arg_parser.validate_source_directory(source_dir):
         sys.exit(1)
     
+    # Pipeline d'envoi Azure optionnel
+    upload_pipeline = None
+    if args.upload:
+        azure_config = load_azure_config()
+        if not azure_config.get('connection_string'):
+            logger.error("Chaîne de connexion Azure introuvable (AZURE_CONNECTION_STRING ou fichier config)")
+            sys.exit(1)
+        storage_manager = get_storage_manager(
+            azure_config['connection_string'],
+            azure_config.get('container_name', 'processed-images')
+        )
+        upload_pipeline = UploadPipeline(storage_manager, max_in_flight=args.upload_concurrency)
+    
+    # Recherche de la qualité d'encodage optionnelle
+    quality_target = None
+    if args.target_ssim is not None or args.max_kb is not None:
+        quality_target = QualityTarget(
+            min_ssim=args.target_ssim,
+            max_bytes=args.max_kb * 1024 if args.max_kb is not None else None
+        )
+    
     # Exécution du traitement
     try:
-        processor = BatchProcessor(source_dir, output_base_dir)
-        processor.process_batch(bg_color)
+        processor = BatchProcessor(source_dir, output_base_dir, workers=args.workers,
+                                   upload_pipeline=upload_pipeline, scan_workers=args.scan_workers,
+                                   force=args.force, prune=args.prune,
+                                   resume=args.resume, retry_errors=args.retry_errors,
+                                   memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+                                   batch_size=args.batch_size, trim_tolerance=args.trim,
+                                   quality_target=quality_target, output_formats=args.formats)
+        processor.process_batch(bg_color=bg_color, target_widths=args.sizes)
         logger.info("Traitement terminé avec succès!")
         
     except Exception as e:
         logger.error(f"Erreur fatale: {str(e)}")
         sys.exit(1)
+    
+    finally:
+        if upload_pipeline:
+            upload_pipeline.close()
 
 
 if __name__ == "__main__":
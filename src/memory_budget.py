@@ -0,0 +1,214 @@
+"""
+Module de budget mémoire pour YoobuMorph
+========================================
+
+Ce module estime, à partir des dimensions lues dans l'en-tête d'une image,
+la mémoire maximale nécessaire à sa carréification, et limite la somme des
+estimations des images traitées en même temps à un budget de RAM.
+
+Une image dont l'estimation dépasse une fraction du budget passe par le
+chemin en bandes d'ImageProcessor, qui lit les PNG et TIFF par bandes et
+écrit le canevas dans un fichier projeté en mémoire. Les pages de ce fichier
+peuvent occuper de la RAM (/tmp en tmpfs, pages modifiées comptées dans la
+limite du cgroup): sa taille fait partie de l'estimation.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import logging
+import os
+import threading
+
+from src.image_probe import ImageProbe
+
+logger = logging.getLogger(__name__)
+
+# Part de la mémoire disponible utilisée comme budget par défaut
+DEFAULT_BUDGET_FRACTION = 0.5
+# Budget utilisé si la mémoire disponible ne peut pas être déterminée
+FALLBACK_BUDGET_BYTES = 2 * 1024 * 1024 * 1024
+
+# Au-delà de cette fraction du budget, une image passe par le chemin en bandes
+STRIP_THRESHOLD_FRACTION = 0.5
+
+# Lignes du canevas gardées en mémoire par le chemin en bandes
+STRIP_ROWS = 256
+
+# Octets par pixel dans la mémoire de Pillow (4 pour les modes couleur, même RGB)
+_BYTES_PER_PIXEL = {'1': 1, 'L': 1, 'P': 1, 'I;16': 2}
+
+# Fichiers de limite mémoire du conteneur (cgroup v2 puis v1)
+_CGROUP_LIMIT_FILES = ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+
+
+def available_memory() -> Optional[int]:
+    """
+    Mémoire utilisable par le processus: limite du conteneur si elle est plus
+    basse que la mémoire physique
+
+    Returns:
+        Optional[int]: Octets disponibles, ou None si impossible à déterminer
+    """
+    try:
+        physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        physical = None
+
+    for limit_file in _CGROUP_LIMIT_FILES:
+        try:
+            value = Path(limit_file).read_text().strip()
+        except OSError:
+            continue
+        if value.isdigit() and (physical is None or int(value) < physical):
+            return int(value)
+
+    return physical
+
+
+def default_memory_budget() -> int:
+    """Budget par défaut: une fraction de la mémoire disponible"""
+    memory = available_memory()
+    if not memory:
+        return FALLBACK_BUDGET_BYTES
+    return int(memory * DEFAULT_BUDGET_FRACTION)
+
+
+def _jpeg_draft_scale(longest_side: int, target_side: int) -> int:
+    """Facteur de réduction (1, 2, 4 ou 8) appliqué par le décodage JPEG réduit"""
+    scale = 1
+    while scale < 8 and longest_side // (scale * 2) >= target_side:
+        scale *= 2
+    return scale
+
+
+def estimate_peak_bytes(probe: ImageProbe, target_side: Optional[int] = None, strips: bool = False,
+                        reduced_decode: bool = True) -> int:
+    """
+    Estime la mémoire maximale de la carréification d'une image
+
+    L'estimation additionne l'image décodée (après décodage JPEG réduit), sa
+    conversion en RGB si nécessaire et le canevas carré avec les tampons
+    d'encodage. Avec le chemin en bandes, le canevas est remplacé par quelques
+    bandes de lignes; les sources lisibles par bandes (PNG, TIFF) ne sont
+    jamais décodées entièrement.
+
+    Args:
+        probe: Informations d'en-tête de l'image source
+        target_side: Plus grande largeur produite (None = dimension d'origine)
+        strips: Estimer le chemin en bandes
+        reduced_decode: Décodage JPEG réduit possible (False avec le rognage des marges)
+
+    Returns:
+        int: Estimation en octets
+    """
+    width, height = probe.size
+    longest_side = max(width, height)
+    side = min(longest_side, target_side) if target_side else longest_side
+    # Canevas RGBX projeté en mémoire du chemin en bandes (voir ImageProcessor._mapped_canvas),
+    # encodé d'un bloc par Pillow
+    mapped_canvas = side * side * 4
+
+    if strips and probe.streamable:
+        # Bande décodée et ses copies: lignes filtrées, fichier reconstruit, RGBX avec bordures
+        peak = STRIP_ROWS * longest_side * 4 * 8 + mapped_canvas
+        if side < longest_side:
+            # Réduction par blocs bande par bande (facteur de reducing_gap=2), puis Lanczos
+            factor = max(1, int(longest_side / side / 2))
+            peak += (-(-width // factor) * -(-height // factor) + side * side) * 4
+        return peak
+
+    decoded_width, decoded_height = width, height
+    if reduced_decode and target_side and longest_side > target_side and probe.format == 'JPEG':
+        scale = _jpeg_draft_scale(longest_side, target_side)
+        decoded_width, decoded_height = -(-width // scale), -(-height // scale)
+
+    decoded_pixels = decoded_width * decoded_height
+    peak = decoded_pixels * _BYTES_PER_PIXEL.get(probe.mode, 4)
+    if probe.mode != 'RGB':
+        # Conversion en RGB: les deux images coexistent brièvement
+        peak += decoded_pixels * 4
+
+    if strips:
+        peak += STRIP_ROWS * side * 4 * 2 + mapped_canvas
+    else:
+        # Canevas, puis tampons de l'encodeur (optimize garde tous les coefficients)
+        peak += side * side * 4 * 2
+
+    return peak
+
+
+class MemoryBudget:
+    """Budget de RAM partagé par les images traitées en même temps"""
+
+    def __init__(self, limit_bytes: Optional[int] = None):
+        """
+        Args:
+            limit_bytes: Budget en octets (None = fraction de la mémoire disponible)
+        """
+        self.limit = limit_bytes or default_memory_budget()
+        self.in_use = 0
+        self._condition = threading.Condition()
+        logger.info(f"Budget mémoire: {self.limit // (1024 * 1024)} Mo")
+
+    def plan(self, probe: Optional[ImageProbe], target_side: Optional[int] = None,
+             reduced_decode: bool = True) -> Tuple[int, bool]:
+        """
+        Choisit le chemin de traitement d'une image et estime sa mémoire
+
+        Args:
+            probe: Informations d'en-tête (None si l'en-tête n'a pas pu être lu)
+            target_side: Plus grande largeur produite (None = dimension d'origine)
+            reduced_decode: Décodage JPEG réduit possible (False avec le rognage des marges)
+
+        Returns:
+            Tuple[int, bool]: Estimation en octets, et True pour le chemin en bandes
+        """
+        if probe is None:
+            return 0, False
+
+        in_memory = estimate_peak_bytes(probe, target_side, reduced_decode=reduced_decode)
+        if in_memory <= self.limit * STRIP_THRESHOLD_FRACTION:
+            return in_memory, False
+
+        logger.info(f"Image volumineuse ({probe.width}x{probe.height}, ~{in_memory // (1024 * 1024)} Mo): "
+                    f"traitement en bandes")
+        return estimate_peak_bytes(probe, target_side, strips=True, reduced_decode=reduced_decode), True
+
+    def fits(self, nbytes: int) -> bool:
+        """Indique si une réservation tient dans le budget (toujours vrai si rien n'est en cours)"""
+        return self.in_use == 0 or self.in_use + nbytes <= self.limit
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """Réserve de la mémoire si elle est disponible, sans attendre"""
+        with self._condition:
+            if not self.fits(nbytes):
+                return False
+            self.in_use += nbytes
+            return True
+
+    def acquire(self, nbytes: int):
+        """Réserve de la mémoire, en attendant qu'elle soit disponible (voir reserve)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.fits(nbytes))
+            self.in_use += nbytes
+
+    def release(self, nbytes: int):
+        """Libère une réservation"""
+        with self._condition:
+            self.in_use -= nbytes
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """
+        Réserve de la mémoire le temps d'un traitement, en attendant qu'elle soit disponible
+
+        Une réservation plus grande que le budget attend que plus rien ne soit
+        en cours, puis s'exécute seule.
+        """
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
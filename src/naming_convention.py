@@ -7,6 +7,8 @@ Ce module gère la génération de noms de fichiers selon la convention e-commer
 
 Exemple: sigg - gourde isotherme_obisidian_1AGH457_SLY_500.jpg
 
+L'extension est celle du format de sortie (.jpg, .webp, .avif).
+
 Le NOM_PRODUIT est la concaténation des noms de dossiers du produit.
 Le dossier de sortie est le nom du dossier source suivi de _outputs.
 """
@@ -15,9 +17,11 @@ import re
 import random
 import string
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from src.output_format import DEFAULT_OUTPUT_FORMAT, OUTPUT_FORMATS, get_output_format
+
 logger = logging.getLogger(__name__)
 
 class NamingConvention:
@@ -31,7 +35,8 @@ class NamingConvention:
         self.generated_ids = set()
     
     def generate_filename_and_output_dir(self, image_path: Path, source_dir: Path, 
-                                       target_width: int = 750) -> Tuple[str, str]:
+                                       target_width: int = 750,
+                                       output_format: str = DEFAULT_OUTPUT_FORMAT) -> Tuple[str, str]:
         """
         Génère un nom de fichier et le dossier de sortie selon la convention e-commerce
         
@@ -39,10 +44,12 @@ class NamingConvention:
             image_path: Chemin vers l'image source
             source_dir: Dossier source principal
             target_width: Largeur cible pour le suffixe
+            output_format: Format de sortie, qui donne l'extension ('jpeg', 'webp', 'avif')
         
         Returns:
             Tuple[str, str]: (nom_fichier, dossier_sortie)
         """
+        extension = get_output_format(output_format).extension
         try:
             # Extraction du nom du produit depuis la structure des dossiers
             product_name = self._extract_product_name_from_path(image_path, source_dir)
@@ -51,7 +58,7 @@ class NamingConvention:
             alphanumeric_id = self._generate_unique_id()
             
             # Construction du nom de fichier
-            filename = f"{product_name}_{alphanumeric_id}_SLY_{target_width}.jpg"
+            filename = f"{product_name}_{alphanumeric_id}_SLY_{target_width}{extension}"
             
             # Nettoyage du nom de fichier
             filename = self._clean_filename(filename)
@@ -67,10 +74,48 @@ class NamingConvention:
         except Exception as e:
             logger.error(f"Erreur lors de la génération du nom pour {image_path}: {e}")
             fallback_id = self._generate_unique_id()
-            fallback_filename = f"image_{fallback_id}_SLY_{target_width}.jpg"
+            fallback_filename = f"image_{fallback_id}_SLY_{target_width}{extension}"
             fallback_output_dir = f"{source_dir.name}_outputs"
             return fallback_filename, fallback_output_dir
     
+    def generate_variant_filenames(self, image_path: Path, source_dir: Path,
+                                   target_widths: List[int],
+                                   unique_id: Optional[str] = None,
+                                   output_format: str = DEFAULT_OUTPUT_FORMAT) -> Tuple[Dict[int, str], str]:
+        """
+        Génère les noms de fichiers de plusieurs largeurs d'une même image
+        
+        Toutes les variantes partagent la même chaîne alphanumérique, seul le
+        suffixe _SLY_<largeur> change.
+        
+        Args:
+            image_path: Chemin vers l'image source
+            source_dir: Dossier source principal
+            target_widths: Largeurs cibles
+            unique_id: Chaîne alphanumérique à réutiliser (ex: image déjà produite, ou
+                       autre format de la même image); générée si absente
+            output_format: Format de sortie, qui donne l'extension ('jpeg', 'webp', 'avif')
+        
+        Returns:
+            Tuple[Dict[int, str], str]: (nom de fichier par largeur, dossier_sortie)
+        """
+        extension = get_output_format(output_format).extension
+        try:
+            product_name = self._extract_product_name_from_path(image_path, source_dir)
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération du nom pour {image_path}: {e}")
+            product_name = "image"
+        
+        alphanumeric_id = unique_id or self._generate_unique_id()
+        filenames = {
+            width: self._clean_filename(f"{product_name}_{alphanumeric_id}_SLY_{width}{extension}")
+            for width in target_widths
+        }
+        output_dir = self._generate_output_dir_name(source_dir)
+        
+        logger.info(f"Noms générés: {', '.join(filenames.values())}")
+        return filenames, output_dir
+    
     def _extract_product_name_from_path(self, image_path: Path, source_dir: Path) -> str:
         """
         Extrait le nom du produit en concaténant les noms de dossiers
@@ -224,16 +269,33 @@ class NamingConvention:
                 'product_name': match.group(1),
                 'unique_id': match.group(2),
                 'width': int(match.group(3)),
-                'extension': match.group(4)
+                'extension': match.group(4),
+                'format': self._format_for_extension(match.group(4))
             }
         else:
             return {
                 'product_name': 'unknown',
                 'unique_id': 'unknown',
                 'width': 0,
-                'extension': 'unknown'
+                'extension': 'unknown',
+                'format': 'unknown'
             }
     
+    def _format_for_extension(self, extension: str) -> str:
+        """
+        Format de sortie correspondant à une extension de fichier
+        
+        Args:
+            extension: Extension sans le point (ex: 'jpg', 'webp')
+        
+        Returns:
+            str: Nom du format de sortie ('jpeg', 'webp', 'avif'), ou 'unknown'
+        """
+        for output_format in OUTPUT_FORMATS.values():
+            if output_format.extension == f".{extension.lower()}":
+                return output_format.name
+        return 'jpeg' if extension.lower() == 'jpeg' else 'unknown'
+    
     def validate_filename(self, filename: str) -> bool:
         """
         Valide qu'un nom de fichier respecte la convention
@@ -244,7 +306,7 @@ class NamingConvention:
         Returns:
             bool: True si le nom respecte la convention
         """
-        pattern = r'^[a-z0-9_-]+_[A-Z0-9]{7}_SLY_\d+\.(jpg|jpeg|png|webp)$'
+        pattern = r'^[a-z0-9_-]+_[A-Z0-9]{7}_SLY_\d+\.(jpg|jpeg|png|webp|avif)$'
         return bool(re.match(pattern, filename))
     
     def get_filename_components(self, image_path: Path, source_dir: Path) -> dict:
@@ -0,0 +1,95 @@
+"""
+Module des formats de sortie pour YoobuMorph
+============================================
+
+Ce module décrit les formats dans lesquels les images carréifiées peuvent être
+produites (JPEG, WebP, AVIF): format Pillow, extension des noms de fichiers,
+type MIME et qualité par défaut. Plusieurs formats d'une même variante sont
+encodés à partir du même décodage et du même canevas.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from PIL import Image, features
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """Format de sortie d'une image carréifiée"""
+    name: str  # Nom utilisé par la CLI et l'API ('jpeg', 'webp', 'avif')
+    pil_format: str  # Format PIL passé à Image.save
+    extension: str  # Extension des noms de fichiers (avec le point)
+    mime_type: str
+    quality: int  # Qualité des images carréifiées, sans recherche de qualité
+    feature: Optional[str] = None  # Module Pillow requis (voir PIL.features)
+
+    @property
+    def available(self) -> bool:
+        """Le Pillow installé sait encoder ce format"""
+        return self.feature is None or features.check(self.feature)
+
+
+OUTPUT_FORMATS: Dict[str, OutputFormat] = {
+    'jpeg': OutputFormat('jpeg', 'JPEG', '.jpg', 'image/jpeg', 95),
+    'webp': OutputFormat('webp', 'WEBP', '.webp', 'image/webp', 90, feature='webp'),
+    'avif': OutputFormat('avif', 'AVIF', '.avif', 'image/avif', 75, feature='avif'),
+}
+
+# Format produit quand aucun n'est demandé
+DEFAULT_OUTPUT_FORMAT = 'jpeg'
+
+# Autres noms acceptés
+_ALIASES = {'jpg': 'jpeg'}
+
+
+def get_output_format(name: str) -> OutputFormat:
+    """
+    Retrouve un format de sortie d'après son nom
+
+    Args:
+        name: Nom du format ('jpeg', 'jpg', 'webp', 'avif'), sans tenir compte de la casse
+
+    Returns:
+        OutputFormat: Format correspondant
+
+    Raises:
+        ValueError: Si le format est inconnu ou non pris en charge par Pillow
+    """
+    key = name.lower().lstrip('.')
+    output_format = OUTPUT_FORMATS.get(_ALIASES.get(key, key))
+    if output_format is None:
+        raise ValueError(f"Format de sortie inconnu: {name} (formats: {', '.join(OUTPUT_FORMATS)})")
+    if not output_format.available:
+        raise ValueError(f"Format de sortie {output_format.name} non pris en charge par le Pillow installé")
+    return output_format
+
+
+def get_output_formats(names: Optional[List[str]]) -> List[OutputFormat]:
+    """Formats de sortie demandés, sans doublons (format par défaut si aucun)"""
+    formats = [get_output_format(name) for name in (names or [DEFAULT_OUTPUT_FORMAT])]
+    return list(dict.fromkeys(formats))
+
+
+def default_quality(pil_format: Optional[str]) -> int:
+    """Qualité par défaut des images carréifiées dans un format PIL"""
+    for output_format in OUTPUT_FORMATS.values():
+        if output_format.pil_format == pil_format:
+            return output_format.quality
+    return OUTPUT_FORMATS[DEFAULT_OUTPUT_FORMAT].quality
+
+
+def extension_for(pil_format: str) -> str:
+    """
+    Extension des noms de fichiers d'un format PIL
+
+    Les formats de sortie utilisent leur extension; les autres (ex: image
+    carrée gardée dans son format d'origine) celle enregistrée par Pillow.
+    """
+    for output_format in OUTPUT_FORMATS.values():
+        if output_format.pil_format == pil_format:
+            return output_format.extension
+    for extension, registered_format in Image.registered_extensions().items():
+        if registered_format == pil_format:
+            return extension
+    return OUTPUT_FORMATS[DEFAULT_OUTPUT_FORMAT].extension
@@ -0,0 +1,306 @@
+"""
+Module de recherche de qualité d'encodage pour YoobuMorph
+=========================================================
+
+Ce module choisit la qualité JPEG/WebP/AVIF d'une image par recherche dichotomique,
+au lieu d'une qualité fixe: la qualité la plus basse dont l'image décodée
+reste assez proche de l'originale (SSIM calculé avec NumPy), et/ou la plus
+haute qui tient dans une taille maximale en octets.
+
+La qualité choisie est mémorisée par empreinte de la source et dimensions de
+l'image encodée (SQLite), pour que les retraitements d'une image ne refassent
+pas la recherche.
+"""
+
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+import io
+import logging
+import sqlite3
+import threading
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Base des qualités choisies, dans le dossier de sortie (CLI)
+QUALITY_MEMO_FILENAME = '.yoobumorph_quality.sqlite3'
+
+# Formats dont la qualité est recherchée (les autres gardent leurs réglages)
+ADAPTIVE_FORMATS = ('AVIF', 'JPEG', 'WEBP')
+
+# Au-delà de ce nombre de pixels, la recherche (plusieurs encodages et décodages) est
+# faite sur une réduction de l'image; la taille maximale est vérifiée sur l'image réelle
+MAX_SEARCH_PIXELS = 4096 * 4096
+
+# Fenêtre (pixels) et constantes de stabilité du SSIM (Wang et al., 2004)
+_SSIM_WINDOW = 7
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+# Lignes de fenêtres calculées à la fois: la mémoire du SSIM (tableaux float64)
+# dépend de la largeur de l'image, pas de sa surface
+_SSIM_BAND_ROWS = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS encoder_quality (
+    source_hash TEXT NOT NULL,
+    target TEXT NOT NULL,
+    output_format TEXT NOT NULL,
+    size TEXT NOT NULL,
+    quality INTEGER NOT NULL,
+    PRIMARY KEY (source_hash, target, output_format, size)
+);
+"""
+
+
+@dataclass(frozen=True)
+class QualityTarget:
+    """Objectif de la recherche de qualité"""
+    min_ssim: Optional[float] = None  # SSIM minimal avec l'image non compressée (ex: 0.98)
+    max_bytes: Optional[int] = None  # Taille maximale de l'image encodée
+    min_quality: int = 40
+    max_quality: int = 95
+
+    @property
+    def key(self) -> str:
+        """Représentation stable de l'objectif (clé de mémorisation et paramètres de traitement)"""
+        return f"ssim={self.min_ssim},bytes={self.max_bytes},q={self.min_quality}-{self.max_quality}"
+
+
+def ssim(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """
+    SSIM moyen entre deux images en niveaux de gris
+
+    Moyennes, variances et covariance sont calculées sur des fenêtres carrées
+    glissantes avec des images intégrales (sommes cumulées): le coût ne dépend
+    pas de la taille de la fenêtre. Le calcul est fait par bandes de lignes
+    (chevauchantes de la hauteur d'une fenêtre), avec le même résultat.
+
+    Args:
+        reference: Luminance de l'image de référence (tableau 2D)
+        candidate: Luminance de l'image comparée, de mêmes dimensions
+
+    Returns:
+        float: SSIM moyen (1.0 pour des images identiques)
+    """
+    window = min(_SSIM_WINDOW, *reference.shape)
+    positions = reference.shape[0] - window + 1
+    total = 0.0
+    for top in range(0, positions, _SSIM_BAND_ROWS):
+        bottom = min(positions, top + _SSIM_BAND_ROWS) + window - 1
+        total += _ssim_scores(reference[top:bottom], candidate[top:bottom], window).sum()
+    return float(total / (positions * (reference.shape[1] - window + 1)))
+
+
+def _ssim_scores(reference: np.ndarray, candidate: np.ndarray, window: int) -> np.ndarray:
+    """SSIM de chaque fenêtre window x window entièrement contenue dans la bande"""
+    x = reference.astype(np.float64)
+    y = candidate.astype(np.float64)
+
+    mean_x = _window_mean(x, window)
+    mean_y = _window_mean(y, window)
+    # Variances et covariance d'échantillon, comme l'implémentation de référence
+    correction = window * window / (window * window - 1) if window > 1 else 1.0
+    variance_x = (_window_mean(x * x, window) - mean_x * mean_x) * correction
+    variance_y = (_window_mean(y * y, window) - mean_y * mean_y) * correction
+    covariance = (_window_mean(x * y, window) - mean_x * mean_y) * correction
+
+    return ((2 * mean_x * mean_y + _SSIM_C1) * (2 * covariance + _SSIM_C2)) / (
+        (mean_x * mean_x + mean_y * mean_y + _SSIM_C1) * (variance_x + variance_y + _SSIM_C2)
+    )
+
+
+def _window_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Moyenne de chaque fenêtre window x window entièrement contenue dans l'image"""
+    integral = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    sums = (integral[window:, window:] - integral[:-window, window:]
+            - integral[window:, :-window] + integral[:-window, :-window])
+    return sums / (window * window)
+
+
+def search_quality(img: Image.Image, output_format: str, target: QualityTarget,
+                   encode: Optional[Callable[[Image.Image, int], bytes]] = None) -> int:
+    """
+    Recherche par dichotomie la qualité d'encodage qui atteint l'objectif
+
+    La qualité retenue est la plus basse dont le SSIM atteint min_ssim, limitée
+    à la plus haute dont la taille ne dépasse pas max_bytes (la taille maximale
+    l'emporte si les deux sont incompatibles). Au-delà de MAX_SEARCH_PIXELS, la
+    recherche est faite sur une réduction de l'image (voir _search_downscaled).
+
+    Args:
+        img: Image à encoder
+        output_format: Format PIL de sortie ('JPEG', 'WEBP' ou 'AVIF')
+        target: Objectif de la recherche
+        encode: Fonction d'encodage (image, qualité) → octets (par défaut: save avec quality)
+
+    Returns:
+        int: Qualité choisie
+    """
+    if encode is None:
+        encode = lambda image, quality: _encode(image, output_format, quality)
+    if img.size[0] * img.size[1] > MAX_SEARCH_PIXELS:
+        return _search_downscaled(img, output_format, target, encode)
+
+    encoded: Dict[int, bytes] = {}
+
+    def encoded_at(quality: int) -> bytes:
+        if quality not in encoded:
+            encoded[quality] = encode(img, quality)
+        return encoded[quality]
+
+    quality = target.max_quality
+    if target.min_ssim is not None:
+        reference = np.asarray(img.convert('L'))
+
+        def similar_enough(candidate_quality: int) -> bool:
+            decoded = Image.open(io.BytesIO(encoded_at(candidate_quality))).convert('L')
+            return ssim(reference, np.asarray(decoded)) >= target.min_ssim
+
+        quality = _lowest_passing(target.min_quality, target.max_quality, similar_enough)
+
+    if target.max_bytes is not None:
+        def small_enough(candidate_quality: int) -> bool:
+            return len(encoded_at(candidate_quality)) <= target.max_bytes
+
+        if not small_enough(target.min_quality):
+            logger.warning(f"Taille maximale ({target.max_bytes} octets) inatteignable: "
+                           f"qualité minimale {target.min_quality}")
+            quality = target.min_quality
+        elif not small_enough(quality):
+            # Plus haute qualité qui tient dans la taille maximale (la plus basse qui la dépasse, moins 1)
+            quality = _lowest_passing(target.min_quality, quality, lambda q: not small_enough(q)) - 1
+
+    logger.info(f"Qualité {output_format} choisie: {quality} ({len(encoded)} encodages d'essai)")
+    return quality
+
+
+def _search_downscaled(img: Image.Image, output_format: str, target: QualityTarget,
+                       encode: Callable[[Image.Image, int], bytes]) -> int:
+    """
+    Recherche la qualité d'une image trop grande sur sa réduction à MAX_SEARCH_PIXELS
+
+    La taille maximale est réduite dans la même proportion que le nombre de
+    pixels, puis vérifiée sur l'encodage de l'image réelle: la qualité est
+    abaissée (par dichotomie) tant qu'elle la dépasse.
+    """
+    scale = (MAX_SEARCH_PIXELS / (img.size[0] * img.size[1])) ** 0.5
+    reduced = img.resize((max(1, int(img.size[0] * scale)), max(1, int(img.size[1] * scale))),
+                         Image.BILINEAR, reducing_gap=2.0)
+    ratio = reduced.size[0] * reduced.size[1] / (img.size[0] * img.size[1])
+    logger.info(f"Recherche de qualité sur une réduction: {img.size[0]}x{img.size[1]} → "
+                f"{reduced.size[0]}x{reduced.size[1]}")
+
+    reduced_target = target
+    if target.max_bytes is not None:
+        reduced_target = replace(target, max_bytes=max(1, int(target.max_bytes * ratio)))
+    quality = search_quality(reduced, output_format, reduced_target, encode)
+    del reduced
+    if target.max_bytes is None:
+        return quality
+
+    sizes: Dict[int, int] = {}
+
+    def small_enough(candidate_quality: int) -> bool:
+        if candidate_quality not in sizes:
+            sizes[candidate_quality] = len(encode(img, candidate_quality))
+        return sizes[candidate_quality] <= target.max_bytes
+
+    if small_enough(quality):
+        return quality
+    if not small_enough(target.min_quality):
+        logger.warning(f"Taille maximale ({target.max_bytes} octets) inatteignable: "
+                       f"qualité minimale {target.min_quality}")
+        return target.min_quality
+    quality = _lowest_passing(target.min_quality, quality, lambda q: not small_enough(q)) - 1
+    logger.info(f"Qualité {output_format} abaissée pour la taille maximale: {quality} "
+                f"({len(sizes)} encodages de l'image réelle)")
+    return quality
+
+
+def _lowest_passing(low: int, high: int, passes: Callable[[int], bool]) -> int:
+    """
+    Plus petite valeur de [low, high] qui passe le test (supposé croissant), high si aucune
+    """
+    while low < high:
+        middle = (low + high) // 2
+        if passes(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return high
+
+
+def _encode(img: Image.Image, output_format: str, quality: int) -> bytes:
+    """Encode une image d'essai à une qualité donnée"""
+    buffer = io.BytesIO()
+    img.save(buffer, format=output_format, quality=quality)
+    return buffer.getvalue()
+
+
+class QualityMemo:
+    """Qualités déjà choisies, par empreinte de source, objectif, format et dimensions"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: Fichier SQLite partagé entre processus et exécutions
+                     (None = mémorisation limitée au processus)
+        """
+        self._lock = threading.Lock()
+        self._qualities: Dict[Tuple[str, str, str, str], int] = {}
+        self._connection = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+            with self._lock, self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.executescript(_SCHEMA)
+
+    def get(self, source_hash: str, target: QualityTarget, output_format: str,
+            size: Tuple[int, int]) -> Optional[int]:
+        """
+        Qualité mémorisée, ou None si la recherche n'a pas encore été faite
+
+        Les dimensions de l'image encodée font partie de la clé: une qualité
+        choisie pour une petite variante peut dépasser la taille maximale
+        sur une plus grande.
+        """
+        key = (source_hash, target.key, output_format, _size_key(size))
+        with self._lock:
+            if key not in self._qualities and self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT quality FROM encoder_quality "
+                    "WHERE source_hash = ? AND target = ? AND output_format = ? AND size = ?",
+                    key
+                ).fetchone()
+                if row:
+                    self._qualities[key] = row[0]
+            return self._qualities.get(key)
+
+    def record(self, source_hash: str, target: QualityTarget, output_format: str,
+               size: Tuple[int, int], quality: int):
+        """Mémorise la qualité choisie pour une source et des dimensions"""
+        key = (source_hash, target.key, output_format, _size_key(size))
+        with self._lock:
+            self._qualities[key] = quality
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO encoder_quality (source_hash, target, output_format, size, quality) "
+                        "VALUES (?, ?, ?, ?, ?)", (*key, quality)
+                    )
+
+    def close(self):
+        """Ferme la base de données"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def _size_key(size: Tuple[int, int]) -> str:
+    """Dimensions d'une image encodée, sous la forme de la clé de mémorisation"""
+    return f"{size[0]}x{size[1]}"
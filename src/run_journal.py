@@ -0,0 +1,156 @@
+"""
+Module de journal d'exécution pour YoobuMorph
+=============================================
+
+Ce module tient, dans le dossier de sortie, un journal en ajout seul (JSON Lines)
+des sources traitées et des erreurs d'un traitement en batch. Si le traitement
+est interrompu, le journal permet de reprendre là où il s'était arrêté, ou de
+ne retraiter que les sources en erreur lors de l'exécution précédente.
+
+Chaque événement est écrit en une seule ligne; les synchronisations disque
+(fsync) sont regroupées pour ne pas ralentir le traitement. Une dernière ligne
+tronquée par un arrêt brutal est ignorée à la relecture.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Nom du journal dans le dossier de sortie
+JOURNAL_FILENAME = '.yoobumorph_journal.jsonl'
+
+# Synchronisation disque après ce nombre d'événements ou ce délai (secondes)
+SYNC_EVERY = 64
+SYNC_INTERVAL = 1.0
+
+
+class RunJournal:
+    """Journal en ajout seul d'un traitement en batch"""
+
+    def __init__(self, output_base_dir: Path, sync_every: int = SYNC_EVERY,
+                 sync_interval: float = SYNC_INTERVAL):
+        """
+        Relit le journal de l'exécution précédente, s'il existe
+
+        Args:
+            output_base_dir: Dossier de base de sortie, qui contient le journal
+            sync_every: Nombre d'événements entre deux synchronisations disque
+            sync_interval: Délai maximal entre deux synchronisations disque (secondes)
+        """
+        self.path = Path(output_base_dir) / JOURNAL_FILENAME
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        # État de l'exécution précédente
+        self.params: Optional[dict] = None
+        self.completed: Dict[str, dict] = {}  # Source → événement 'done'
+        self.errors: Dict[str, str] = {}  # Source → message d'erreur
+        self.planned: Dict[str, str] = {}  # Source → identifiant attribué avant traitement
+        self.finished = False
+
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0.0
+
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        """Reconstitue l'état de l'exécution précédente à partir du journal"""
+        try:
+            with open(self.path, encoding='utf-8') as journal_file:
+                lines = journal_file.read().splitlines()
+        except OSError as e:
+            logger.warning(f"Journal illisible, ignoré: {self.path} ({e})")
+            return
+
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # Ligne tronquée par un arrêt brutal
+                continue
+
+            kind = event.get('event')
+            if kind in ('start', 'resume'):
+                self.params = event.get('params')
+                self.finished = False
+            elif kind == 'planned':
+                self.planned[event['source']] = event['unique_id']
+            elif kind == 'done':
+                self.completed[event['source']] = event
+                self.errors.pop(event['source'], None)
+            elif kind == 'error':
+                self.errors[event['source']] = event.get('error', '')
+            elif kind == 'end':
+                self.finished = True
+
+        logger.info(f"Journal précédent: {len(self.completed)} sources traitées, "
+                    f"{len(self.errors)} en erreur" + ("" if self.finished else " (interrompu)"))
+
+    def open(self, params: dict, resume: bool = False):
+        """
+        Ouvre le journal pour une nouvelle exécution
+
+        Args:
+            params: Paramètres de traitement (couleur de fond, largeurs...)
+            resume: Continuer le journal existant au lieu d'en commencer un nouveau
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self.append({'event': 'resume', 'params': params}, sync=True)
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self.append({'event': 'start', 'params': params}, sync=True)
+
+    def append(self, event: dict, sync: bool = False):
+        """
+        Ajoute un événement au journal
+
+        Args:
+            event: Événement à écrire (une ligne JSON)
+            sync: Forcer la synchronisation disque immédiate
+        """
+        self._file.write(json.dumps(event) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+
+        now = time.monotonic()
+        if sync or self._unsynced >= self.sync_every or now - self._last_sync >= self.sync_interval:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = now
+
+    def record_planned(self, source: str, unique_id: str):
+        """Journalise l'identifiant attribué à une source avant son traitement"""
+        self.append({'event': 'planned', 'source': source, 'unique_id': unique_id})
+
+    def record_done(self, source: str, outputs: list, index_entry: Optional[dict] = None):
+        """Journalise une source traitée, avec son entrée d'index de construction"""
+        self.append({'event': 'done', 'source': source, 'outputs': outputs, 'index': index_entry})
+
+    def record_error(self, source: str, error: str):
+        """Journalise une source en erreur"""
+        self.append({'event': 'error', 'source': source, 'error': error})
+
+    def close(self, finished: bool = True):
+        """
+        Ferme le journal
+
+        Args:
+            finished: Marquer l'exécution comme terminée (False si elle a été interrompue)
+        """
+        if self._file is None:
+            return
+        if finished:
+            self.append({'event': 'end'}, sync=True)
+        else:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
@@ -0,0 +1,414 @@
+"""
+Module de lecture d'images par bandes pour YoobuMorph
+=====================================================
+
+Ce module lit une image source par bandes horizontales, sans jamais la
+décoder entièrement, pour les formats qui le permettent:
+
+- PNG non entrelacé de 8 bits par canal: le flux IDAT est décompressé au fil
+  de l'eau, chaque bande est décodée précédée de la dernière ligne de la bande
+  précédente (nécessaire aux filtres PNG);
+- TIFF par bandes (strips) ou par tuiles, entrelacé par pixel: chaque bande
+  ou tuile est un bloc compressé indépendant, décodé seul.
+
+Chaque bande est décodée par Pillow à partir d'un petit fichier reconstruit
+autour des octets de la source: la décompression et les filtres restent ceux
+de Pillow et libtiff. Les autres formats sont décodés entièrement, puis
+découpés en bandes.
+
+Le module encode aussi un PNG bande par bande (encode_png_bands), sur le même
+principe: les filtres de chaque bande sont calculés par Pillow, seule la
+compression zlib est continue d'une bande à l'autre.
+"""
+
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+import io
+import logging
+import struct
+import zlib
+
+from PIL import Image, TiffImagePlugin, TiffTags
+
+from src.image_probe import tiff_blocks_streamable
+
+logger = logging.getLogger(__name__)
+
+# --- PNG ----------------------------------------------------------------------
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Type de couleur → (canaux, mode brut d'une ligne décodée), en 8 bits par canal
+_PNG_COLOR_TYPES = {0: (1, 'L'), 2: (3, 'RGB'), 3: (1, 'P'), 4: (2, 'LA'), 6: (4, 'RGBA')}
+# Blocs recopiés dans le PNG reconstruit de chaque bande
+_PNG_BAND_CHUNKS = (b'PLTE', b'tRNS')
+
+# --- TIFF ---------------------------------------------------------------------
+
+_TIFF_STRIP_OFFSETS, _TIFF_ROWS_PER_STRIP, _TIFF_STRIP_BYTE_COUNTS = 273, 278, 279
+_TIFF_TILE_WIDTH, _TIFF_TILE_LENGTH, _TIFF_TILE_OFFSETS, _TIFF_TILE_BYTE_COUNTS = 322, 323, 324, 325
+_TIFF_PLANAR_CONFIGURATION = 284
+# Étiquettes nécessaires au décodage, recopiées dans le TIFF reconstruit de chaque bande
+# (échantillons, compression, photométrie, prédicteur, palette, tables JPEG, YCbCr...)
+_TIFF_BAND_TAGS = (258, 259, 262, 266, 277, 284, 317, 320, 338, 339, 347, 529, 530, 531, 532)
+
+# Sources acceptées: octets bruts, vue mémoire, fichier ouvert ou chemin
+BandSource = Union[bytes, bytearray, memoryview, BinaryIO, Path, str]
+
+
+class BandReader:
+    """Image source lue par bandes horizontales RGB"""
+
+    def __init__(self, source: BandSource):
+        """
+        Ouvre une image sans la décoder
+
+        Args:
+            source: Image source (bytes, memoryview, fichier ouvert ou chemin)
+
+        Raises:
+            ValueError: Si l'image ne peut pas être ouverte
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._fp = io.BytesIO(source)
+            self._owns_fp = False
+        elif isinstance(source, (Path, str)):
+            self._fp = open(source, 'rb')
+            self._owns_fp = True
+        else:
+            self._fp = source
+            self._owns_fp = False
+
+        try:
+            self.image = Image.open(self._fp)
+        except Exception:
+            self.close()
+            raise
+
+        self.format = self.image.format
+        self.size = self.image.size
+        self._png_header = self._read_png_header() if self.format == 'PNG' else None
+
+    @property
+    def streamed(self) -> bool:
+        """True si l'image est décodée bande par bande, sans décodage complet"""
+        if self.format == 'PNG':
+            return self._png_header is not None
+        if self.format == 'TIFF':
+            return self._tiff_layout() is not None
+        return False
+
+    def bands(self, rows: int, box: Optional[Tuple[int, int, int, int]] = None) -> Iterator[Image.Image]:
+        """
+        Produit l'image par bandes RGB de rows lignes (la dernière peut être plus courte)
+
+        L'image peut être lue plusieurs fois; avec une zone, la lecture s'arrête
+        après sa dernière ligne.
+
+        Args:
+            rows: Nombre de lignes par bande
+            box: Zone (gauche, haut, droite, bas) à produire (None = image entière)
+
+        Yields:
+            Image.Image: Bandes RGB, de haut en bas
+        """
+        if self.format == 'PNG' and self._png_header:
+            bands = self._png_bands(rows)
+        elif self.format == 'TIFF' and self._tiff_layout():
+            bands = self._tiff_bands()
+        else:
+            bands = self._decoded_bands(rows)
+
+        if box is None:
+            return _regroup(bands, self.size[0], rows)
+        return _regroup(_cropped(bands, box), box[2] - box[0], rows)
+
+    def close(self):
+        """Ferme le fichier source s'il a été ouvert par le lecteur"""
+        if self._owns_fp:
+            self._fp.close()
+
+    def __enter__(self) -> 'BandReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Décodage complet -------------------------------------------------------
+
+    def _decoded_bands(self, rows: int) -> Iterator[Image.Image]:
+        """Décode toute l'image, puis la découpe en bandes"""
+        logger.info(f"Format {self.format} non lisible par bandes: décodage complet")
+        img = self.image.convert('RGB')
+        width, height = img.size
+        for y in range(0, height, rows):
+            yield img.crop((0, y, width, min(height, y + rows)))
+
+    # --- PNG --------------------------------------------------------------------
+
+    def _read_png_header(self) -> Optional[Tuple[bytes, int, str]]:
+        """
+        Lit IHDR et vérifie que le PNG est lisible par bandes
+
+        Returns:
+            Optional[Tuple[bytes, int, str]]: (IHDR, octets par ligne, mode brut),
+            ou None si le PNG est entrelacé ou n'est pas en 8 bits par canal
+        """
+        self._fp.seek(len(_PNG_SIGNATURE))
+        length, chunk_type = struct.unpack('>I4s', self._fp.read(8))
+        ihdr = self._fp.read(length)
+        width, _, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', ihdr[:13])
+        if bit_depth != 8 or interlace or color_type not in _PNG_COLOR_TYPES:
+            return None
+        channels, rawmode = _PNG_COLOR_TYPES[color_type]
+        return ihdr, width * channels, rawmode
+
+    def _png_bands(self, rows: int) -> Iterator[Image.Image]:
+        """Décompresse le flux IDAT au fil de l'eau et décode les bandes une à une"""
+        ihdr, stride, rawmode = self._png_header
+        width, height = self.size
+        row_bytes = stride + 1  # Octet de filtre en tête de chaque ligne
+        band_chunks = []
+        decompressor = zlib.decompressobj()
+        pending = bytearray()
+        previous_row = None
+        y = 0
+
+        self._fp.seek(len(_PNG_SIGNATURE))
+        while y < height:
+            header = self._fp.read(8)
+            if len(header) < 8:
+                raise ValueError("PNG tronqué")
+            length, chunk_type = struct.unpack('>I4s', header)
+            data = self._fp.read(length)
+            (crc,) = struct.unpack('>I', self._fp.read(4))
+            if len(data) < length or zlib.crc32(chunk_type + data) != crc:
+                raise ValueError(f"Bloc PNG {chunk_type!r} corrompu")
+
+            if chunk_type in _PNG_BAND_CHUNKS:
+                band_chunks.append(_png_chunk(chunk_type, data))
+            elif chunk_type == b'IDAT':
+                while data and y < height:
+                    # Décompression bornée: quelques bandes au plus en attente
+                    pending += decompressor.decompress(data, row_bytes * rows)
+                    data = decompressor.unconsumed_tail
+                    while y < height and len(pending) >= row_bytes * min(rows, height - y):
+                        count = min(rows, height - y)
+                        filtered = bytes(pending[:row_bytes * count])
+                        del pending[:row_bytes * count]
+                        band = self._decode_png_band(ihdr, band_chunks, previous_row, filtered, count)
+                        previous_row = band.crop((0, count - 1, width, count)).tobytes('raw', rawmode)
+                        y += count
+                        yield band if band.mode == 'RGB' else band.convert('RGB')
+            elif chunk_type == b'IEND':
+                raise ValueError("PNG tronqué: données d'image incomplètes")
+
+    def _decode_png_band(self, ihdr: bytes, band_chunks: List[bytes], previous_row: Optional[bytes],
+                         filtered: bytes, count: int) -> Image.Image:
+        """
+        Décode une bande à partir d'un PNG reconstruit
+
+        La dernière ligne décodée de la bande précédente est placée en tête,
+        sans filtre: les filtres Up, Average et Paeth de la première ligne de la
+        bande s'appuient dessus.
+        """
+        band_height = count + (1 if previous_row is not None else 0)
+        raw = filtered if previous_row is None else b'\x00' + previous_row + filtered
+        band_png = b''.join([
+            _PNG_SIGNATURE,
+            _png_chunk(b'IHDR', struct.pack('>II', self.size[0], band_height) + ihdr[8:13]),
+            *band_chunks,
+            # Niveau 0: stockage sans compression, les octets sont déjà décompressés
+            _png_chunk(b'IDAT', zlib.compress(raw, 0)),
+            _png_chunk(b'IEND', b'')
+        ])
+        band = Image.open(io.BytesIO(band_png))
+        band.load()
+        if previous_row is not None:
+            band = band.crop((0, 1, self.size[0], band_height))
+        return band
+
+    # --- TIFF -------------------------------------------------------------------
+
+    def _tiff_layout(self) -> Optional[Tuple[List[int], List[int], int, int]]:
+        """
+        Organisation des blocs compressés d'un TIFF
+
+        Returns:
+            Optional[Tuple[List[int], List[int], int, int]]: (positions, tailles,
+            largeur et hauteur d'un bloc), ou None si le TIFF n'est pas lisible par bandes
+            (blocs trop hauts, voir tiff_blocks_streamable)
+        """
+        tags = self.image.tag_v2
+        if tags.get(_TIFF_PLANAR_CONFIGURATION, 1) != 1:
+            return None
+
+        width, height = self.size
+        if _TIFF_TILE_OFFSETS in tags:
+            offsets, byte_counts = tags[_TIFF_TILE_OFFSETS], tags.get(_TIFF_TILE_BYTE_COUNTS)
+            block_width, block_height = tags.get(_TIFF_TILE_WIDTH), tags.get(_TIFF_TILE_LENGTH)
+        elif _TIFF_STRIP_OFFSETS in tags:
+            offsets, byte_counts = tags[_TIFF_STRIP_OFFSETS], tags.get(_TIFF_STRIP_BYTE_COUNTS)
+            block_width, block_height = width, min(tags.get(_TIFF_ROWS_PER_STRIP, height), height)
+        else:
+            return None
+
+        if not block_width or not block_height or not byte_counts:
+            return None
+        if not tiff_blocks_streamable(block_height, height):
+            return None
+        blocks = -(-width // block_width) * -(-height // block_height)
+        offsets, byte_counts = list(offsets), list(byte_counts)
+        if len(offsets) != blocks or len(byte_counts) != blocks:
+            return None
+        return offsets, byte_counts, block_width, block_height
+
+    def _tiff_bands(self) -> Iterator[Image.Image]:
+        """Décode les bandes (ou rangées de tuiles) une à une"""
+        offsets, byte_counts, block_width, block_height = self._tiff_layout()
+        width, height = self.size
+        tiled = _TIFF_TILE_OFFSETS in self.image.tag_v2
+        across = -(-width // block_width)
+
+        for row_index, y in enumerate(range(0, height, block_height)):
+            band_height = min(block_height, height - y)
+            band = Image.new('RGB', (width, band_height))
+            for column in range(across):
+                block = row_index * across + column
+                # Les tuiles de bord ont toujours la taille complète d'une tuile
+                rows = block_height if tiled else band_height
+                decoded = self._decode_tiff_block(offsets[block], byte_counts[block], block_width, rows)
+                band.paste(decoded if decoded.mode == 'RGB' else decoded.convert('RGB'), (column * block_width, 0))
+            yield band
+
+    def _decode_tiff_block(self, offset: int, byte_count: int, block_width: int, rows: int) -> Image.Image:
+        """Décode une bande ou une tuile à partir d'un TIFF reconstruit d'un seul bloc"""
+        self._fp.seek(offset)
+        data = self._fp.read(byte_count)
+
+        source_tags = self.image.tag_v2
+        # Même ordre des octets que la source: les échantillons de plus de 8 bits restent tels quels
+        prefix = source_tags.prefix
+        ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=prefix)
+        for tag in _TIFF_BAND_TAGS:
+            if tag in source_tags:
+                ifd[tag] = source_tags[tag]
+                ifd.tagtype[tag] = source_tags.tagtype[tag]
+        ifd[256], ifd[257], ifd[_TIFF_ROWS_PER_STRIP] = block_width, rows, rows
+        # Position relative à la fin du répertoire: tobytes la décale lui-même
+        ifd[_TIFF_STRIP_OFFSETS], ifd[_TIFF_STRIP_BYTE_COUNTS] = 0, len(data)
+        ifd.tagtype[_TIFF_STRIP_OFFSETS] = ifd.tagtype[_TIFF_STRIP_BYTE_COUNTS] = TiffTags.LONG
+
+        endian = '<' if prefix == b'II' else '>'
+        header = prefix + struct.pack(endian + 'HI', 42, 8)
+        block = Image.open(io.BytesIO(header + ifd.tobytes(8) + data))
+        block.load()
+        return block
+
+
+def image_bands(img: Image.Image, rows: int) -> Iterator[Image.Image]:
+    """Découpe une image en bandes RGB de rows lignes, converties une à une"""
+    width, height = img.size
+    for y in range(0, height, rows):
+        band = img.crop((0, y, width, min(height, y + rows)))
+        yield band if band.mode == 'RGB' else band.convert('RGB')
+
+
+def encode_png_bands(bands: Iterator[Image.Image], size: Tuple[int, int], compress_level: int = 6) -> bytes:
+    """
+    Encode des bandes RGB en un seul PNG, sans assembler l'image complète
+
+    Chaque bande est encodée par Pillow sans compression, précédée de la
+    dernière ligne de la bande précédente: les filtres choisis par Pillow
+    restent valides dans l'image complète. Les lignes filtrées sont ensuite
+    compressées dans un seul flux zlib.
+
+    Args:
+        bands: Bandes RGB de haut en bas, de largeur size[0]
+        size: Dimensions de l'image (largeur, hauteur)
+        compress_level: Niveau de compression zlib (6: valeur par défaut de Pillow)
+
+    Returns:
+        bytes: Image PNG encodée
+    """
+    width, height = size
+    row_bytes = width * 3 + 1
+    compressor = zlib.compressobj(compress_level)
+    output = io.BytesIO()
+    output.write(_PNG_SIGNATURE)
+    output.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+
+    previous_row = None
+    for band in bands:
+        rows = band if previous_row is None else _stack([previous_row, band], width)
+        encoded = io.BytesIO()
+        rows.save(encoded, format='PNG', compress_level=0)
+        filtered = zlib.decompress(b''.join(_png_chunks(encoded.getvalue(), b'IDAT')))
+        if previous_row is not None:
+            filtered = filtered[row_bytes:]
+        previous_row = band.crop((0, band.height - 1, width, band.height))
+
+        compressed = compressor.compress(filtered)
+        if compressed:
+            output.write(_png_chunk(b'IDAT', compressed))
+
+    output.write(_png_chunk(b'IDAT', compressor.flush()))
+    output.write(_png_chunk(b'IEND', b''))
+    return output.getvalue()
+
+
+def _png_chunks(png: bytes, chunk_type: bytes) -> Iterator[bytes]:
+    """Données des blocs d'un type donné dans un PNG complet"""
+    offset = len(_PNG_SIGNATURE)
+    while offset < len(png):
+        length, current_type = struct.unpack_from('>I4s', png, offset)
+        if current_type == chunk_type:
+            yield png[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Sérialise un bloc PNG (longueur, type, données, CRC)"""
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def _regroup(bands: Iterator[Image.Image], width: int, rows: int) -> Iterator[Image.Image]:
+    """Regroupe ou découpe des bandes de hauteurs quelconques en bandes de rows lignes"""
+    parts: List[Image.Image] = []
+    part_rows = 0
+    for band in bands:
+        top = 0
+        while top < band.height:
+            take = min(rows - part_rows, band.height - top)
+            parts.append(band if take == band.height else band.crop((0, top, width, top + take)))
+            part_rows += take
+            top += take
+            if part_rows == rows:
+                yield _stack(parts, width)
+                parts, part_rows = [], 0
+    if parts:
+        yield _stack(parts, width)
+
+
+def _cropped(bands: Iterator[Image.Image], box: Tuple[int, int, int, int]) -> Iterator[Image.Image]:
+    """Limite des bandes pleine largeur à une zone (gauche, haut, droite, bas) de l'image"""
+    left, top, right, bottom = box
+    y = 0
+    for band in bands:
+        band_top, y = y, y + band.height
+        if y <= top:
+            continue
+        if band_top >= bottom:
+            break
+        yield band.crop((left, max(top - band_top, 0), right, min(bottom, y) - band_top))
+
+
+def _stack(parts: List[Image.Image], width: int) -> Image.Image:
+    """Empile des bandes RGB de haut en bas"""
+    if len(parts) == 1:
+        return parts[0]
+    stacked = Image.new('RGB', (width, sum(part.height for part in parts)))
+    y = 0
+    for part in parts:
+        stacked.paste(part, (0, y))
+        y += part.height
+    return stacked
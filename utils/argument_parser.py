@@ -14,6 +14,7 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from utils.logging_config import get_logger
+from src.output_format import OUTPUT_FORMATS
 
 logger = get_logger()
 
@@ -50,6 +51,118 @@ class ArgumentParser:
             help="Couleur de fond pour les bordures (R G B). Défaut: 255 255 255"
         )
         
+        parser.add_argument(
+            "--sizes", "-s",
+            type=int,
+            nargs='+',
+            default=None,
+            help="Largeurs à produire pour chaque image, à partir d'un seul décodage "
+                 "(ex: --sizes 1500 750 300 150). Défaut: 750"
+        )
+        
+        parser.add_argument(
+            "--formats",
+            nargs='+',
+            choices=list(OUTPUT_FORMATS),
+            default=['jpeg'],
+            help="Formats à produire pour chaque largeur, à partir du même canevas "
+                 "(ex: --formats jpeg webp avif). Défaut: jpeg"
+        )
+        
+        parser.add_argument(
+            "--workers", "-w",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Nombre de processus de traitement en parallèle. Défaut: nombre de coeurs"
+        )
+        
+        parser.add_argument(
+            "--scan-workers",
+            type=int,
+            default=1,
+            help="Nombre de threads parcourant les dossiers de produits en parallèle "
+                 "(utile sur un dossier réseau). Défaut: 1"
+        )
+        
+        parser.add_argument(
+            "--memory-budget",
+            type=int,
+            default=None,
+            help="Mémoire maximale (Mo) des images traitées en même temps, estimée d'après leur en-tête; "
+                 "les images plus volumineuses sont traitées en bandes. Défaut: moitié de la mémoire disponible"
+        )
+        
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Nombre maximal d'images de mêmes dimensions carréifiées ensemble "
+                 "en une opération vectorisée (1 pour désactiver). Défaut: 16"
+        )
+        
+        parser.add_argument(
+            "--trim",
+            type=int,
+            nargs="?",
+            const=16,
+            default=None,
+            metavar="TOLERANCE",
+            help="Rogner les marges de couleur unie avant la carréification; TOLERANCE est "
+                 "l'écart maximal par canal (0-255) avec la couleur du coin haut gauche. Défaut: 16"
+        )
+        
+        parser.add_argument(
+            "--target-ssim",
+            type=float,
+            default=None,
+            help="Choisir, par recherche dichotomique, la qualité JPEG/WebP/AVIF la plus basse dont le SSIM "
+                 "avec l'image non compressée atteint cette valeur (ex: 0.98). Défaut: qualité fixe du format"
+        )
+        
+        parser.add_argument(
+            "--max-kb",
+            type=int,
+            default=None,
+            help="Taille maximale (Ko) de chaque image JPEG/WebP/AVIF produite, atteinte en baissant sa qualité"
+        )
+        
+        parser.add_argument(
+            "--force", "-f",
+            action="store_true",
+            help="Retraiter toutes les images, même celles inchangées depuis la dernière exécution"
+        )
+        
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Supprimer les images produites dont la source a été supprimée"
+        )
+        
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Reprendre un traitement interrompu sans retraiter les images déjà produites"
+        )
+        
+        parser.add_argument(
+            "--retry-errors",
+            action="store_true",
+            help="Ne retraiter que les images en erreur lors de l'exécution précédente"
+        )
+        
+        parser.add_argument(
+            "--upload", "-u",
+            action="store_true",
+            help="Envoyer les images produites sur Azure (AZURE_CONNECTION_STRING ou fichier config)"
+        )
+        
+        parser.add_argument(
+            "--upload-concurrency",
+            type=int,
+            default=8,
+            help="Nombre maximal d'envois Azure simultanés. Défaut: 8"
+        )
+        
         parser.add_argument(
             "--config", "-c",
             action="store_true",
@@ -6,13 +6,58 @@ This module handles all Azure Blob Storage operations including
 container management, file uploads, and connection management.
 """
 
-from azure.storage.blob import BlobServiceClient, ContainerClient
+from azure.core.exceptions import (
+    HttpResponseError, ResourceExistsError, ResourceNotFoundError,
+    ServiceRequestError, ServiceResponseError
+)
+from azure.storage.blob import BlobServiceClient, ContainerClient, ContentSettings
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+import asyncio
+import json
 import logging
+import mimetypes
+import os
+import random
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Processed images are immutable (unique blob names), let CDNs and browsers cache them
+DEFAULT_CACHE_CONTROL = 'public, max-age=31536000'
+
+# Image types missing from some mimetypes tables (Python version and system mime.types)
+IMAGE_CONTENT_TYPES = {
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+}
+
+def guess_content_type(filename: str) -> str:
+    """Guess the MIME type of a file from its extension"""
+    content_type = IMAGE_CONTENT_TYPES.get(Path(filename).suffix.lower())
+    return content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+# Managers shared by all routes, keyed by (connection string, container name)
+_storage_managers: Dict[Tuple[str, str], "AzureStorageManager"] = {}
+_storage_managers_lock = threading.Lock()
+
+def get_storage_manager(connection_string: str, container_name: str = "processed-images") -> "AzureStorageManager":
+    """
+    Return the shared storage manager for a connection string and container
+    
+    Routes share one manager so that cached container state, and its
+    invalidation by the admin endpoints, is seen by every route.
+    """
+    key = (connection_string, container_name)
+    with _storage_managers_lock:
+        manager = _storage_managers.get(key)
+        if manager is None:
+            manager = AzureStorageManager(connection_string, container_name)
+            _storage_managers[key] = manager
+        return manager
+
 class AzureStorageManager:
     """Manages Azure Blob Storage operations"""
     
@@ -29,6 +74,10 @@ class AzureStorageManager:
         self.blob_service_client = None
         self.container_client = None
         
+        # Container state is cached once known, so uploads skip the existence check
+        self.container_ready = False
+        self._container_lock = threading.Lock()
+        
         # Initialize connection
         self._initialize_client()
         
@@ -46,23 +95,44 @@ class AzureStorageManager:
         """
         Ensure the container exists, create it if it doesn't
         
+        The result is cached: once the container is known to exist, no further
+        request is made until the state is invalidated.
+        
         Returns:
             bool: True if container exists or was created successfully
         """
-        try:
-            if not self.container_client.exists():
-                # Create container without public access (SAS will be used)
-                self.container_client.create_container()
-                logger.info(f"✅ Container '{self.container_name}' created (SAS URLs will be used)")
+        if self.container_ready:
+            return True
+        
+        with self._container_lock:
+            if self.container_ready:
                 return True
-            else:
-                logger.info(f"✅ Container '{self.container_name}' already exists")
+            try:
+                if not self.container_client.exists():
+                    # Create container without public access (SAS will be used)
+                    try:
+                        self.container_client.create_container()
+                        logger.info(f"✅ Container '{self.container_name}' created (SAS URLs will be used)")
+                    except ResourceExistsError:
+                        logger.info(f"✅ Container '{self.container_name}' already exists")
+                else:
+                    logger.info(f"✅ Container '{self.container_name}' already exists")
+                self.container_ready = True
                 return True
-        except Exception as e:
-            logger.error(f"⚠️ Failed to create container '{self.container_name}': {str(e)}")
-            return False
+            except Exception as e:
+                logger.error(f"⚠️ Failed to create container '{self.container_name}': {str(e)}")
+                return False
     
-    def upload_file(self, local_path: Path, blob_name: str, generate_sas: bool = False) -> str:
+    def mark_container_ready(self):
+        """Record that the container is known to exist"""
+        self.container_ready = True
+    
+    def invalidate_container_state(self):
+        """Forget the cached container state, e.g. after the container was deleted"""
+        self.container_ready = False
+    
+    def upload_file(self, local_path: Path, blob_name: str, generate_sas: bool = False,
+                    content_type: Optional[str] = None) -> str:
         """
         Upload a file to Azure Blob Storage
         
@@ -70,6 +140,33 @@ class AzureStorageManager:
             local_path: Path to the local file
             blob_name: Name to give the blob in Azure
             generate_sas: Whether to generate a SAS token for the URL
+            content_type: MIME type of the file (guessed from its extension if omitted)
+            
+        Returns:
+            str: URL of the uploaded blob (with SAS token if requested)
+            
+        Raises:
+            Exception: If upload fails
+        """
+        if content_type is None:
+            content_type = guess_content_type(str(local_path))
+        
+        with open(local_path, 'rb') as data:
+            return self.upload_bytes(data, blob_name, generate_sas, content_type)
+    
+    def upload_bytes(self, data: Union[bytes, BinaryIO], blob_name: str, generate_sas: bool = False,
+                     content_type: str = 'image/jpeg') -> str:
+        """
+        Upload in-memory image data to Azure Blob Storage
+        
+        Content type and cache headers are sent with the upload itself, so no
+        separate set_http_headers request is needed.
+        
+        Args:
+            data: Encoded image bytes or a readable binary stream
+            blob_name: Name to give the blob in Azure
+            generate_sas: Whether to generate a SAS token for the URL
+            content_type: MIME type of the encoded image
             
         Returns:
             str: URL of the uploaded blob (with SAS token if requested)
@@ -88,17 +185,25 @@ class AzureStorageManager:
                 blob=blob_name
             )
             
-            with open(local_path, 'rb') as data:
-                blob_client.upload_blob(data, overwrite=True)
-                
-            # Set content type for web display
-            from azure.storage.blob import ContentSettings
-            blob_client.set_http_headers(content_settings=ContentSettings(
-                content_type='image/jpeg',
-                cache_control='public, max-age=31536000'
-            ))
+            # Content type and cache headers for web display
+            content_settings = ContentSettings(
+                content_type=content_type,
+                cache_control=DEFAULT_CACHE_CONTROL
+            )
+            
+            try:
+                blob_client.upload_blob(data, overwrite=True, content_settings=content_settings)
+            except ResourceNotFoundError:
+                # The container disappeared since it was last seen: recreate it and retry once
+                logger.warning(f"⚠️ Container '{self.container_name}' not found, recreating it")
+                self.invalidate_container_state()
+                if not self.ensure_container_exists():
+                    raise Exception(f"Container '{self.container_name}' could not be created")
+                if hasattr(data, 'seek'):
+                    data.seek(0)
+                blob_client.upload_blob(data, overwrite=True, content_settings=content_settings)
             
-            logger.info(f"✅ File uploaded successfully: {blob_name}")
+            logger.info(f"✅ File uploaded successfully: {blob_name} ({content_type})")
             
             # Return URL with or without SAS token
             if generate_sas:
@@ -108,7 +213,7 @@ class AzureStorageManager:
             
         except Exception as e:
             logger.error(f"❌ Failed to upload file {blob_name}: {str(e)}")
-            raise Exception(f"Failed to upload to Azure Blob Storage: {str(e)}")
+            raise Exception(f"Failed to upload to Azure Blob Storage: {str(e)}") from e
     
     def _generate_sas_url(self, blob_name: str, expiry_hours: int = 24) -> str:
         """
@@ -187,6 +292,22 @@ class AzureStorageManager:
             logger.error(f"❌ Failed to delete blob {blob_name}: {str(e)}")
             return False
     
+    def blob_exists(self, blob_name: str) -> bool:
+        """
+        Check whether a blob exists in the container
+        
+        Args:
+            blob_name: Name of the blob
+            
+        Returns:
+            bool: True if the blob exists
+        """
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.container_name, 
+            blob=blob_name
+        )
+        return blob_client.exists()
+    
     def get_blob_url(self, blob_name: str) -> str:
         """
         Get the URL of a blob
@@ -224,3 +345,160 @@ class AzureStorageManager:
                 "status": "error",
                 "error": str(e)
             }
+
+
+# HTTP statuses worth retrying: timeouts, throttling and server-side errors
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Tell whether an upload error is transient and worth retrying
+    
+    The whole exception chain is inspected, since upload_bytes wraps the
+    original Azure error.
+    """
+    while error is not None:
+        if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+            return True
+        if isinstance(error, HttpResponseError) and error.status_code in TRANSIENT_STATUS_CODES:
+            return True
+        error = error.__cause__
+    return False
+
+
+class UploadPipeline:
+    """
+    Background uploader with bounded concurrency and memory
+    
+    Uploads run on a pool of worker threads, so callers can keep encoding
+    while previous images are sent. Submissions block once the maximum number
+    of in-flight uploads or the byte budget is reached. Transient errors are
+    retried with jittered exponential backoff.
+    """
+    
+    def __init__(self, storage_manager: AzureStorageManager, max_in_flight: int = 8,
+                 max_bytes: int = 256 * 1024 * 1024, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0):
+        """
+        Initialize the upload pipeline
+        
+        Args:
+            storage_manager: Manager used to perform the uploads
+            max_in_flight: Maximum number of uploads queued or running at once
+            max_bytes: Maximum total size of the data held by queued or running uploads
+            max_retries: Number of retries on transient errors
+            backoff_base: Base delay in seconds of the exponential backoff
+            backoff_max: Maximum delay in seconds between two attempts
+        """
+        self.storage_manager = storage_manager
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_bytes = max_bytes
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="upload")
+        # Coroutines wait for capacity on their own thread, in submission order,
+        # instead of holding threads of the event loop's default executor
+        self._admission_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-admission")
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._in_flight_bytes = 0
+    
+    def _acquire(self, size: int):
+        """Wait until the upload fits in the in-flight count and byte budget"""
+        with self._condition:
+            # A single upload larger than the budget is admitted once nothing else is in flight
+            while self._in_flight >= self.max_in_flight or (
+                self._in_flight > 0 and self._in_flight_bytes + size > self.max_bytes
+            ):
+                self._condition.wait()
+            self._in_flight += 1
+            self._in_flight_bytes += size
+    
+    def _release(self, size: int):
+        """Give back the capacity held by a finished upload"""
+        with self._condition:
+            self._in_flight -= 1
+            self._in_flight_bytes -= size
+            self._condition.notify_all()
+    
+    def _upload_with_retry(self, data: bytes, blob_name: str, content_type: str, generate_sas: bool) -> str:
+        """Upload a blob, retrying transient errors with jittered backoff"""
+        attempt = 0
+        while True:
+            try:
+                return self.storage_manager.upload_bytes(data, blob_name, generate_sas, content_type)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                # Full jitter: spread retries so parallel uploads don't hammer the service together
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                attempt += 1
+                logger.warning(f"⚠️ Transient error uploading {blob_name}, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+    
+    def submit(self, data: bytes, blob_name: str, content_type: str = 'image/jpeg',
+               generate_sas: bool = False) -> "Future[str]":
+        """
+        Queue an upload, blocking while the pipeline is full
+        
+        Args:
+            data: Encoded image bytes
+            blob_name: Name to give the blob in Azure
+            content_type: MIME type of the encoded image
+            generate_sas: Whether to generate a SAS token for the URL
+            
+        Returns:
+            Future[str]: Resolves to the URL of the uploaded blob
+        """
+        size = len(data)
+        self._acquire(size)
+        try:
+            future = self._executor.submit(self._upload_with_retry, data, blob_name, content_type, generate_sas)
+        except Exception:
+            self._release(size)
+            raise
+        future.add_done_callback(lambda _: self._release(size))
+        return future
+    
+    async def submit_async(self, data: bytes, blob_name: str, content_type: str = 'image/jpeg',
+                           generate_sas: bool = False) -> str:
+        """
+        Queue an upload from a coroutine and wait for its URL
+        
+        Waiting for capacity happens off the event loop, on the pipeline's
+        admission thread.
+        """
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(
+            self._admission_executor, self.submit, data, blob_name, content_type, generate_sas
+        )
+        return await asyncio.wrap_future(future)
+    
+    def close(self, wait: bool = True):
+        """Stop accepting uploads, optionally waiting for queued ones to finish"""
+        self._admission_executor.shutdown(wait=wait)
+        self._executor.shutdown(wait=wait)
+
+
+def load_azure_config() -> dict:
+    """Load Azure configuration from environment variables or the local config file"""
+    # Try environment variables first (for production)
+    connection_string = os.getenv('AZURE_CONNECTION_STRING')
+    container_name = os.getenv('AZURE_CONTAINER_NAME', 'processed-images')
+    
+    if connection_string:
+        return {
+            'connection_string': connection_string,
+            'container_name': container_name
+        }
+    
+    # Fallback to config file (for local development)
+    config_path = Path("config/yoobumorph_config.json")
+    if config_path.exists():
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        return config.get('azure_storage', {})
+    
+    return {}
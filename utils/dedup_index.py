@@ -0,0 +1,156 @@
+"""
+Processed image deduplication for YoobuMorph
+============================================
+
+This module keeps a content-addressed index of processed images in a local
+SQLite file. An entry maps the hash of the source bytes plus the processing
+parameters to the blob already produced for them, so a re-sent image can
+reuse the existing blob instead of being processed and uploaded again.
+Entries are scoped by container, and cleared when their container is deleted.
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed_images (
+    cache_key TEXT PRIMARY KEY,
+    container TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    blob_name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    original_width INTEGER NOT NULL,
+    original_height INTEGER NOT NULL,
+    crop_box TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS processed_images_container ON processed_images (container);
+"""
+
+
+def hash_source(data: bytes) -> str:
+    """Return the SHA-256 hex digest of source image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_cache_key(source_hash: str, params: dict, container: str = "") -> str:
+    """
+    Build the index key for a source and its processing parameters
+
+    Args:
+        source_hash: Hash of the source bytes
+        params: Processing parameters affecting the output (background color, output settings...)
+        container: Container holding the produced blobs
+
+    Returns:
+        str: Stable key for the (container, source, parameters) triple
+    """
+    canonical_params = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{container}:{source_hash}:{canonical_params}".encode()).hexdigest()
+
+
+class DedupIndex:
+    """SQLite-backed index of already processed images"""
+
+    def __init__(self, db_path: str, container: str = ""):
+        """
+        Initialize the index
+
+        Args:
+            db_path: Path of the SQLite database file (created if missing)
+            container: Container holding the produced blobs; entries of other containers are ignored
+        """
+        self.db_path = Path(db_path)
+        self.container = container
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        logger.info(f"Dedup index opened: {self.db_path} (container: {container})")
+
+    def lookup(self, source_hash: str, params: dict) -> Optional[dict]:
+        """
+        Find the blob previously produced for a source and parameters
+
+        Args:
+            source_hash: Hash of the source bytes
+            params: Processing parameters
+
+        Returns:
+            Optional[dict]: Stored entry, or None on a miss
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT * FROM processed_images WHERE cache_key = ?",
+                (make_cache_key(source_hash, params, self.container),)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["crop_box"] = tuple(json.loads(entry["crop_box"])) if entry["crop_box"] else None
+        return entry
+
+    def record(self, source_hash: str, params: dict, blob_name: str, url: str, content_type: str,
+               size: tuple, original_size: tuple, crop_box: Optional[tuple] = None):
+        """
+        Store the blob produced for a source and parameters
+
+        Args:
+            source_hash: Hash of the source bytes
+            params: Processing parameters
+            blob_name: Name of the uploaded blob
+            url: URL of the uploaded blob
+            content_type: MIME type of the uploaded blob
+            size: Dimensions of the processed image (width, height)
+            original_size: Dimensions of the source image (width, height)
+            crop_box: Area kept after trimming the margins (left, top, right, bottom), if trimmed
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO processed_images (cache_key, container, source_hash, params, blob_name, "
+                "url, content_type, width, height, original_width, original_height, crop_box, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    make_cache_key(source_hash, params, self.container), self.container, source_hash,
+                    json.dumps(params, sort_keys=True), blob_name, url, content_type,
+                    size[0], size[1], original_size[0], original_size[1],
+                    json.dumps(list(crop_box)) if crop_box else None,
+                    datetime.now(timezone.utc).isoformat()
+                )
+            )
+
+    def forget(self, source_hash: str, params: dict):
+        """Remove an entry, e.g. when its blob no longer exists"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM processed_images WHERE cache_key = ?",
+                (make_cache_key(source_hash, params, self.container),)
+            )
+
+    def clear(self):
+        """Remove every entry of the container, e.g. after the container was deleted"""
+        with self._lock, self._connection:
+            removed = self._connection.execute(
+                "DELETE FROM processed_images WHERE container = ?", (self.container,)
+            ).rowcount
+        logger.info(f"Dedup index cleared for container {self.container}: {removed} entries")
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,167 @@
+"""
+Source download cache for YoobuMorph
+====================================
+
+This module keeps downloaded source images on disk together with their HTTP
+validators (ETag / Last-Modified), so unchanged images can be revalidated with
+a conditional GET instead of being downloaded again. The cache is bounded in
+size and evicts the least recently used entries first.
+"""
+
+from pathlib import Path
+from typing import Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    url TEXT PRIMARY KEY,
+    body_file TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    source_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS downloads_last_access ON downloads (last_access);
+"""
+
+
+class DownloadCache:
+    """Size-bounded LRU cache of downloaded source images"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding the cached bodies and the index
+            max_bytes: Maximum total size of the cached bodies
+        """
+        self.cache_dir = Path(cache_dir)
+        self.bodies_dir = self.cache_dir / "bodies"
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.cache_dir / "index.sqlite3"), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        logger.info(f"Download cache opened: {self.cache_dir}")
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """
+        Get the cache entry of a URL, with its validators
+
+        Args:
+            url: Source URL
+
+        Returns:
+            Optional[dict]: Entry (etag, last_modified, source_hash, ...), or None on a miss
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM downloads WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def read_body(self, entry: dict) -> Optional[bytes]:
+        """
+        Read a cached body and mark the entry as recently used
+
+        Args:
+            entry: Entry returned by lookup
+
+        Returns:
+            Optional[bytes]: Cached bytes, or None if the body file is gone
+        """
+        try:
+            data = (self.bodies_dir / entry["body_file"]).read_bytes()
+        except OSError:
+            self.forget(entry["url"])
+            return None
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE downloads SET last_access = ? WHERE url = ?", (time.time(), entry["url"])
+            )
+        return data
+
+    def store(self, url: str, data: bytes, etag: Optional[str], last_modified: Optional[str]) -> str:
+        """
+        Cache a downloaded body with its validators
+
+        Args:
+            url: Source URL
+            data: Response body
+            etag: ETag response header
+            last_modified: Last-Modified response header
+
+        Returns:
+            str: SHA-256 hex digest of the body
+        """
+        source_hash = hashlib.sha256(data).hexdigest()
+        body_file = hashlib.sha256(url.encode()).hexdigest()
+
+        # Write to a temporary file first so a partial body is never served
+        fd, tmp_path = tempfile.mkstemp(dir=self.bodies_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, self.bodies_dir / body_file)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO downloads (url, body_file, etag, last_modified, source_hash, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body_file, etag, last_modified, source_hash, len(data), time.time())
+            )
+            self._evict()
+
+        return source_hash
+
+    def forget(self, url: str):
+        """Remove the entry of a URL and its body"""
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT body_file FROM downloads WHERE url = ?", (url,)).fetchone()
+            self._connection.execute("DELETE FROM downloads WHERE url = ?", (url,))
+        if row:
+            self._remove_body(row["body_file"])
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits its size cap (lock held)"""
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM downloads").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for row in self._connection.execute(
+            "SELECT url, body_file, size FROM downloads ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM downloads WHERE url = ?", (row["url"],))
+            self._remove_body(row["body_file"])
+            total -= row["size"]
+            logger.info(f"Evicted from download cache: {row['url']}")
+
+    def _remove_body(self, body_file: str):
+        """Delete a body file, ignoring files already gone"""
+        try:
+            (self.bodies_dir / body_file).unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        """Close the index connection"""
+        with self._lock:
+            self._connection.close()
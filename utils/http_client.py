@@ -0,0 +1,237 @@
+"""
+Async HTTP utilities for YoobuMorph
+==================================
+
+This module provides a pooled asynchronous HTTP client used to download
+source images, with keep-alive connections and per-host concurrency limits.
+When a download cache is configured, cached sources are revalidated with
+conditional requests (If-None-Match / If-Modified-Since). Image headers are
+probed as the body arrives, so corrupt and oversized images are rejected
+before the download finishes (formats without a header reader, such as BMP,
+are left to the decoder).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import logging
+
+import httpx
+
+from src.image_probe import MAX_HEADER_BYTES, ImageProbe, ProbeError, UnknownFormatError, probe_image
+from utils.download_cache import DownloadCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DownloadResult:
+    """Downloaded source image"""
+    data: bytes
+    source_hash: Optional[str] = None  # SHA-256 of data, when already known (cached sources)
+    not_modified: bool = False  # True when served from cache after a 304 revalidation
+    probe: Optional[ImageProbe] = None  # Header information (dimensions, mode, orientation...)
+
+
+class DownloadError(Exception):
+    """Raised when a source image cannot be downloaded"""
+
+    def __init__(self, url: str, status_code: Optional[int] = None, reason: Optional[str] = None):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        super().__init__(f"Download error: {url}" + (f" ({reason})" if reason else ""))
+
+
+class AsyncImageDownloader:
+    """Downloads images over a shared, pooled async HTTP client"""
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 per_host_limit: int = 8, timeout: float = 30.0, cache: Optional[DownloadCache] = None,
+                 max_pixels: Optional[int] = None):
+        """
+        Initialize the downloader
+
+        Args:
+            max_connections: Maximum number of open connections across all hosts
+            max_keepalive_connections: Maximum number of idle connections kept alive
+            per_host_limit: Maximum number of concurrent requests to a single host
+            timeout: Request timeout in seconds
+            cache: Optional on-disk cache used for conditional requests
+            max_pixels: Reject images with more pixels than this, from their header
+        """
+        self.cache = cache
+        self.max_pixels = max_pixels
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.per_host_limit = per_host_limit
+        self.timeout = httpx.Timeout(timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                follow_redirects=True
+            )
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Return the concurrency limiter for the host of a URL"""
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _check_source(self, url: str, data: bytes, complete: bool) -> Optional[ImageProbe]:
+        """
+        Probe the beginning of a body and reject it if it is not an acceptable image
+
+        Returns:
+            Optional[ImageProbe]: Header information, or None if more bytes are needed
+
+        Raises:
+            UnknownFormatError: If the format has no header reader (e.g. BMP, GIF):
+                                the body is then left to the decoder
+            DownloadError: If the header of a recognized format is invalid, or the image is too large
+        """
+        try:
+            probe = probe_image(data, complete=complete)
+        except UnknownFormatError:
+            raise
+        except ProbeError as e:
+            logger.error(f"❌ Rejected {url}: not a supported image ({e})")
+            raise DownloadError(url, status_code=200, reason=f"not a supported image: {e}") from e
+
+        if probe and self.max_pixels and probe.pixels > self.max_pixels:
+            logger.error(f"❌ Rejected {url}: {probe.width}x{probe.height} exceeds {self.max_pixels} pixels")
+            raise DownloadError(url, status_code=200, reason=f"image too large: {probe.width}x{probe.height}")
+        return probe
+
+    async def _get(self, url: str,
+                   headers: Optional[Dict[str, str]] = None) -> Tuple[httpx.Response, bytes, Optional[ImageProbe]]:
+        """
+        Send a GET request under the per-host concurrency limit
+
+        The body of a 200 response is probed as it arrives (each time its size
+        has doubled) and the download is aborted as soon as its header shows it
+        cannot be processed. Formats without a header reader (BMP, GIF...) are
+        downloaded whole and left to the decoder.
+
+        Returns:
+            Tuple[httpx.Response, bytes, Optional[ImageProbe]]: Response, body (200 only) and header information
+        """
+        async with self._host_semaphore(url):
+            try:
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code != 200:
+                        return response, b"", None
+
+                    body = bytearray()
+                    probe = None
+                    # Body size at which the header is probed again: doubling it keeps
+                    # the total probing cost linear, up to the header size limit
+                    # (None: format without a header reader, left to the decoder)
+                    probe_at = 0
+                    async for chunk in response.aiter_bytes():
+                        body += chunk
+                        if probe is None and probe_at is not None and len(body) >= probe_at:
+                            try:
+                                probe = self._check_source(url, body, complete=False)
+                                probe_at = min(2 * len(body), MAX_HEADER_BYTES)
+                            except UnknownFormatError:
+                                probe_at = None
+                    if probe is None and probe_at is not None:
+                        try:
+                            probe = self._check_source(url, body, complete=True)
+                        except UnknownFormatError:
+                            pass
+                    return response, bytes(body), probe
+            except httpx.HTTPError as e:
+                logger.error(f"❌ Failed to download {url}: {str(e)}")
+                raise DownloadError(url, reason=str(e)) from e
+
+    async def fetch(self, url: str) -> DownloadResult:
+        """
+        Download a URL, revalidating a cached copy when there is one
+
+        Args:
+            url: URL of the image to download
+
+        Returns:
+            DownloadResult: Body, and its hash when it is known from the cache
+
+        Raises:
+            DownloadError: If the request fails, does not return 200 or is not an acceptable image
+        """
+        cached = await asyncio.to_thread(self.cache.lookup, url) if self.cache else None
+
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response, data, probe = await self._get(url, headers)
+
+        if response.status_code == 304 and cached:
+            data = await asyncio.to_thread(self.cache.read_body, cached)
+            if data is not None:
+                logger.info(f"Source not modified, using cached copy: {url}")
+                try:
+                    probe = self._check_source(url, data, complete=True)
+                except UnknownFormatError:
+                    probe = None
+                return DownloadResult(
+                    data=data,
+                    source_hash=cached["source_hash"],
+                    not_modified=True,
+                    probe=probe
+                )
+            # Cached body vanished: download it again unconditionally
+            response, data, probe = await self._get(url)
+
+        if response.status_code != 200:
+            logger.error(f"❌ Failed to download {url}: HTTP {response.status_code}")
+            raise DownloadError(url, status_code=response.status_code)
+
+        source_hash = None
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.cache and (etag or last_modified):
+            source_hash = await asyncio.to_thread(self.cache.store, url, data, etag, last_modified)
+
+        return DownloadResult(data=data, source_hash=source_hash, probe=probe)
+
+    async def download(self, url: str) -> bytes:
+        """
+        Download a URL and return its body
+
+        Args:
+            url: URL of the image to download
+
+        Returns:
+            bytes: Response body
+
+        Raises:
+            DownloadError: If the request fails, does not return 200 or is not an acceptable image
+        """
+        return (await self.fetch(url)).data
+
+    async def close(self):
+        """Close the underlying client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_semaphores.clear()
@@ -0,0 +1,232 @@
+"""
+Job persistence for YoobuMorph
+==============================
+
+This module stores asynchronous batch jobs and their per-image progress in a
+local SQLite file, so queued work survives an application restart.
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Item statuses
+ITEM_PENDING = "pending"
+ITEM_PROCESSING = "processing"
+ITEM_DONE = "done"
+ITEM_ERROR = "error"
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_COMPLETED_WITH_ERRORS = "completed_with_errors"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    options TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    item_index INTEGER NOT NULL,
+    product_name TEXT NOT NULL,
+    variation_name TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result_url TEXT,
+    results TEXT,
+    crop_box TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, item_index)
+);
+"""
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """SQLite-backed store for batch jobs"""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the job store
+
+        Args:
+            db_path: Path of the SQLite database file (created if missing)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        logger.info(f"Job store opened: {self.db_path}")
+
+    def create_job(self, items: List[dict], options: Optional[dict] = None) -> str:
+        """
+        Persist a new job
+
+        Args:
+            items: Images to process, each with product_name, variation_name and source_url
+            options: Processing options shared by all items (e.g. widths)
+
+        Returns:
+            str: Identifier of the new job
+        """
+        job_id = uuid.uuid4().hex
+        now = _now()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO jobs (id, status, total, options, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED if items else JOB_COMPLETED, len(items), json.dumps(options or {}), now, now)
+            )
+            self._connection.executemany(
+                "INSERT INTO job_items (job_id, item_index, product_name, variation_name, source_url, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, index, item["product_name"], item["variation_name"], item["source_url"], ITEM_PENDING)
+                    for index, item in enumerate(items)
+                ]
+            )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        Get a job with its items and progress counters
+
+        Args:
+            job_id: Identifier of the job
+
+        Returns:
+            Optional[dict]: Job state, or None if the job does not exist
+        """
+        with self._lock:
+            job = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            items = self._connection.execute(
+                "SELECT * FROM job_items WHERE job_id = ? ORDER BY item_index", (job_id,)
+            ).fetchall()
+
+        items = [self._decode_item(item) for item in items]
+        done = sum(1 for item in items if item["status"] == ITEM_DONE)
+        errors = sum(1 for item in items if item["status"] == ITEM_ERROR)
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+            "total": job["total"],
+            "options": json.loads(job["options"] or "{}"),
+            "processed": done,
+            "errors": errors,
+            "pending": job["total"] - done - errors,
+            "items": items
+        }
+
+    def get_item(self, job_id: str, item_index: int) -> Optional[dict]:
+        """Get a single job item, with the options of its job"""
+        with self._lock:
+            item = self._connection.execute(
+                "SELECT job_items.*, jobs.options FROM job_items JOIN jobs ON jobs.id = job_items.job_id "
+                "WHERE job_items.job_id = ? AND job_items.item_index = ?", (job_id, item_index)
+            ).fetchone()
+        if item is None:
+            return None
+        item = self._decode_item(item)
+        item["options"] = json.loads(item["options"] or "{}")
+        return item
+
+    def _decode_item(self, row: sqlite3.Row) -> dict:
+        """Turn an item row into a dict, decoding its per-width results and crop box"""
+        item = dict(row)
+        item["results"] = json.loads(item["results"]) if item["results"] else None
+        item["crop_box"] = json.loads(item["crop_box"]) if item["crop_box"] else None
+        return item
+
+    def start_item(self, job_id: str, item_index: int):
+        """Mark an item as being processed and its job as running"""
+        now = _now()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE job_items SET status = ? WHERE job_id = ? AND item_index = ?",
+                (ITEM_PROCESSING, job_id, item_index)
+            )
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, now, job_id, JOB_QUEUED)
+            )
+
+    def finish_item(self, job_id: str, item_index: int, result_url: Optional[str] = None,
+                    error: Optional[str] = None, results: Optional[List[dict]] = None,
+                    crop_box: Optional[tuple] = None):
+        """
+        Record the outcome of an item and complete the job when nothing is left
+
+        Args:
+            job_id: Identifier of the job
+            item_index: Index of the item in the job
+            result_url: URL of the uploaded blob on success
+            error: Error message on failure
+            results: Every uploaded width ({"width": ..., "url": ...}) when several were requested
+            crop_box: Area kept after trimming the margins (left, top, right, bottom), if trimmed
+        """
+        status = ITEM_ERROR if error is not None else ITEM_DONE
+        now = _now()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE job_items SET status = ?, result_url = ?, results = ?, crop_box = ?, error = ? "
+                "WHERE job_id = ? AND item_index = ?",
+                (status, result_url, json.dumps(results) if results else None,
+                 json.dumps(list(crop_box)) if crop_box else None, error, job_id, item_index)
+            )
+            remaining, failed = self._connection.execute(
+                "SELECT SUM(status IN (?, ?)), SUM(status = ?) FROM job_items WHERE job_id = ?",
+                (ITEM_PENDING, ITEM_PROCESSING, ITEM_ERROR, job_id)
+            ).fetchone()
+            if not remaining:
+                job_status = JOB_COMPLETED_WITH_ERRORS if failed else JOB_COMPLETED
+            else:
+                job_status = JOB_RUNNING
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (job_status, now, job_id)
+            )
+
+    def unfinished_items(self) -> List[tuple]:
+        """
+        List items that still have to be processed, e.g. after a restart
+
+        Items that were being processed when the application stopped are
+        returned too, so they are retried.
+
+        Returns:
+            List[tuple]: (job_id, item_index) pairs in submission order
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT job_items.job_id, job_items.item_index FROM job_items "
+                "JOIN jobs ON jobs.id = job_items.job_id "
+                "WHERE job_items.status IN (?, ?) ORDER BY jobs.created_at, job_items.item_index",
+                (ITEM_PENDING, ITEM_PROCESSING)
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,70 @@
+"""
+Request coalescing for YoobuMorph
+================================
+
+This module provides an in-process single-flight helper: concurrent callers
+asking for the same key share one in-flight operation and its result,
+instead of each running it.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicates concurrent async calls sharing the same key"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        # Callers currently awaiting each shared operation
+        self._waiters: Dict[asyncio.Future, int] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Tell whether an operation is currently running for a key"""
+        return key in self._calls
+
+    async def do(self, key: Hashable, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run an operation, or join the one already running for the same key
+
+        The key is released as soon as the operation finishes, so later calls
+        run it again. A caller being cancelled does not cancel the shared
+        operation for the other callers; the operation is cancelled when its
+        last caller is.
+
+        Args:
+            key: Identifies equivalent operations
+            operation: Factory creating the coroutine to run
+
+        Returns:
+            Any: Result of the shared operation (its exception is raised to every caller)
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(operation())
+            self._calls[key] = future
+            future.add_done_callback(
+                lambda done: self._calls.pop(key) if self._calls.get(key) is done else None
+            )
+        else:
+            logger.info(f"Joining in-flight operation for {key}")
+
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1 and not future.done():
+                # Nobody is left waiting for the result: stop the work
+                logger.info(f"Cancelling in-flight operation for {key}")
+                future.cancel()
+                # Later callers start a new operation instead of joining the cancelled one
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]